@@ -0,0 +1,397 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import downloader
+import incremental
+from jobs import JobRunner, Journal
+from cache import ResponseCache
+from fetcher import Fetcher
+from fulltext import FullTextFetcher, summarize
+from metrics import Metrics
+from pid_index import PidIndex
+from pipeline import Pipeline
+from store import PaperStore
+from writer import default_output_name, read_output
+from years import parse_years
+
+
+def read_jobs(path, invalid=None):
+    """
+    读取任务文件，每行一个 "科学家姓名,年份"，年份省略时为 -1（全部年份）。
+    年份也可以是区间或集合，如 2019-2023，或加引号的 "2018,2021"。
+    空行和以 # 开头的行会被忽略。
+
+    年份无效的行：给出 invalid 列表时跳过该行，并把 (行号, 错误信息) 追加到 invalid；
+    否则读完整个文件后抛出一个 ValueError，列出所有无效的行。
+    """
+    jobs = []
+    errors = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            scientist = row[0].strip()
+            try:
+                year = str(parse_years(",".join(row[1:]))) if "".join(row[1:]).strip() else "-1"
+            except ValueError as e:
+                errors.append((reader.line_num, f"{scientist}: {e}"))
+                continue
+            jobs.append((scientist, year))
+    if invalid is not None:
+        invalid.extend(errors)
+    elif errors:
+        raise ValueError(f"{path} 中有无效的行: "
+                         + "; ".join(f"第 {line} 行 {message}" for line, message in errors))
+    return jobs
+
+
+def _run_job(scientist, year, output_file, fetcher, pid_index, refresh, job_timeout, profile,
+             store, runner=None):
+    start = time.perf_counter()
+    job = {"scientist": scientist, "year": year, "output_file": output_file}
+    try:
+        if refresh:
+            result = incremental.refresh_papers(scientist, year, output_file, fetcher=fetcher,
+                                                pid_index=pid_index)
+        elif runner is not None:
+            result = runner.run(scientist, year, output_file, fetcher=fetcher,
+                                pid_index=pid_index, timeout=job_timeout,
+                                metrics=Metrics(profile=profile), store=store)
+        else:
+            result = downloader.download_papers(scientist, year, output_file, fetcher=fetcher,
+                                                pid_index=pid_index, timeout=job_timeout,
+                                                metrics=Metrics(profile=profile), store=store)
+        job.update(result)
+    except Exception as e:
+        job.update({"success": False, "count": 0, "error": str(e)})
+    job["elapsed"] = time.perf_counter() - start
+    return job
+
+
+def _run_group(scientist, group, fetcher, pid_index, job_timeout, profile, store):
+    """同一科学家的多个任务只下载解析一次，按各自的年份条件写入各自的文件。"""
+    start = time.perf_counter()
+    jobs = [{"scientist": scientist, "year": year, "output_file": output_file}
+            for year, output_file in group]
+    try:
+        result = downloader.download_partitioned(scientist, [(f, y) for y, f in group],
+                                                 fetcher=fetcher, pid_index=pid_index,
+                                                 timeout=job_timeout,
+                                                 metrics=Metrics(profile=profile), store=store)
+        counts = result.pop("partitions")
+        del result["outputs"]
+        # 一次下载由多个任务共享，指标只记在第一个任务上，避免汇总时重复计算
+        run_metrics = result.pop("metrics")
+        for i, job in enumerate(jobs):
+            job.update(result, count=counts[i] if counts else 0)
+        jobs[0]["metrics"] = run_metrics
+    except Exception as e:
+        for job in jobs:
+            job.update({"success": False, "count": 0, "error": str(e)})
+    elapsed = time.perf_counter() - start
+    for job in jobs:
+        job["elapsed"] = elapsed
+    return jobs
+
+
+def _group_jobs(jobs, output_dir, split):
+    """按科学家分组：{scientist: [(year, output_file), ...]}。"""
+    groups = {}
+    for scientist, year in jobs:
+        output_file = os.path.join(output_dir, default_output_name(scientist, year, split))
+        groups.setdefault(scientist, []).append((year, output_file))
+    return groups
+
+
+def _run_pipeline(groups, fetcher, pid_index, max_workers, parse_workers, metrics, store):
+    """流水线模式：按科学家分组交给 pipeline.Pipeline，结果再拆回各个任务。"""
+    pipeline = Pipeline(fetcher=fetcher, pid_index=pid_index, store=store,
+                        resolve_workers=max_workers, fetch_workers=max_workers,
+                        parse_workers=parse_workers, metrics=metrics)
+    results = []
+    for r in pipeline.run([(scientist, [(f, y) for y, f in group])
+                           for scientist, group in groups.items()]):
+        counts = r.pop("partition_counts", None)
+        r.pop("outputs", None)
+        for i, (year, output_file) in enumerate(groups[r["scientist"]]):
+            job = dict(r, year=year, output_file=output_file)
+            if counts is not None:
+                job["count"] = counts[i]
+            results.append(job)
+    # 整条流水线的指标记在第一个任务上，由 run_batch 合并到批量汇总中
+    if results:
+        results[0]["metrics"] = metrics.summary()
+    return results
+
+
+def check_options(refresh=False, job_timeout=None, fan_out=False, split=None, profile=False,
+                  store=None, pipeline=False, journal=None):
+    """
+    检查 run_batch 的选项组合，不能同时使用的选项抛出 ValueError。
+    参数与 run_batch 的同名参数相同；store / journal 只判断是否为 None。
+    """
+    if fan_out and refresh:
+        raise ValueError("fan_out 不能与 refresh 同时使用")
+    if refresh and job_timeout is not None:
+        raise ValueError("job_timeout 不能与 refresh 同时使用")
+    if refresh and store is not None:
+        raise ValueError("store 不能与 refresh 同时使用")
+    if refresh and split:
+        raise ValueError("split 不能与 refresh 同时使用")
+    if pipeline and (refresh or job_timeout is not None or profile):
+        raise ValueError("pipeline 不能与 refresh、job_timeout 或 profile 同时使用")
+    if journal is not None and (refresh or fan_out or pipeline):
+        raise ValueError("journal 不能与 refresh、fan_out 或 pipeline 同时使用")
+
+
+def run_batch(jobs, output_dir=".", max_workers=8, max_per_host=4, min_interval=0.0,
+              fetcher=None, pid_index=None, refresh=False, job_timeout=None, fan_out=False,
+              split=None, metrics=None, profile=False, store=None, pipeline=False,
+              parse_workers=None, journal=None, retries=2, retry_backoff=1.0, fulltext=None):
+    """
+    用有界线程池并发下载多位科学家的论文。
+
+    参数:
+      jobs: (scientist, year) 列表。
+      output_dir: 输出目录，文件名与 GUI 的默认命名一致。
+      max_workers: 全局并发上限（线程数）。
+      max_per_host: 同一主机的最大并发请求数。
+      min_interval: 同一主机两次请求的最小间隔（秒）。
+      fetcher: 可选的共享 Fetcher，默认按上述参数新建一个。
+      pid_index: 可选的 PidIndex；提供时先批量解析所有姓名，重复的姓名只搜索一次。
+      refresh: 为 True 时用 incremental.refresh_papers 增量更新已有的输出文件。
+      job_timeout: 单个任务的截止时间（秒），超时的任务记为失败，不写输出文件。
+                   不能与 refresh 同时使用。
+      fan_out: 为 True 时同一科学家的所有任务合并为一次搜索、一次主页请求和一次解析，
+               再分别写入各自的文件（不能与 refresh 同时使用）。
+      split: "year" / "venue"，每个任务按年份/刊物拆分成多个文件。不能与 refresh 同时使用。
+      metrics: 可选的 metrics.Metrics，各任务的分阶段指标累加到其中；省略时内部新建一个。
+      profile: 为 True 时每个任务用 cProfile 采样，结果附在各任务的 "metrics" 中。
+               cProfile 同一时间只能采样一个线程，因此会把并发数降为 1。
+      store: 可选的 store.PaperStore，下载的论文同时写入本地论文库。不能与 refresh 同时使用。
+      pipeline: 为 True 时用 pipeline.Pipeline 分阶段执行：网络请求在线程中，解析在
+                parse_workers 个子进程中（默认为 CPU 核数）。同一科学家的任务像 fan_out
+                一样合并；不支持 refresh、job_timeout 和 profile。
+      journal: 可选的任务日志（jobs.Journal 或文件路径）。提供时由 jobs.JobRunner 执行：
+               每个任务的状态追加写入日志，重新运行同一批任务时跳过已写出的任务，
+               失败的任务最多重试 retries 次，第 n 次重试前等待 retry_backoff * 2 ** n 秒。
+               不能与 refresh、fan_out 或 pipeline 同时使用。
+      fulltext: 可选的 fulltext.FullTextFetcher。提供时在所有任务结束后，并发下载成功任务
+                （包括从日志跳过的任务）输出文件中论文链接的全文，已下载过的链接不再请求。
+
+    返回:
+      {"results": [...每个任务的结果...], "stats": {...汇总吞吐量...},
+       "metrics": 所有任务合计的分阶段指标}，提供 fulltext 时另有 "fulltext"
+      （fulltext.summarize 的各状态数量和字节数）。
+      单个任务失败只记录在它自己的结果里，不影响其他任务。
+      选项组合无效时抛出 ValueError（见 check_options）。
+      从日志恢复时，之前已完成的任务 status 为 "skipped"，计入 stats["skipped"]，
+      不计入本次的论文数和吞吐量。
+    """
+    check_options(refresh, job_timeout, fan_out, split, profile, store, pipeline, journal)
+    if profile:
+        max_workers = 1
+    if metrics is None:
+        metrics = Metrics()
+    metrics.start()
+    if fetcher is None:
+        fetcher = Fetcher(max_per_host=max_per_host, min_interval=min_interval,
+                          pool_size=max(max_workers, 1))
+    os.makedirs(output_dir, exist_ok=True)
+
+    if pid_index is not None:
+        pid_index.bulk_resolve([scientist for scientist, _ in jobs],
+                               lambda name: downloader.resolve_profile_url(name, fetcher),
+                               max_workers=max_workers)
+
+    runner = None
+    if journal is not None:
+        runner = JobRunner(journal, retries=retries, backoff=retry_backoff)
+        runner.register([(scientist, year,
+                          os.path.join(output_dir, default_output_name(scientist, year, split)))
+                         for scientist, year in jobs])
+
+    results = []
+    start = time.perf_counter()
+    if pipeline:
+        # 流水线自己管理各阶段的线程和进程
+        results = _run_pipeline(_group_jobs(jobs, output_dir, split), fetcher, pid_index,
+                                max_workers, parse_workers, Metrics(), store)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            if fan_out:
+                futures = [
+                    pool.submit(_run_group, scientist, group, fetcher, pid_index, job_timeout,
+                                profile, store)
+                    for scientist, group in _group_jobs(jobs, output_dir, split).items()
+                ]
+                for future in as_completed(futures):
+                    results.extend(future.result())
+            else:
+                futures = [
+                    pool.submit(_run_job, scientist, year,
+                                os.path.join(output_dir,
+                                             default_output_name(scientist, year, split)),
+                                fetcher, pid_index, refresh, job_timeout, profile, store, runner)
+                    for scientist, year in jobs
+                ]
+                for future in as_completed(futures):
+                    results.append(future.result())
+    elapsed = time.perf_counter() - start
+    if runner is not None and not isinstance(journal, Journal):
+        runner.close()
+    for r in results:
+        if "metrics" in r:
+            metrics.merge(r["metrics"])
+    fulltext_summary = None
+    if fulltext is not None:
+        # 全文下载不计入上面的任务耗时和吞吐量，但它的计时和字节数计入 metrics
+        papers = []
+        for r in results:
+            if r.get("success"):
+                for path in _output_files(r):
+                    papers.extend(read_output(path)[1])
+        fulltext_summary = summarize(fulltext.fetch_papers(papers))
+    metrics.stop()
+
+    succeeded = [r for r in results if r.get("success")]
+    skipped = sum(1 for r in succeeded if r.get("status") == "skipped")
+    papers = sum(r.get("count", 0) for r in succeeded if r.get("status") != "skipped")
+    stats = {
+        "jobs": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "skipped": skipped,
+        "papers": papers,
+        "elapsed": elapsed,
+        "scientists_per_sec": len(results) / elapsed if elapsed > 0 else 0.0,
+        "papers_per_sec": papers / elapsed if elapsed > 0 else 0.0,
+    }
+    report = {"results": results, "stats": stats, "metrics": metrics.summary()}
+    if fulltext_summary is not None:
+        report["fulltext"] = fulltext_summary
+    return report
+
+
+def _output_files(result):
+    """
+    成功任务写出的文件：拆分时为 "outputs" 中的各文件，模板路径按占位符匹配已有的文件
+    （不包括增量刷新的 .state.json 状态文件）。
+    """
+    if "outputs" in result:
+        return [path for path in result["outputs"] if os.path.exists(path)]
+    output_file = result.get("output_file")
+    if not output_file:
+        return []
+    if "{" in output_file:
+        paths = glob.glob(re.sub(r"\{[^}]*\}", "*", glob.escape(output_file)))
+        return sorted(path for path in paths if not path.endswith(incremental.STATE_SUFFIX))
+    return [output_file] if os.path.exists(output_file) else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量下载多位科学家的 dblp 论文列表")
+    parser.add_argument("jobs_file", help="任务文件，每行 \"科学家姓名,年份\"")
+    parser.add_argument("-o", "--output-dir", default=".", help="输出目录")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="全局并发数")
+    parser.add_argument("--per-host", type=int, default=4, help="同一主机的最大并发请求数")
+    parser.add_argument("--min-interval", type=float, default=0.0,
+                        help="同一主机两次请求的最小间隔（秒）")
+    parser.add_argument("--pid-index", metavar="PATH",
+                        help="姓名 -> 个人主页索引文件（SQLite），重复运行时跳过搜索")
+    parser.add_argument("--job-timeout", type=float, help="单个任务的截止时间（秒）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：只合并上次运行以来新增或修改的论文")
+    parser.add_argument("--cache-dir", help="HTTP 响应缓存目录，配合 --incremental 使用 304 重新验证")
+    parser.add_argument("--fan-out", action="store_true",
+                        help="同一科学家的多个任务只下载解析一次，分别写入各自的文件")
+    parser.add_argument("--split", choices=["year", "venue"],
+                        help="每个任务按年份或刊物拆分成多个输出文件")
+    parser.add_argument("--metrics-json", metavar="PATH", help="把分阶段指标写成 JSON 文件")
+    parser.add_argument("--metrics-prom", metavar="PATH",
+                        help="把分阶段指标写成 Prometheus textfile（*.prom）")
+    parser.add_argument("--profile", action="store_true",
+                        help="用 cProfile 采样每个任务（并发数降为 1），结果写入 --metrics-json")
+    parser.add_argument("--trace-memory", action="store_true", help="用 tracemalloc 记录峰值内存")
+    parser.add_argument("--store", metavar="PATH", help="把下载的论文写入本地论文库（SQLite）")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="分阶段流水线：网络请求用线程，解析用多进程（同一科学家只下载一次）")
+    parser.add_argument("--parse-workers", type=int, help="--pipeline 的解析进程数，默认为 CPU 核数")
+    parser.add_argument("--journal", metavar="PATH",
+                        help="任务日志：中断后用同一日志重新运行时跳过已完成的任务（见 jobs.py）")
+    parser.add_argument("--retries", type=int, default=2, help="--journal 模式下失败任务的重试次数")
+    parser.add_argument("--retry-backoff", type=float, default=1.0,
+                        help="--journal 模式下第一次重试前的等待时间（秒），之后每次加倍")
+    parser.add_argument("--fulltext", metavar="DIR",
+                        help="下载完成后把论文链接的全文（PDF）按内容去重保存到该目录（见 fulltext.py）")
+    parser.add_argument("--fulltext-workers", type=int, default=8, help="全文下载的并发数")
+    parser.add_argument("--fulltext-per-host", type=int, default=2,
+                        help="全文下载时同一主机的最大并发连接数")
+    args = parser.parse_args(argv)
+    try:
+        check_options(refresh=args.incremental, job_timeout=args.job_timeout,
+                      fan_out=args.fan_out, split=args.split, profile=args.profile,
+                      store=args.store, pipeline=args.pipeline, journal=args.journal)
+    except ValueError as e:
+        parser.error(str(e))
+
+    invalid = []
+    jobs = read_jobs(args.jobs_file, invalid)
+    for line, message in invalid:
+        print(f"跳过第 {line} 行: {message}")
+    pid_index = PidIndex(args.pid_index) if args.pid_index else None
+    fetcher = Fetcher(max_per_host=args.per_host, min_interval=args.min_interval,
+                      pool_size=max(args.workers, 1),
+                      cache=ResponseCache(args.cache_dir) if args.cache_dir else None)
+    metrics = Metrics(trace_memory=args.trace_memory)
+    fulltext = None
+    if args.fulltext:
+        fulltext = FullTextFetcher(args.fulltext, max_workers=args.fulltext_workers,
+                                   max_per_host=args.fulltext_per_host,
+                                   min_interval=args.min_interval, metrics=metrics)
+    report = run_batch(jobs, args.output_dir, max_workers=args.workers, fetcher=fetcher,
+                       pid_index=pid_index, refresh=args.incremental,
+                       job_timeout=args.job_timeout, fan_out=args.fan_out, split=args.split,
+                       metrics=metrics, profile=args.profile,
+                       store=PaperStore(args.store) if args.store else None,
+                       pipeline=args.pipeline, parse_workers=args.parse_workers,
+                       journal=args.journal, retries=args.retries,
+                       retry_backoff=args.retry_backoff, fulltext=fulltext)
+    if fulltext is not None:
+        fulltext.close()
+    if args.metrics_json:
+        with open(args.metrics_json, "w", encoding="utf-8") as f:
+            json.dump({"batch": report["metrics"], "stats": report["stats"],
+                       "jobs": report["results"]}, f, ensure_ascii=False, indent=2)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+
+    for r in report["results"]:
+        if not r.get("success"):
+            print(f"失败: {r['scientist']} ({r['year']}): "
+                  f"{r.get('error') or r.get('status', 'Unknown error')}")
+    s = report["stats"]
+    if s["skipped"]:
+        print(f"跳过 {s['skipped']} 个已完成的任务")
+    print(f"完成 {s['succeeded']}/{s['jobs']} 个任务，共 {s['papers']} 篇论文，"
+          f"耗时 {s['elapsed']:.2f}s，{s['scientists_per_sec']:.2f} 科学家/s，"
+          f"{s['papers_per_sec']:.2f} 论文/s")
+    if "fulltext" in report:
+        ft = report["fulltext"]
+        print(f"全文: {ft['links']} 个链接，新下载 {ft.get('downloaded', 0)}，"
+              f"已有 {ft.get('cached', 0) + ft.get('deduplicated', 0)}，"
+              f"跳过 {ft.get('rejected', 0) + ft.get('not_found', 0)}，失败 {ft.get('error', 0)}，"
+              f"{ft['bytes'] / 1e6:.1f} MB（续传 {ft['resumed_bytes'] / 1e6:.1f} MB）")
+    return 0 if s["failed"] == 0 and not invalid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
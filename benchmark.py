@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import dblp_api
+import downloader
+import extractor
+import fixtures
+from fetcher import Fetcher
+from metrics import Metrics
+from years import parse_years
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# paperdownloader 命令行工具的冷启动预算（秒）：解释器启动之外，导入入口模块的时间
+STARTUP_BUDGET = 0.1
+# 冷启动时不应加载的模块：图形界面，以及只在联网 / 解析 HTML 时才需要的依赖
+STARTUP_FORBIDDEN = ("pygame", "gui", "main", "requests", "bs4", "httpx", "selectolax", "asyncio")
+
+_STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import paperdownloader
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _time_parser(parse, content, repeat):
+    best = float("inf")
+    papers = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        papers = list(parse(content))
+        best = min(best, time.perf_counter() - start)
+    return best, papers
+
+
+def bench_backends(sample_path, repeat=5):
+    """
+    用保存的下载结果还原出 HTML 个人主页和 XML 个人记录，比较两条解析路径的
+    数据量、耗时和输出是否一致。
+    """
+    sample = fixtures.load_sample(sample_path)
+    html_page = fixtures.render_profile_html(sample)
+    xml_page = fixtures.render_person_xml(sample)
+
+    html_time, html_papers = _time_parser(downloader.iter_profile_papers, html_page, repeat)
+    xml_time, xml_papers = _time_parser(dblp_api.iter_person_papers, xml_page, repeat)
+
+    return {
+        "entries": len(sample["papers"]),
+        "identical": html_papers == xml_papers,
+        "html": {"bytes": len(html_page), "seconds": html_time,
+                 "entries_per_sec": len(html_papers) / html_time},
+        "xml": {"bytes": len(xml_page), "seconds": xml_time,
+                "entries_per_sec": len(xml_papers) / xml_time},
+    }
+
+
+def bench_engines(sample_path, repeat=3, scale=5):
+    """
+    比较各 HTML 解析引擎与最初实现（legacy）的吞吐量，并检查输出是否完全一致。
+    scale 把样本论文重复若干次，得到 1000+ 条目的大页面。
+    """
+    sample = fixtures.scale_sample(fixtures.load_sample(sample_path), scale)
+    page = fixtures.render_profile_html(sample)
+
+    legacy_time, legacy_papers = _time_parser(
+        lambda content: extractor.iter_entries(content, "legacy"), page, repeat)
+    report = {"entries": len(sample["papers"]), "bytes": len(page), "engines": {}}
+    for engine in extractor.available_engines():
+        if engine == "legacy":
+            seconds, papers = legacy_time, legacy_papers
+        else:
+            seconds, papers = _time_parser(
+                lambda content: extractor.iter_entries(content, engine), page, repeat)
+        report["engines"][engine] = {
+            "seconds": seconds,
+            "entries_per_sec": len(papers) / seconds,
+            "speedup": legacy_time / seconds,
+            "identical": papers == legacy_papers,
+        }
+    return report
+
+
+def _print_engines(report):
+    print(f"HTML 解析引擎（{report['entries']} 条，{report['bytes'] / 1024:.1f} KiB，"
+          f"HTML_PARSER={extractor.HTML_PARSER}）")
+    for name, r in report["engines"].items():
+        print(f"  {name:<10} {r['seconds'] * 1000:9.2f} ms  {r['entries_per_sec']:10.0f} 条/s  "
+              f"{r['speedup']:6.2f}x  一致: {r['identical']}")
+
+
+def bench_year_filter(sample_path, year, repeat=3, scale=5):
+    """单一年份/区间查询：跳过不匹配的年份分组 vs 全部解析后再过滤。"""
+    sample = fixtures.scale_sample(fixtures.load_sample(sample_path), scale)
+    page = fixtures.render_profile_html(sample)
+    years = parse_years(year)
+
+    def filtered(content, skip):
+        papers = extractor.iter_entries(content, years=years if skip else None)
+        return [p for p in papers if years.matches(p["year"])]
+
+    full_time, full_papers = _time_parser(lambda content: filtered(content, False), page, repeat)
+    skip_time, skip_papers = _time_parser(lambda content: filtered(content, True), page, repeat)
+    return {"entries": len(sample["papers"]), "years": str(years), "kept": len(skip_papers),
+            "full_seconds": full_time, "skip_seconds": skip_time,
+            "speedup": full_time / skip_time, "identical": full_papers == skip_papers}
+
+
+def _print_year_filter(report):
+    print(f"年份过滤 {report['years']}（{report['entries']} 条中保留 {report['kept']} 条）：全部解析 "
+          f"{report['full_seconds'] * 1000:.2f} ms，跳过分组 {report['skip_seconds'] * 1000:.2f} ms，"
+          f"{report['speedup']:.1f}x，一致: {report['identical']}")
+
+
+def _print_backends(report):
+    print(f"条目数: {report['entries']}，两种解析结果一致: {report['identical']}")
+    for name in ("html", "xml"):
+        r = report[name]
+        print(f"  {name:<5} {r['bytes'] / 1024:8.1f} KiB  {r['seconds'] * 1000:8.2f} ms  "
+              f"{r['entries_per_sec']:10.0f} 条/s")
+    speedup = report["html"]["seconds"] / report["xml"]["seconds"]
+    print(f"  xml 相对 html: 体积 {report['xml']['bytes'] / report['html']['bytes']:.2f}x，"
+          f"速度 {speedup:.2f}x")
+
+
+def _percentile(values, q):
+    """最近秩法百分位数，q 取 0-100。"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def peak_rss():
+    """进程峰值常驻内存（字节），不支持的平台返回 None。"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KiB，macOS 上是字节
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _latency_stats(values):
+    return {"p50": _percentile(values, 50), "p99": _percentile(values, 99),
+            "mean": sum(values) / len(values) if values else 0.0}
+
+
+def bench_end_to_end(samples, runs=5, backend="html", year=-1, latency=0.0, bandwidth=None,
+                     error_rate=0.0, seed=0):
+    """
+    对本地替身服务器端到端运行 download_papers，统计总耗时和各阶段耗时的 p50/p99、
+    吞吐量和峰值 RSS。页面在计时前预先渲染，服务器的开销只有注入的延迟和限速。
+
+    参数:
+      samples: 样本列表，每个样本对应一位科学家（见 fixtures.synthetic_sample）。
+      runs: 每个样本的运行次数。
+      latency / bandwidth / error_rate: 传给 fixtures.StandInServer。
+    """
+    report = {"backend": backend, "year": str(parse_years(year)), "runs": runs,
+              "latency": latency, "bandwidth": bandwidth, "error_rate": error_rate,
+              "profiles": {}}
+    with fixtures.StandInServer(samples, latency=latency, bandwidth=bandwidth,
+                                error_rate=error_rate, seed=seed) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        fetcher = Fetcher(base_url=server.base_url, retries=10, backoff=0.01, max_backoff=0.1)
+        for sample in samples:
+            server.render(sample["scientist"])
+            output_file = os.path.join(tmp, "out.json")
+            totals, stages, kept = [], {}, 0
+            for _ in range(runs):
+                metrics = Metrics()
+                start = time.perf_counter()
+                result = downloader.download_papers(sample["scientist"], year, output_file,
+                                                    fetcher=fetcher, backend=backend,
+                                                    metrics=metrics)
+                totals.append(time.perf_counter() - start)
+                kept = result["count"]
+                for name, timer in metrics.summary()["timers"].items():
+                    # 逐条计时的阶段取单条的平均耗时，其余取本次运行的总耗时
+                    value = timer["total"] / timer["count"] if name.endswith("_entry") else timer["total"]
+                    stages.setdefault(name, []).append(value)
+            entries = len(sample["papers"])
+            report["profiles"][sample["scientist"]] = {
+                "entries": entries,
+                "kept": kept,
+                "seconds": _latency_stats(totals),
+                "entries_per_sec": entries / _percentile(totals, 50),
+                "stages": {name: _latency_stats(values) for name, values in stages.items()},
+            }
+        fetcher.close()
+        report["requests"] = server.requests
+        report["injected_errors"] = server.errors
+    report["peak_rss_bytes"] = peak_rss()
+    return report
+
+
+def compare_baseline(report, baseline, tolerance=0.25):
+    """
+    与保存的基准结果比较，返回退化项列表（字符串）。耗时的 p50 超过基准的
+    (1 + tolerance) 倍，或吞吐量低于基准的 1 / (1 + tolerance) 时记为退化。
+    p99 噪声较大，只在超过 2 倍容差时报告。
+    """
+    regressions = []
+    for name, current in report["profiles"].items():
+        base = baseline.get("profiles", {}).get(name)
+        if base is None:
+            continue
+        checks = [("seconds", current["seconds"], base["seconds"])]
+        checks += [(f"stages.{stage}", current["stages"][stage], base["stages"][stage])
+                   for stage in current["stages"] if stage in base.get("stages", {})]
+        for label, cur, old in checks:
+            if old["p50"] > 0 and cur["p50"] > old["p50"] * (1 + tolerance):
+                regressions.append(f"{name} {label} p50: {old['p50'] * 1000:.2f} ms -> "
+                                   f"{cur['p50'] * 1000:.2f} ms")
+            if old["p99"] > 0 and cur["p99"] > old["p99"] * (1 + 2 * tolerance):
+                regressions.append(f"{name} {label} p99: {old['p99'] * 1000:.2f} ms -> "
+                                   f"{cur['p99'] * 1000:.2f} ms")
+        if current["entries_per_sec"] * (1 + tolerance) < base["entries_per_sec"]:
+            regressions.append(f"{name} 吞吐量: {base['entries_per_sec']:.0f} -> "
+                               f"{current['entries_per_sec']:.0f} 条/s")
+    base_rss, rss = baseline.get("peak_rss_bytes"), report.get("peak_rss_bytes")
+    if base_rss and rss and rss > base_rss * (1 + tolerance):
+        regressions.append(f"峰值 RSS: {base_rss / 2 ** 20:.1f} MiB -> {rss / 2 ** 20:.1f} MiB")
+    return regressions
+
+
+def _print_end_to_end(report):
+    print(f"端到端（backend={report['backend']}，year={report['year']}，每个样本 {report['runs']} 次，"
+          f"延迟 {report['latency'] * 1000:.0f} ms，错误率 {report['error_rate']:.0%}，"
+          f"请求 {report['requests']} 次，注入错误 {report['injected_errors']} 次）")
+    for name, r in report["profiles"].items():
+        s = r["seconds"]
+        print(f"  {name}（{r['entries']} 条，保留 {r['kept']}）: p50 {s['p50'] * 1000:.1f} ms  "
+              f"p99 {s['p99'] * 1000:.1f} ms  {r['entries_per_sec']:.0f} 条/s")
+        for stage, t in r["stages"].items():
+            unit = "µs" if stage.endswith("_entry") else "ms"
+            scale = 1e6 if unit == "µs" else 1e3
+            print(f"    {stage:<16} p50 {t['p50'] * scale:9.2f} {unit}  p99 {t['p99'] * scale:9.2f} {unit}")
+    if report["peak_rss_bytes"] is not None:
+        print(f"  峰值 RSS: {report['peak_rss_bytes'] / 2 ** 20:.1f} MiB")
+
+
+def bench_startup(runs=10, budget=STARTUP_BUDGET):
+    """
+    在全新的子进程中测量 paperdownloader 的冷启动：解释器本身的启动时间（python -c pass）、
+    导入入口模块的时间，以及 paperdownloader fetch --help 的总耗时，各取最好成绩。
+    同时检查冷启动后是否加载了 STARTUP_FORBIDDEN 中的模块。
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+
+    def wall(args):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=here, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+    interpreter, help_wall, imports, modules = [], [], [], []
+    for _ in range(runs):
+        interpreter.append(wall(["-c", "pass"]))
+        help_wall.append(wall(["paperdownloader.py", "fetch", "--help"]))
+        out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], cwd=here, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        probe = json.loads(out)
+        imports.append(probe["seconds"])
+        modules = probe["modules"]
+    loaded = [name for name in STARTUP_FORBIDDEN
+              if any(m == name or m.startswith(name + ".") for m in modules)]
+    return {"runs": runs, "budget": budget, "interpreter": min(interpreter),
+            "import": min(imports), "help": min(help_wall), "modules": len(modules),
+            "forbidden_loaded": loaded}
+
+
+def _print_startup(report):
+    print(f"冷启动（{report['runs']} 次取最好成绩，共加载 {report['modules']} 个模块）")
+    print(f"  解释器启动      {report['interpreter'] * 1000:7.1f} ms")
+    print(f"  import 入口模块 {report['import'] * 1000:7.1f} ms（预算 {report['budget'] * 1000:.0f} ms）")
+    print(f"  fetch --help    {report['help'] * 1000:7.1f} ms")
+    if report["forbidden_loaded"]:
+        print(f"  不应加载的模块: {', '.join(report['forbidden_loaded'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线基准测试（使用仓库中保存的下载结果作为样本）")
+    parser.add_argument("sample", nargs="?", default="Feng Zhao_all.json", help="保存的下载结果 JSON")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="每项重复次数，取最好成绩")
+    parser.add_argument("--scale", type=int, default=5, help="解析引擎测试中样本论文的重复倍数")
+    parser.add_argument("--year", default="2021", help="年份过滤测试的年份条件")
+    parser.add_argument("--e2e", action="store_true",
+                        help="只运行端到端测试：本地替身服务器 + 样本和合成的大主页")
+    parser.add_argument("--synthetic", type=int, default=10000, help="合成大主页的条目数，0 表示不用")
+    parser.add_argument("--runs", type=int, default=5, help="端到端测试中每个样本的运行次数")
+    parser.add_argument("--backend", choices=["html", "xml"], default="html")
+    parser.add_argument("--latency", type=float, default=0.0, help="注入的请求延迟（秒）")
+    parser.add_argument("--bandwidth", type=float, help="限速（字节/秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入 503 错误的概率")
+    parser.add_argument("--baseline", metavar="PATH", help="与该基准结果比较，有退化时返回 1")
+    parser.add_argument("--save-baseline", metavar="PATH", help="把端到端结果保存为新的基准")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="判定退化的相对容差")
+    parser.add_argument("--startup", action="store_true",
+                        help="只测量命令行工具的冷启动，超出预算或加载了不应加载的模块时返回 1")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET,
+                        help="冷启动预算（秒），只计导入入口模块的时间")
+    args = parser.parse_args(argv)
+    if args.startup:
+        report = bench_startup(args.runs, args.startup_budget)
+        _print_startup(report)
+        return 1 if report["forbidden_loaded"] or report["import"] > report["budget"] else 0
+    if not args.e2e:
+        _print_backends(bench_backends(args.sample, args.repeat))
+        _print_engines(bench_engines(args.sample, args.repeat, args.scale))
+        _print_year_filter(bench_year_filter(args.sample, args.year, args.repeat, args.scale))
+        if not (args.baseline or args.save_baseline):
+            return 0
+
+    samples = [fixtures.load_sample(args.sample)]
+    if args.synthetic:
+        samples.append(fixtures.synthetic_sample(args.synthetic))
+    report = bench_end_to_end(samples, args.runs, args.backend, latency=args.latency,
+                              bandwidth=args.bandwidth, error_rate=args.error_rate)
+    _print_end_to_end(report)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基准已保存至 {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_baseline(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"  退化: {line}")
+        print("与基准相比没有退化" if not regressions else f"共 {len(regressions)} 项退化")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
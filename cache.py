@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_DIR = ".dblp_cache"
+
+
+class CachedResponse:
+    """从缓存中取出的响应，提供 Fetcher 调用方用到的 requests.Response 接口子集。"""
+
+    def __init__(self, url, content, headers, status_code=200):
+        self.url = url
+        self.content = content
+        self.headers = headers
+        self.status_code = status_code
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ResponseCache:
+    """
+    按 URL 存储的磁盘响应缓存。每个条目包含 zlib 压缩后的响应体和校验信息
+    （ETag / Last-Modified），过期后由 Fetcher 发送条件请求重新验证。
+    总大小超过 max_bytes 时按最近最少使用（LRU）淘汰。
+
+    参数:
+      directory: 缓存目录。
+      ttl: 条目新鲜期（秒），期内直接命中、不发请求；0 表示每次都重新验证。
+      max_bytes: 缓存总大小上限（压缩后）。
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=3600, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+        # key -> (最近访问时间, 压缩后大小)
+        self._index = {}
+        for name in os.listdir(directory):
+            if name.endswith(".meta"):
+                key = name[:-len(".meta")]
+                try:
+                    meta = self._read_meta(key)
+                except (OSError, ValueError):
+                    continue
+                self._index[key] = (meta.get("accessed", 0), meta.get("size", 0))
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _read_meta(self, key):
+        with open(self._path(key, ".meta"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_meta(self, key, meta):
+        tmp = self._path(key, ".meta.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(key, ".meta"))
+
+    def _remove(self, key):
+        for suffix in (".meta", ".body"):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+        self._index.pop(key, None)
+
+    def lookup(self, url):
+        """返回 (meta, fresh)；没有缓存时返回 (None, False)。"""
+        key = self._key(url)
+        with self._lock:
+            if key not in self._index:
+                return None, False
+            try:
+                meta = self._read_meta(key)
+            except (OSError, ValueError):
+                self._remove(key)
+                return None, False
+        fresh = time.time() - meta["stored"] < self.ttl
+        return meta, fresh
+
+    def conditional_headers(self, meta):
+        """根据缓存的校验信息构造 If-None-Match / If-Modified-Since 请求头。"""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, url, meta, revalidated=False):
+        """读取缓存的响应体并更新 LRU 顺序；revalidated 为 True 表示刚收到 304。"""
+        key = self._key(url)
+        with self._lock:
+            try:
+                with open(self._path(key, ".body"), "rb") as f:
+                    content = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self._remove(key)
+                return None
+            now = time.time()
+            meta["accessed"] = now
+            if revalidated:
+                meta["stored"] = now
+                self.counters["revalidated"] += 1
+            else:
+                self.counters["hits"] += 1
+            self._write_meta(key, meta)
+            self._index[key] = (now, meta["size"])
+        return CachedResponse(url, content, meta.get("headers", {}))
+
+    def store(self, url, resp):
+        """保存一个 200 响应及其校验信息，必要时淘汰最久未用的条目。"""
+        key = self._key(url)
+        body = zlib.compress(resp.content)
+        now = time.time()
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "headers": {k: v for k, v in resp.headers.items()
+                        if k.lower() in ("content-type", "etag", "last-modified")},
+            "stored": now,
+            "accessed": now,
+            "size": len(body),
+        }
+        with self._lock:
+            tmp = self._path(key, ".body.tmp")
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._path(key, ".body"))
+            self._write_meta(key, meta)
+            self._index[key] = (now, len(body))
+            self.counters["stores"] += 1
+            self._evict()
+
+    def record_miss(self):
+        with self._lock:
+            self.counters["misses"] += 1
+
+    def _evict(self):
+        total = sum(size for _, size in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            self._remove(key)
+            self.counters["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """命中/未命中等计数器，以及当前条目数和总大小。"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self._index)
+            stats["bytes"] = sum(size for _, size in self._index.values())
+        return stats
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """任务被取消或超过截止时间。status 为 "cancelled" 或 "timeout"。"""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class CancelToken:
+    """
+    协作式取消令牌：调用方随时 cancel()，下载流程在各阶段之间和逐条解析时调用 check()。
+    可同时设置整体截止时间，超时与取消的区别体现在 status 上。
+
+    参数:
+      timeout: 从现在起的最长执行时间（秒），None 表示不限制。
+    """
+
+    def __init__(self, timeout=None):
+        self._event = threading.Event()
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def set_timeout(self, timeout):
+        """把截止时间收紧到从现在起 timeout 秒；已有更早的截止时间时保持不变。"""
+        deadline = time.monotonic() + timeout
+        if self.deadline is None or deadline < self.deadline:
+            self.deadline = deadline
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def status(self):
+        """None 表示可以继续，否则为 "cancelled" 或 "timeout"。"""
+        if self._event.is_set():
+            return "cancelled"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "timeout"
+        return None
+
+    def remaining(self):
+        """距截止时间的秒数；没有截止时间时返回 None。"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        status = self.status
+        if status is not None:
+            raise Cancelled(status)
+
+    def sleep(self, seconds):
+        """可被取消打断的 sleep，醒来后若已取消或超时则抛出 Cancelled。"""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._event.wait(seconds)
+        self.check()
@@ -0,0 +1,309 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import dblp_api
+import downloader
+from cancellation import CancelToken, Cancelled
+from fetcher import Fetcher
+from pid_index import PidIndex
+from writer import PaperWriter
+
+SETTINGS_FILE = "crawl.json"
+NODES_FILE = "nodes.jsonl"
+
+
+class CoauthorCrawler:
+    """
+    从一位科学家出发，沿合著关系按广度优先爬取 dblp 个人 XML 记录，得到合作网络。
+
+    待爬队列以 dblp PID 为键去重：无论经由多少位合作者到达，每个人的记录只请求一次。
+    每爬完一个人就向 directory/nodes.jsonl 追加一行
+    {"pid", "name", "depth", "papers", "coauthors": [[pid, name, 合作论文数], ...]}，
+    重新运行时从这个文件恢复已爬取的节点和待爬队列，中断后可以继续。
+
+    参数:
+      directory: 保存爬取结果的目录。
+      fetcher: 可选的 fetcher.Fetcher，默认新建一个。
+      max_depth: 最多离起点几跳（起点为 0）。
+      max_nodes: 最多爬取多少人（包括之前运行中已爬取的）。
+      max_workers: 并发请求数。
+      pid_index: 可选的 pid_index.PidIndex，用于解析起点姓名，并记下爬到的合作者主页。
+      papers_dir: 可选，同时把每个人的论文按 download_papers 的格式保存到该目录。
+      cancel_token: 可选的 cancellation.CancelToken，取消后已爬取的结果保留，可继续。
+      progress: 可选的回调 progress(event)，每爬完一个人调用一次。
+      sync_every: 每追加多少行调用一次 fsync。
+    """
+
+    def __init__(self, directory, fetcher=None, max_depth=2, max_nodes=1000, max_workers=8,
+                 pid_index=None, papers_dir=None, cancel_token=None, progress=None,
+                 sync_every=100):
+        self.directory = directory
+        self.fetcher = fetcher if fetcher is not None else Fetcher(pool_size=max(max_workers, 1))
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_workers = max_workers
+        self.pid_index = pid_index
+        self.papers_dir = papers_dir
+        self.cancel_token = cancel_token if cancel_token is not None else CancelToken()
+        self.progress = progress if progress is not None else (lambda event: None)
+        self.sync_every = sync_every
+        # pid -> (name, depth, papers)，只保存已爬取节点的摘要，合作者列表在磁盘上
+        self.nodes = {}
+        # pid -> (name, 最短跳数)，包括尚未爬取的节点
+        self.discovered = {}
+        self.failed = {}
+        self._heap = []
+        os.makedirs(directory, exist_ok=True)
+        if papers_dir:
+            os.makedirs(papers_dir, exist_ok=True)
+
+    @property
+    def nodes_path(self):
+        return os.path.join(self.directory, NODES_FILE)
+
+    def _discover(self, pid, name, depth):
+        known = self.discovered.get(pid)
+        if known is None or depth < known[1]:
+            self.discovered[pid] = (name, depth)
+            if pid not in self.nodes and depth <= self.max_depth:
+                heapq.heappush(self._heap, (depth, pid))
+
+    def _add_node(self, record):
+        pid, depth = record["pid"], record["depth"]
+        self.nodes[pid] = (record["name"], depth, record["papers"])
+        self._discover(pid, record["name"], depth)
+        for coauthor_pid, name, _ in record["coauthors"]:
+            self._discover(coauthor_pid, name, depth + 1)
+
+    def _load(self):
+        """读入之前的结果，丢弃中断时写了一半的最后一行。"""
+        if not os.path.exists(self.nodes_path):
+            return
+        valid = 0
+        with open(self.nodes_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid += len(line)
+                self._add_node(record)
+        if valid != os.path.getsize(self.nodes_path):
+            with open(self.nodes_path, "r+b") as f:
+                f.truncate(valid)
+
+    def _settings(self, seed):
+        """第一次运行时解析起点 PID 并记下；继续运行时检查起点是否一致。"""
+        path = os.path.join(self.directory, SETTINGS_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                settings = json.load(f)
+            if settings["seed"] != seed:
+                raise ValueError(f"{self.directory} 中是从 {settings['seed']} 开始的爬取结果")
+            return settings
+        profile_url = downloader.find_profile(seed, self.fetcher, "xml", self.pid_index,
+                                              self.cancel_token)
+        seed_pid = dblp_api.pid_from_url(profile_url)
+        if not seed_pid:
+            raise ValueError(f"找不到 {seed} 的 dblp 个人主页")
+        settings = {"seed": seed, "seed_pid": seed_pid}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, ensure_ascii=False)
+        return settings
+
+    def _fetch(self, pid, name):
+        profile_url = dblp_api.pid_url(pid, self.fetcher)
+        resp = self.fetcher.get(dblp_api.person_xml_url(profile_url),
+                                cancel_token=self.cancel_token)
+        coauthors = {}
+        papers = 0
+        writer = None
+        if self.papers_dir:
+            writer = PaperWriter(os.path.join(self.papers_dir, pid.replace("/", "_") + ".json"),
+                                 name, profile_url)
+        try:
+            for paper_info, authors in dblp_api.iter_person_records(resp.content):
+                self.cancel_token.check()
+                papers += 1
+                for author, author_pid in authors:
+                    if author_pid and author_pid != pid:
+                        entry = coauthors.setdefault(author_pid, [author, 0])
+                        entry[1] += 1
+                if writer is not None:
+                    writer.write(paper_info)
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        if writer is not None:
+            writer.commit()
+        return papers, [[author_pid, author, n] for author_pid, (author, n) in coauthors.items()]
+
+    def _next_jobs(self, inflight):
+        jobs = []
+        busy = set(inflight.values())
+        while (self._heap and len(inflight) + len(jobs) < self.max_workers
+               and len(self.nodes) + len(inflight) + len(jobs) < self.max_nodes):
+            depth, pid = heapq.heappop(self._heap)
+            # 已爬取、正在爬取，或之后找到了更短路径（堆中留下的旧条目）时跳过
+            if pid in self.nodes or pid in busy or self.discovered[pid][1] != depth:
+                continue
+            busy.add(pid)
+            jobs.append(pid)
+        return jobs
+
+    def crawl(self, seed):
+        """
+        从 seed（科学家姓名）开始爬取，直到达到 max_depth / max_nodes 或队列为空。
+
+        返回:
+          {"status": "ok" / "cancelled" / "timeout", "fetched": 本次新爬取的人数,
+           "nodes": 已爬取的总人数, "discovered": 已发现的总人数, "failed": {pid: 错误},
+           "elapsed": 秒}
+        """
+        start = time.perf_counter()
+        settings = self._settings(seed)
+        self._discover(settings["seed_pid"], seed, 0)
+        self._load()
+
+        status = "ok"
+        fetched = unsynced = 0
+        with open(self.nodes_path, "a", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            inflight = {}
+            try:
+                while True:
+                    for pid in self._next_jobs(inflight):
+                        name = self.discovered[pid][0]
+                        inflight[pool.submit(self._fetch, pid, name)] = pid
+                    if not inflight:
+                        break
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pid = inflight.pop(future)
+                        try:
+                            papers, coauthors = future.result()
+                        except Cancelled:
+                            raise
+                        except Exception as e:
+                            # 失败的节点不写入文件，下次运行时会重试
+                            self.failed[pid] = str(e)
+                            continue
+                        name, depth = self.discovered[pid]
+                        record = {"pid": pid, "name": name, "depth": depth, "papers": papers,
+                                  "coauthors": coauthors}
+                        out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+                                  + "\n")
+                        unsynced += 1
+                        if unsynced >= self.sync_every:
+                            out.flush()
+                            os.fsync(out.fileno())
+                            unsynced = 0
+                        if self.pid_index is not None:
+                            # 顺便记下新发现的合作者主页，以后按姓名下载时不必再搜索
+                            self.pid_index.store_many({
+                                coauthor: dblp_api.pid_url(coauthor_pid, self.fetcher)
+                                for coauthor_pid, coauthor, _ in coauthors
+                                if coauthor_pid not in self.discovered})
+                        self._add_node(record)
+                        fetched += 1
+                        self.progress({"stage": "node", "pid": pid, "name": name, "depth": depth,
+                                       "papers": papers, "coauthors": len(coauthors),
+                                       "nodes": len(self.nodes), "queued": len(self._heap)})
+            except Cancelled as e:
+                status = e.status
+                self.cancel_token.cancel()
+                for future in inflight:
+                    future.cancel()
+            except KeyboardInterrupt:
+                # 让正在进行的请求尽快停下，已写入的节点下次继续使用
+                self.cancel_token.cancel()
+                raise
+            finally:
+                out.flush()
+                os.fsync(out.fileno())
+
+        return {"status": status, "fetched": fetched, "nodes": len(self.nodes),
+                "discovered": len(self.discovered), "failed": dict(self.failed),
+                "elapsed": time.perf_counter() - start}
+
+
+def export_graph(directory, nodes_file="nodes.csv", edges_file="edges.csv"):
+    """
+    把 directory/nodes.jsonl 导出为紧凑的 CSV：
+      nodes.csv: pid,name,depth,papers（尚未爬取的边界节点 papers 为空）
+      edges.csv: source,target,weight（无向边，每对作者只出现一次，weight 为合作论文数）
+    返回 (节点数, 边数)。
+    """
+    nodes = {}
+    boundary = {}
+    edges = set()
+    with open(os.path.join(directory, NODES_FILE), "rb") as src, \
+            open(os.path.join(directory, edges_file), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "target", "weight"])
+        for line in src:
+            if not line.endswith(b"\n"):
+                break
+            record = json.loads(line)
+            pid, depth = record["pid"], record["depth"]
+            nodes[pid] = (record["name"], depth, record["papers"])
+            for coauthor_pid, name, weight in record["coauthors"]:
+                if coauthor_pid not in boundary or boundary[coauthor_pid][1] > depth + 1:
+                    boundary[coauthor_pid] = (name, depth + 1)
+                key = (pid, coauthor_pid) if pid < coauthor_pid else (coauthor_pid, pid)
+                if key not in edges:
+                    edges.add(key)
+                    writer.writerow([key[0], key[1], weight])
+    with open(os.path.join(directory, nodes_file), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["pid", "name", "depth", "papers"])
+        for pid, (name, depth, papers) in nodes.items():
+            writer.writerow([pid, name, depth, papers])
+        for pid, (name, depth) in boundary.items():
+            if pid not in nodes:
+                writer.writerow([pid, name, depth, ""])
+    return len(nodes) + sum(1 for pid in boundary if pid not in nodes), len(edges)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从一位科学家出发爬取 dblp 合著网络（可中断后继续）")
+    parser.add_argument("seed", help="起点科学家姓名")
+    parser.add_argument("-o", "--output-dir", default="crawl", help="结果目录，已有结果时继续爬取")
+    parser.add_argument("-d", "--max-depth", type=int, default=2, help="最多离起点几跳")
+    parser.add_argument("-n", "--max-nodes", type=int, default=1000, help="最多爬取多少人")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="并发请求数")
+    parser.add_argument("--per-host", type=int, default=4, help="同一主机的最大并发请求数")
+    parser.add_argument("--min-interval", type=float, default=0.0,
+                        help="同一主机两次请求的最小间隔（秒）")
+    parser.add_argument("--papers-dir", help="同时保存每个人的论文列表")
+    parser.add_argument("--pid-index", metavar="PATH", help="姓名 -> 个人主页索引文件（SQLite）")
+    args = parser.parse_args(argv)
+
+    fetcher = Fetcher(max_per_host=args.per_host, min_interval=args.min_interval,
+                      pool_size=max(args.workers, 1))
+    crawler = CoauthorCrawler(args.output_dir, fetcher, args.max_depth, args.max_nodes,
+                              args.workers, PidIndex(args.pid_index) if args.pid_index else None,
+                              args.papers_dir)
+    try:
+        stats = crawler.crawl(args.seed)
+    except KeyboardInterrupt:
+        print("已中断，重新运行同一命令即可继续")
+        return 1
+    node_count, edge_count = export_graph(args.output_dir)
+    print(f"本次爬取 {stats['fetched']} 人，共 {stats['nodes']} 人，已发现 {stats['discovered']} 人，"
+          f"失败 {len(stats['failed'])} 人，耗时 {stats['elapsed']:.2f}s；"
+          f"导出 {node_count} 个节点、{edge_count} 条边")
+    return 0 if stats["status"] == "ok" and not stats["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
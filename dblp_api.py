@@ -0,0 +1,131 @@
+import io
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
+
+DBLP_URL = "https://dblp.org"
+
+# dblp 个人记录 <r> 下可能出现的条目类型
+RECORD_TAGS = {
+    "article", "inproceedings", "proceedings", "incollection", "book",
+    "phdthesis", "mastersthesis", "www", "data",
+}
+
+
+def search_api_url(scientist, fetcher):
+    return fetcher.url("/search/author/api?format=json&h=1&q=" + quote(scientist))
+
+
+def parse_search_api(data):
+    """从作者搜索 API 的 JSON 结果中取出第一个匹配作者的主页 URL，没有时返回 ""。"""
+    hits = data.get("result", {}).get("hits", {}).get("hit", [])
+    if not hits:
+        return ""
+    return hits[0].get("info", {}).get("url", "")
+
+
+def resolve_profile_url(scientist, fetcher, cancel_token=None):
+    """
+    通过 dblp 作者搜索 API（JSON）查找科学家的个人主页 URL，找不到时返回 ""。
+    """
+    data = fetcher.get(search_api_url(scientist, fetcher), cancel_token=cancel_token).json()
+    return parse_search_api(data)
+
+
+def pid_from_url(profile_url):
+    """https://dblp.org/pid/181/2734(.html|.xml) -> "181/2734"，不是个人主页时返回 ""。"""
+    path = profile_url.split("/pid/", 1)[1] if "/pid/" in profile_url else ""
+    for suffix in (".html", ".xml"):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+    return path
+
+
+def pid_url(pid, fetcher):
+    return fetcher.url(f"/pid/{pid}")
+
+
+def person_xml_url(profile_url):
+    """https://dblp.org/pid/181/2734(.html) -> https://dblp.org/pid/181/2734.xml"""
+    if profile_url.endswith(".html"):
+        profile_url = profile_url[:-len(".html")]
+    return profile_url + ".xml"
+
+
+def _text(elem):
+    # 与 HTML 路径的 get_text(strip=True) 保持一致：各段文本分别去空白后直接拼接
+    return "".join(part.strip() for part in elem.itertext())
+
+
+def record_authors(record):
+    """条目（或 dblp 数据转储中 homepages/ 记录）的作者姓名列表。"""
+    return [_text(a) for a in record.findall("author")]
+
+
+def record_paper_info(record):
+    """把一条 dblp XML 条目（<article> / <inproceedings> 等）转换为 paper_info。"""
+    paper_info = {}
+    paper_info["authors"] = record_authors(record)
+
+    title = record.find("title")
+    paper_info["title"] = _text(title) if title is not None else ""
+
+    # HTML 页面只对期刊论文（schema.org/Periodical）给出刊物和卷号
+    venue_info = {}
+    journal = record.find("journal")
+    if record.tag == "article" and journal is not None:
+        venue_info["name"] = _text(journal)
+        volume = record.find("volume")
+        if volume is not None:
+            venue_info["volume"] = _text(volume)
+    paper_info["venue"] = venue_info
+
+    ee = record.find("ee")
+    paper_info["arxiv_link"] = _text(ee) if ee is not None else ""
+
+    year = record.find("year")
+    paper_info["year"] = _text(year) if year is not None else ""
+    return paper_info
+
+
+def iter_person_papers(source, years=None):
+    """
+    流式解析 dblp 个人 XML 记录（/pid/<id>.xml），逐条产出与 HTML 路径相同结构的 paper_info。
+    每处理完一条记录就清空对应元素，内存占用与记录数无关。
+
+    参数:
+      source: bytes 或文件对象。
+      years: 可选的 years.YearFilter；年份不匹配的记录只读取 <year>，不提取其他字段。
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end":
+            continue
+        if elem.tag in RECORD_TAGS:
+            if years is None or years.matches(elem.findtext("year", "").strip()):
+                yield record_paper_info(elem)
+        elif elem.tag == "r":
+            elem.clear()
+            root.clear()
+
+
+def iter_person_records(source):
+    """
+    与 iter_person_papers 相同，但每条记录额外给出作者的 dblp PID：
+    产出 (paper_info, [(作者姓名, pid), ...])，没有 pid 属性的作者 pid 为 ""。
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end":
+            continue
+        if elem.tag in RECORD_TAGS:
+            authors = [(_text(a), a.get("pid", "")) for a in elem.findall("author")]
+            yield record_paper_info(elem), authors
+        elif elem.tag == "r":
+            elem.clear()
+            root.clear()
@@ -1,9 +1,163 @@
-import requests
-from bs4 import BeautifulSoup
-import json
 import os
+from urllib.parse import quote
 
-def download_papers(scientist, year, output_file):
+import dblp_api
+import extractor
+import offline
+from cancellation import CancelToken, Cancelled
+from metrics import Metrics
+from partition import Partition, PartitionRouter, as_partition, union_years
+from years import parse_years
+
+# 下载流程写成产出 I/O 操作的生成器（见 _download_steps），同步和异步版本只是
+# 执行这些操作的方式不同：_Fetch 由 Fetcher / AsyncFetcher 完成，_Offload 在
+# 同步版本中直接调用，在异步版本中放到线程池执行，避免解析阻塞事件循环。
+# asyncio、fetcher（requests / httpx）和 bs4 都在用到时才导入：离线后端和
+# 命令行工具（paperdownloader.py）的冷启动不需要加载它们。
+
+class _Fetch:
+    __slots__ = ("url",)
+
+    def __init__(self, url):
+        self.url = url
+
+class _Offload:
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+def _run_sync(steps, fetcher, cancel_token=None):
+    """用阻塞的 Fetcher 执行 steps 产出的操作，返回生成器的返回值。"""
+    send, value = steps.send, None
+    while True:
+        try:
+            op = send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            if isinstance(op, _Fetch):
+                value = fetcher.get(op.url, cancel_token=cancel_token)
+            else:
+                value = op.fn()
+            send = steps.send
+        except BaseException as e:
+            # 把异常抛回生成器，让它清理临时文件并决定如何返回
+            send, value = steps.throw, e
+
+async def _run_async(steps, fetcher, cancel_token, executor=None):
+    """用 AsyncFetcher 执行 steps 产出的操作，_Offload 在 executor 中执行。"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    send, value = steps.send, None
+    while True:
+        try:
+            op = send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            if isinstance(op, _Fetch):
+                value = fetcher.get(op.url, cancel_token=cancel_token)
+                if asyncio.iscoroutine(value):
+                    value = await value
+            else:
+                future = loop.run_in_executor(executor, op.fn)
+                try:
+                    value = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # 任务被取消时先让线程中的解析停下来，再清理输出文件
+                    cancel_token.cancel()
+                    try:
+                        await future
+                    except BaseException:
+                        pass
+                    raise
+            send = steps.send
+        except BaseException as e:
+            send, value = steps.throw, e
+
+def _search_steps(scientist, fetcher, backend="html"):
+    """产出搜索请求，返回个人主页 URL（找不到时为 ""）。"""
+    if backend == "xml":
+        search_resp = yield _Fetch(dblp_api.search_api_url(scientist, fetcher))
+        return dblp_api.parse_search_api(search_resp.json())
+    from bs4 import BeautifulSoup
+    search_url = fetcher.url("/search?q=" + quote(scientist))
+    print(f"搜索 URL: {search_url}")
+
+    # 获取搜索结果
+    search_resp = yield _Fetch(search_url)
+    search_soup = BeautifulSoup(search_resp.content, "html.parser")
+    profile_link_tag = search_soup.find("a", href=lambda href: href and "/pid/" in href)
+    if not profile_link_tag:
+        return ""
+    return fetcher.url(profile_link_tag["href"])
+
+def _find_profile_steps(scientist, fetcher, backend="html", pid_index=None):
+    if backend == "offline":
+        # 离线索引本身就是本地的姓名索引，不经过 pid_index
+        return fetcher.lookup(scientist)
+    if pid_index is not None:
+        profile_url = pid_index.lookup(scientist)
+        if profile_url is not None:
+            return profile_url
+    profile_url = yield from _search_steps(scientist, fetcher, backend)
+    if pid_index is not None:
+        pid_index.store_many({scientist: profile_url})
+    return profile_url
+
+def resolve_profile_url(scientist, fetcher, cancel_token=None):
+    """通过 dblp 搜索页找到科学家的个人主页 URL，找不到时返回 ""。"""
+    return _run_sync(_search_steps(scientist, fetcher), fetcher, cancel_token)
+
+def iter_profile_papers(content, engine=None, years=None):
+    """解析个人主页 HTML，逐条产出 paper_info，解析引擎见 extractor.iter_entries。"""
+    return extractor.iter_entries(content, engine, years)
+
+def find_profile(scientist, fetcher, backend="html", pid_index=None, cancel_token=None):
+    """解析科学家的个人主页 URL，提供 pid_index 时优先查索引。找不到时返回 ""。"""
+    return _run_sync(_find_profile_steps(scientist, fetcher, backend, pid_index), fetcher,
+                     cancel_token)
+
+def profile_request_url(profile_url, backend="html"):
+    """个人主页（html）或个人 XML 记录（xml）的地址。"""
+    if backend == "xml":
+        return dblp_api.person_xml_url(profile_url)
+    return profile_url
+
+def parse_profile(content, backend="html", engine=None, years=None):
+    """按 backend 解析个人主页、XML 记录或离线索引的记录，返回 paper_info 迭代器。"""
+    if backend == "xml":
+        return dblp_api.iter_person_papers(content, years)
+    if backend == "offline":
+        return offline.iter_papers(content, years)
+    return iter_profile_papers(content, engine, years)
+
+def fetch_profile(profile_url, fetcher, backend="html", engine=None, cancel_token=None,
+                  years=None):
+    """
+    获取个人主页（或 XML 记录），返回 (响应, paper_info 迭代器)。
+    响应来自缓存时带有 from_cache 属性。提供 years 时尽量跳过不匹配年份的条目，
+    但调用方仍需自行过滤。
+    """
+    profile_resp = fetcher.get(profile_request_url(profile_url, backend), cancel_token=cancel_token)
+    return profile_resp, parse_profile(profile_resp.content, backend, engine, years)
+
+def count_entries(content, backend="html", years=None):
+    """不解析页面，快速数出（匹配年份分组内的）论文条目数，用于进度显示。"""
+    if backend == "xml":
+        return content.count(b"<r>")
+    if backend == "offline":
+        return content.count(b"\n")
+    return extractor.select_year_sections(content, years).count(b'<cite class="data')
+
+def year_matches(year, paper_year):
+    """year 可以是 -1（不过滤）、单个年份、区间或集合，见 years.parse_years。"""
+    return parse_years(year).matches(paper_year)
+
+def download_papers(scientist, year, output_file, fetcher=None, backend="html", pid_index=None,
+                    engine=None, output_format=None, compression=None, progress=None,
+                    cancel_token=None, timeout=None, metrics=None, store=None):
     """
     下载指定科学家在给定年份的论文，并保存到 JSON 文件中。
     当 year 为 -1 时，下载所有年份的数据。
@@ -11,92 +165,227 @@ def download_papers(scientist, year, output_file):
     参数:
       scientist: 科学家姓名，用于在 dblp 搜索。
       year: 年份过滤条件，只有年份匹配的论文会被保存；传入 -1 时不过滤。
-      output_file: 保存输出 JSON 文件的路径及文件名。
+            也可以是区间或集合，如 "2019-2023"、"2018,2021"（见 years.parse_years）。
+      output_file: 保存输出 JSON 文件的路径及文件名。可以包含 {year} / {venue} 占位符，
+                   此时按年份/刊物拆分成多个文件（见 partition.Partition）。
+      fetcher: 可选的 fetcher.Fetcher，默认使用进程内共享的连接池；
+               测试时可传入指向本地替身服务器的实例。
+      backend: "html" 解析渲染后的个人主页；"xml" 使用 dblp 的搜索 API 和
+               /pid/<id>.xml 结构化记录，数据量更小、解析更快，输出结构相同；
+               "offline" 不访问网络，从 offline.build_index 构建的 dblp 数据转储索引中
+               读取，此时 fetcher 为 offline.OfflineIndex（默认为 offline.get_default_index()）。
+      pid_index: 可选的 pid_index.PidIndex，已解析过的姓名直接跳过搜索请求。
+      engine: HTML 解析引擎（"selectolax" / "soup" / "legacy"），默认自动选择最快的。
+      output_format: "json"（默认，与原来的输出完全相同）或 "jsonl"（每行一篇论文）。
+      compression: None / "gzip" / "zstd"。output_format 和 compression 省略时
+                   根据文件名推断（如 .jsonl.gz）。
+      progress: 可选的回调 progress(event)，event 为字典，"stage" 依次为
+                "resolved"（profile_url）、"fetched"（bytes, total）、
+                "parsing"（done, total, kept）和 "written"（count, bytes）。
+                回调在下载线程中执行；抛出异常会中止下载，且不会留下输出文件。
+      cancel_token: 可选的 cancellation.CancelToken，在网络请求之间和逐条解析时检查。
+      timeout: 整个下载的截止时间（秒），与 cancel_token 可同时使用。
+      metrics: 可选的 metrics.Metrics，用于开启 cProfile / tracemalloc 或导出 JSON、
+               Prometheus 文本；省略时内部新建一个。
+      store: 可选的 store.PaperStore，输出文件提交后把保存的论文写入本地库。
+    论文边提取边写入临时文件，全部完成后才原子地替换 output_file。
+
+    返回:
+      {"success": True, "status": "ok", "count": 论文数}，output_file 为模板时另有
+      "outputs"（见 download_partitioned）；被取消或超时时 success 为 False，
+      status 为 "cancelled" / "timeout"，并附带已解析的进度（count/parsed/total），
+      此时 output_file 保持原样。结果中的 "metrics" 为各阶段计时与计数的汇总：
+      计时器 search / profile_request / count_entries / parse / extract_entry（逐条）/
+      write_entry（逐条）/ commit / store（提供 store 时），计数器 profile_bytes /
+      entries_seen / entries_kept / bytes_written。
     """
-    search_url = "https://dblp.org/search?q=" + requests.utils.quote(scientist)
-    print(f"搜索 URL: {search_url}")
+    partition = Partition(output_file, year)
+    result = download_partitioned(scientist, [partition], fetcher, backend, pid_index, engine,
+                                  output_format, compression, progress, cancel_token, timeout,
+                                  metrics, store)
+    return _single_result(partition, result)
 
-    # 获取搜索结果
-    search_resp = requests.get(search_url)
-    search_soup = BeautifulSoup(search_resp.content, "html.parser")
-    profile_link_tag = search_soup.find("a", href=lambda href: href and "/pid/" in href)
+def download_partitioned(scientist, partitions, fetcher=None, backend="html", pid_index=None,
+                         engine=None, output_format=None, compression=None, progress=None,
+                         cancel_token=None, timeout=None, metrics=None, store=None):
+    """
+    只搜索、获取和解析一次个人主页，把论文同时写入多个分区输出。
+    N 个分区的开销是一次搜索、一次主页请求和一次解析。
+
+    参数:
+      partitions: partition.Partition 列表，或 (output_file, year[, venue]) 元组 /
+                  {"output_file", "year", "venue"} 字典的列表。例如
+                  [("x_2019.json", 2019), ("x_2020.json", 2020)]，或单个模板
+                  [("x_{year}.json", "2019-2021")]，或按刊物 [("x_{venue}.json", -1)]。
+      其余参数同 download_papers。
+
+    返回:
+      同 download_papers，count 为至少写入一个分区的论文数，另有
+      "outputs": {文件路径: 论文数} 和 "partitions": [每个分区的论文数]。
+      被取消或超时时所有输出文件都保持原样。
+    """
+    if fetcher is None and backend == "offline":
+        fetcher = offline.get_default_index()
+    if fetcher is None:
+        from fetcher import get_default_fetcher
+        fetcher = get_default_fetcher()
+    if cancel_token is None:
+        cancel_token = CancelToken()
+    steps = _download_steps(scientist, partitions, fetcher, backend, pid_index, engine,
+                            output_format, compression, progress, cancel_token, timeout, metrics,
+                            store)
+    return _run_sync(steps, fetcher, cancel_token)
+
+async def download_papers_async(scientist, year, output_file, fetcher=None, backend="html",
+                                pid_index=None, engine=None, output_format=None, compression=None,
+                                progress=None, cancel_token=None, timeout=None, metrics=None,
+                                store=None, executor=None):
+    """
+    download_papers 的 asyncio 版本，输出文件和返回值完全相同。
+    网络请求由 fetcher.AsyncFetcher（httpx，可选 HTTP/2，信号量限制并发）完成，
+    解析和写文件在 executor（默认为事件循环的线程池）中执行，不阻塞事件循环。
+
+    参数:
+      fetcher: fetcher.AsyncFetcher；省略时为本次调用新建一个并在结束时关闭。
+               并发下载多位科学家时应共享同一个实例以复用连接。
+               backend 为 "offline" 时为 offline.OfflineIndex。
+      executor: 执行解析的 concurrent.futures 执行器，默认 None（loop 的默认线程池）。
+      其余参数同 download_papers；progress 回调可能在线程池中执行。
+    取消运行中的任务（Task.cancel()）时同样不会留下输出文件。
+    """
+    partition = Partition(output_file, year)
+    result = await download_partitioned_async(scientist, [partition], fetcher, backend, pid_index,
+                                              engine, output_format, compression, progress,
+                                              cancel_token, timeout, metrics, store, executor)
+    return _single_result(partition, result)
+
+async def download_partitioned_async(scientist, partitions, fetcher=None, backend="html",
+                                     pid_index=None, engine=None, output_format=None,
+                                     compression=None, progress=None, cancel_token=None,
+                                     timeout=None, metrics=None, store=None, executor=None):
+    """download_partitioned 的 asyncio 版本，参数见 download_papers_async。"""
+    if fetcher is None and backend == "offline":
+        fetcher = offline.get_default_index()
+    if fetcher is None:
+        from fetcher import AsyncFetcher
+        async with AsyncFetcher() as fetcher:
+            return await download_partitioned_async(scientist, partitions, fetcher, backend,
+                                                    pid_index, engine, output_format,
+                                                    compression, progress, cancel_token,
+                                                    timeout, metrics, store, executor)
+    if cancel_token is None:
+        cancel_token = CancelToken()
+    steps = _download_steps(scientist, partitions, fetcher, backend, pid_index, engine,
+                            output_format, compression, progress, cancel_token, timeout, metrics,
+                            store)
+    return await _run_async(steps, fetcher, cancel_token, executor)
+
+def _single_result(partition, result):
+    del result["partitions"]
+    if not partition.templated:
+        del result["outputs"]
+    return result
+
+def _parse_and_write(content, router, backend, engine, years, progress, cancel_token, metrics,
+                     state, kept):
+    """解析个人主页并写入各分区，是流程中唯一的 CPU 密集阶段。进度记录在 state 中。"""
+    with metrics.timer("count_entries"):
+        state["total"] = total = count_entries(content, backend, years)
+    progress({"stage": "fetched", "bytes": len(content), "total": total})
+
+    papers = parse_profile(content, backend, engine, years)
+    with metrics.timer("parse"):
+        for done, paper_info in enumerate(metrics.timed_iter("extract_entry", papers), 1):
+            cancel_token.check()
+            # 按各分区的年份/刊物条件写入，year 为 -1 的分区不过滤
+            with metrics.timer("write_entry"):
+                if router.write(paper_info) and kept is not None:
+                    kept.append(paper_info)
+            state["done"] = done
+            progress({"stage": "parsing", "done": done, "total": total, "kept": router.count})
+
+def _commit(router, metrics, store, scientist, profile_url, kept):
+    with metrics.timer("commit"):
+        router.commit()
+    if store is not None and kept:
+        with metrics.timer("store"):
+            store.ingest(scientist, profile_url, kept)
+
+def _download_steps(scientist, partitions, fetcher, backend, pid_index, engine, output_format,
+                    compression, progress, cancel_token, timeout, metrics, store=None):
+    """
+    下载流程本身：产出 _Fetch / _Offload 操作，由 _run_sync 或 _run_async 执行，
+    最后返回结果字典。同步和异步版本共用这一份代码，不会出现行为差异。
+    """
+    if progress is None:
+        progress = lambda event: None
+    partitions = [as_partition(p) for p in partitions]
+    years = union_years(partitions)
+    if timeout is not None:
+        cancel_token.set_timeout(timeout)
+
+    if metrics is None:
+        metrics = Metrics()
+    metrics.start()
 
-    result = []
     profile_url = ""
-    if profile_link_tag:
-        profile_url = profile_link_tag["href"]
-        if not profile_url.startswith("http"):
-            profile_url = "https://dblp.org" + profile_url
-        
-        # 获取个人主页内容
-        profile_resp = requests.get(profile_url)
-        profile_soup = BeautifulSoup(profile_resp.content, "html.parser")
-        
-        # 查找所有论文条目
-        papers = profile_soup.find_all("cite", class_="data tts-content")
-    
-        for paper in papers:
-            paper_info = {}
-            
-            # 提取作者列表
-            authors = []
-            for author_span in paper.find_all("span", itemprop="author"):
-                name_span = author_span.find("span", itemprop="name")
-                if name_span:
-                    authors.append(name_span.get_text(strip=True))
-            paper_info["authors"] = authors
-            
-            # 提取论文标题
-            title_span = paper.find("span", class_="title")
-            paper_info["title"] = title_span.get_text(strip=True) if title_span else ""
-            
-            # 提取会议信息
-            venue_info = {}
-            venue_tag = paper.find("span", itemprop="isPartOf", itemtype="http://schema.org/Periodical")
-            if venue_tag:
-                name_tag = venue_tag.find("span", itemprop="name")
-                if name_tag:
-                    venue_info["name"] = name_tag.get_text(strip=True)
-                volume_tag = paper.find("span", itemprop="isPartOf", itemtype="http://schema.org/PublicationVolume")
-                if volume_tag:
-                    vol_span = volume_tag.find("span", itemprop="volumeNumber")
-                    if vol_span:
-                        venue_info["volume"] = vol_span.get_text(strip=True)
-            paper_info["venue"] = venue_info
-            
-            # 提取arXiv链接
-            arxiv_link = ""
-            publ_nav = paper.find_next("nav", class_="publ")
-            if publ_nav:
-                head_div = publ_nav.find("div", class_="head")
-                if head_div:
-                    arxiv_tag = head_div.find("a", href=True)
-                    if arxiv_tag:
-                        arxiv_link = arxiv_tag["href"]
-            paper_info["arxiv_link"] = arxiv_link
-            
-            # 提取年份
-            year_span = paper.find("span", itemprop="datePublished")
-            paper_year = year_span.get_text(strip=True) if year_span else ""
-            paper_info["year"] = paper_year
-            
-            # 根据年份过滤论文，year 为 -1 时不过滤
-            if int(year) == -1 or str(year) == paper_year:
-                result.append(paper_info)
-
-    # 保存到 JSON 文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            "scientist": scientist,
-            "profile_url": profile_url,
-            "papers": result
-        }, f, ensure_ascii=False, indent=2)
-
-    print(f"数据已保存至 {os.path.abspath(output_file)}")
+    router = None
+    state = {"done": 0, "total": 0}
+    kept = [] if store is not None else None
+    try:
+        cancel_token.check()
+        with metrics.timer("search"):
+            profile_url = yield from _find_profile_steps(scientist, fetcher, backend, pid_index)
+        progress({"stage": "resolved", "profile_url": profile_url})
+        cancel_token.check()
+
+        router = PartitionRouter(partitions, scientist, profile_url, output_format, compression)
+        try:
+            if profile_url:
+                # 获取个人主页内容
+                with metrics.timer("profile_request"):
+                    profile_resp = yield _Fetch(profile_request_url(profile_url, backend))
+                content = profile_resp.content
+                metrics.incr("profile_bytes", len(content))
+                yield _Offload(lambda: _parse_and_write(content, router, backend, engine, years,
+                                                        progress, cancel_token, metrics, state,
+                                                        kept))
+            cancel_token.check()
+        except BaseException:
+            router.abort()
+            raise
+        yield _Offload(lambda: _commit(router, metrics, store, scientist, profile_url, kept))
+    except Cancelled as e:
+        print(f"下载已中止（{e.status}），输出文件未改动")
+        cancelled = e.status
+    else:
+        cancelled = None
+    finally:
+        metrics.incr("entries_seen", state["done"])
+        if router is not None:
+            metrics.incr("entries_kept", router.count)
+            metrics.incr("bytes_written", router.bytes_written)
+        metrics.stop()
+
+    if cancelled:
+        return {"success": False, "status": cancelled, "profile_url": profile_url,
+                "count": router.count if router is not None else 0,
+                "parsed": state["done"], "total": state["total"], "outputs": {},
+                "partitions": [], "metrics": metrics.summary()}
+
+    progress({"stage": "written", "count": router.count, "bytes": router.bytes_written})
+
+    outputs = router.counts()
+    for path in outputs:
+        print(f"数据已保存至 {os.path.abspath(path)}")
 
     # 返回下载结果
-    return {"success": True, "count": len(result)}
+    return {"success": True, "status": "ok", "count": router.count, "outputs": outputs,
+            "partitions": router.partition_counts, "metrics": metrics.summary()}
 
-# 示例调用：
+# 命令行入口见 paperdownloader.py，例如 python downloader.py "Feng Zhao" -y 2021
 if __name__ == "__main__":
-    download_papers("Feng Zhao", 2021, "dblp_papers.json")
\ No newline at end of file
+    import sys
+
+    import paperdownloader
+    sys.exit(paperdownloader.main(["fetch"] + sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,279 @@
+import importlib.util
+import re
+
+# bs4 / selectolax 在第一次解析 HTML 时才导入，xml / offline 后端和命令行工具的冷启动不必为它们付出代价
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+HAS_SELECTOLAX = importlib.util.find_spec("selectolax") is not None
+
+PERIODICAL = "http://schema.org/Periodical"
+PUBLICATION_VOLUME = "http://schema.org/PublicationVolume"
+
+# dblp 主页按年份分组，每组以 <li class="year">2021</li> 开头
+YEAR_HEADER = re.compile(rb'<li class="year"[^>]*>\s*(\d{4})\s*</li>')
+
+_entry_strainer = None
+
+
+def _strainer():
+    """
+    只构建论文条目的子树，页面其余部分（导航栏、侧栏、脚本等）直接丢弃。
+    解析阶段 class 还是未拆分的原始字符串，所以用正则按单词匹配。
+    """
+    global _entry_strainer
+    if _entry_strainer is None:
+        from bs4 import SoupStrainer
+        _entry_strainer = SoupStrainer("li", class_=re.compile(r"(^|\s)entry(\s|$)"))
+    return _entry_strainer
+
+
+def available_engines():
+    """按速度从快到慢列出当前环境可用的解析引擎。"""
+    engines = []
+    if HAS_SELECTOLAX:
+        engines.append("selectolax")
+    engines.append("soup")
+    engines.append("legacy")
+    return engines
+
+
+def select_year_sections(content, years):
+    """
+    按年份分组直接在字节层面裁掉不需要的分组，只把匹配年份的分组交给解析器。
+    页面没有年份分组标题时原样返回。
+
+    参数:
+      content: 页面字节串。
+      years: years.YearFilter。
+    """
+    if years is None or years.all:
+        return content
+    headers = list(YEAR_HEADER.finditer(content))
+    if not headers:
+        return content
+    parts = [content[:headers[0].start()]]
+    for i, header in enumerate(headers):
+        year = header.group(1).decode("ascii")
+        if years.before_range(year):
+            break
+        if years.matches(year):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+            parts.append(content[header.start():end])
+    return b"".join(parts)
+
+
+def _nav_link(nav):
+    if nav is None:
+        return ""
+    head_div = nav.find("div", class_="head")
+    if head_div is None:
+        return ""
+    link_tag = head_div.find("a", href=True)
+    return link_tag["href"] if link_tag else ""
+
+
+def _inside(tag, ancestor):
+    parent = tag.parent
+    while parent is not None:
+        if parent is ancestor:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _entry_info_soup(entry):
+    """
+    单次遍历 cite 子树提取一条论文信息。每个标签按 itemprop/class 分派，
+    结果与逐字段 find() 的旧实现一致（每类字段取第一次出现的值）。
+    """
+    nav = entry.find("nav", class_="publ", recursive=False)
+    cite = entry.find("cite", class_="data", recursive=False)
+    if cite is None:
+        return None
+
+    authors = []
+    title = None
+    venue_name = None
+    volume = None
+    has_periodical = False
+    year = None
+    author_span = None
+    periodical_span = None
+    volume_span = None
+
+    for tag in cite.find_all(True):
+        prop = tag.get("itemprop")
+        if prop == "author":
+            author_span = tag
+        elif prop == "isPartOf":
+            itemtype = tag.get("itemtype")
+            if itemtype == PERIODICAL and not has_periodical:
+                has_periodical = True
+                periodical_span = tag
+            elif itemtype == PUBLICATION_VOLUME and volume_span is None:
+                volume_span = tag
+        elif prop == "name" and tag.name == "span":
+            if author_span is not None and _inside(tag, author_span):
+                authors.append(tag.get_text(strip=True))
+                author_span = None
+            elif periodical_span is not None and _inside(tag, periodical_span):
+                venue_name = tag.get_text(strip=True)
+                periodical_span = None
+        elif prop == "volumeNumber" and volume is None and tag.name == "span":
+            if volume_span is not None and _inside(tag, volume_span):
+                volume = tag.get_text(strip=True)
+        elif prop == "datePublished" and year is None and tag.name == "span":
+            year = tag.get_text(strip=True)
+
+        if title is None and tag.name == "span" and "title" in tag.get("class", ()):
+            title = tag.get_text(strip=True)
+
+    venue_info = {}
+    if has_periodical:
+        if venue_name is not None:
+            venue_info["name"] = venue_name
+        if volume is not None:
+            venue_info["volume"] = volume
+
+    return {
+        "authors": authors,
+        "title": title or "",
+        "venue": venue_info,
+        "arxiv_link": _nav_link(nav),
+        "year": year or "",
+    }
+
+
+def _iter_soup(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=_strainer())
+    for entry in soup.find_all("li", class_="entry"):
+        paper_info = _entry_info_soup(entry)
+        # 处理完的条目立即释放，解析树不会随着输出累积
+        entry.decompose()
+        if paper_info is not None:
+            yield paper_info
+
+
+def _text(node):
+    return node.text(deep=True, separator="", strip=True)
+
+
+def _iter_selectolax(content):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(content)
+    for entry in tree.css("li.entry"):
+        cite = entry.css_first("cite.data")
+        if cite is None:
+            continue
+
+        authors = []
+        for author_span in cite.css('span[itemprop="author"]'):
+            name_span = author_span.css_first('span[itemprop="name"]')
+            if name_span is not None:
+                authors.append(_text(name_span))
+
+        title_span = cite.css_first("span.title")
+
+        venue_info = {}
+        venue_tag = cite.css_first(f'span[itemprop="isPartOf"][itemtype="{PERIODICAL}"]')
+        if venue_tag is not None:
+            name_tag = venue_tag.css_first('span[itemprop="name"]')
+            if name_tag is not None:
+                venue_info["name"] = _text(name_tag)
+            volume_tag = cite.css_first(f'span[itemprop="isPartOf"][itemtype="{PUBLICATION_VOLUME}"]')
+            if volume_tag is not None:
+                vol_span = volume_tag.css_first('span[itemprop="volumeNumber"]')
+                if vol_span is not None:
+                    venue_info["volume"] = _text(vol_span)
+
+        arxiv_link = ""
+        head_div = entry.css_first("nav.publ div.head")
+        if head_div is not None:
+            link_tag = head_div.css_first("a[href]")
+            if link_tag is not None:
+                arxiv_link = link_tag.attributes.get("href") or ""
+        year_span = cite.css_first('span[itemprop="datePublished"]')
+
+        yield {
+            "authors": authors,
+            "title": _text(title_span) if title_span is not None else "",
+            "venue": venue_info,
+            "arxiv_link": arxiv_link,
+            "year": _text(year_span) if year_span is not None else "",
+        }
+        entry.decompose()
+
+
+def _iter_legacy(content):
+    """最初的实现：html.parser 解析整页，每个字段单独 find()。保留用于对照和基准测试。"""
+    from bs4 import BeautifulSoup
+    profile_soup = BeautifulSoup(content, "html.parser")
+
+    # 查找所有论文条目
+    papers = profile_soup.find_all("cite", class_="data tts-content")
+
+    for paper in papers:
+        paper_info = {}
+
+        # 提取作者列表
+        authors = []
+        for author_span in paper.find_all("span", itemprop="author"):
+            name_span = author_span.find("span", itemprop="name")
+            if name_span:
+                authors.append(name_span.get_text(strip=True))
+        paper_info["authors"] = authors
+
+        # 提取论文标题
+        title_span = paper.find("span", class_="title")
+        paper_info["title"] = title_span.get_text(strip=True) if title_span else ""
+
+        # 提取会议信息
+        venue_info = {}
+        venue_tag = paper.find("span", itemprop="isPartOf", itemtype="http://schema.org/Periodical")
+        if venue_tag:
+            name_tag = venue_tag.find("span", itemprop="name")
+            if name_tag:
+                venue_info["name"] = name_tag.get_text(strip=True)
+            volume_tag = paper.find("span", itemprop="isPartOf", itemtype="http://schema.org/PublicationVolume")
+            if volume_tag:
+                vol_span = volume_tag.find("span", itemprop="volumeNumber")
+                if vol_span:
+                    venue_info["volume"] = vol_span.get_text(strip=True)
+        paper_info["venue"] = venue_info
+
+        # 提取arXiv链接（nav.publ 位于同一条目中 cite 之前）
+        paper_info["arxiv_link"] = _nav_link(paper.find_previous_sibling("nav", class_="publ"))
+
+        # 提取年份
+        year_span = paper.find("span", itemprop="datePublished")
+        paper_year = year_span.get_text(strip=True) if year_span else ""
+        paper_info["year"] = paper_year
+
+        yield paper_info
+
+
+_ENGINES = {
+    "selectolax": _iter_selectolax,
+    "soup": _iter_soup,
+    "legacy": _iter_legacy,
+}
+
+
+def iter_entries(content, engine=None, years=None):
+    """
+    解析个人主页 HTML，逐条产出 paper_info，每个论文条目只访问一次。
+
+    参数:
+      content: 页面字节串。
+      engine: "selectolax"（需安装 selectolax）、"soup"（BeautifulSoup + SoupStrainer，
+              安装了 lxml 时用 lxml 解析）或 "legacy"；默认选可用的最快引擎。
+      years: 可选的 years.YearFilter；不匹配的年份分组在解析前就被跳过。
+              产出的条目仍需调用方按年份过滤（没有分组标题的页面不会被裁剪）。
+    """
+    if engine is None:
+        engine = available_engines()[0]
+    if engine == "selectolax" and not HAS_SELECTOLAX:
+        raise ValueError("selectolax 未安装")
+    if engine not in _ENGINES:
+        raise ValueError(f"未知的解析引擎: {engine}")
+    return _ENGINES[engine](select_year_sections(content, years))
@@ -0,0 +1,322 @@
+import asyncio
+import email.utils
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from dblp_api import DBLP_URL
+
+# (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (5, 30)
+# 这些状态码视为临时错误，按指数退避重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    按主机限制请求速率：同一主机两次请求之间至少间隔 min_interval 秒。
+    多线程共享同一个实例时，请求会被依次排到各自的时间槽上。
+    """
+
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, host):
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回需要等待的秒数；无法解析时返回 None。"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HostLimiter:
+    """限制同一主机上同时进行的请求数，max_per_host <= 0 表示不限制。"""
+
+    def __init__(self, max_per_host=0):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def acquire(self, host):
+        if self.max_per_host <= 0:
+            return None
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+        sem.acquire()
+        return sem
+
+
+class Fetcher:
+    """
+    可复用的 HTTP 抓取层：共享连接池的 Session、连接/读取超时、
+    对 429/5xx 和网络错误的有限次指数退避重试（遵守 Retry-After），以及按主机限速。
+
+    参数:
+      base_url: dblp 站点根地址，测试时可替换为本地替身服务器。
+      timeout: (连接超时, 读取超时)。
+      retries: 最多重试次数（不含第一次请求）。
+      backoff: 退避基数，第 n 次重试前等待 backoff * 2**n 秒。
+      max_backoff: 单次等待上限。
+      min_interval: 同一主机两次请求的最小间隔。
+      max_per_host: 同一主机的最大并发请求数，0 表示不限制。
+      pool_size: 每个主机保持的连接数。
+      session: 可注入自定义的 requests.Session。
+      cache: 可选的 cache.ResponseCache；新鲜条目直接返回，过期条目发送条件请求，
+             收到 304 时复用缓存的响应体。
+    """
+
+    def __init__(self, base_url=DBLP_URL, timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff=0.5, max_backoff=30.0, min_interval=0.0, max_per_host=0,
+                 pool_size=10, session=None, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = RateLimiter(min_interval)
+        self.host_limiter = HostLimiter(max_per_host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.cache = cache
+
+    def url(self, path):
+        """把站内路径拼成完整 URL；已经是完整 URL 时原样返回。"""
+        if path.startswith("http"):
+            return path
+        return self.base_url + path
+
+    def _delay(self, attempt, resp=None):
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        if resp is not None:
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = min(self.max_backoff, retry_after)
+        return delay
+
+    def _timeout_for(self, cancel_token):
+        """有截止时间时，把连接/读取超时缩短到不超过剩余时间。"""
+        remaining = cancel_token.remaining() if cancel_token is not None else None
+        if remaining is None:
+            return self.timeout
+        remaining = max(remaining, 0.001)
+        if not isinstance(self.timeout, tuple):
+            return min(self.timeout, remaining)
+        connect, read = self.timeout
+        return (min(connect, remaining), min(read, remaining))
+
+    def _sleep(self, delay, cancel_token):
+        if cancel_token is not None:
+            cancel_token.sleep(delay)
+        else:
+            time.sleep(delay)
+
+    def _send(self, url, host, headers, cancel_token):
+        sem = self.host_limiter.acquire(host)
+        try:
+            self.rate_limiter.wait(host)
+            if cancel_token is not None:
+                cancel_token.check()
+            return self.session.get(url, headers=headers, timeout=self._timeout_for(cancel_token))
+        finally:
+            if sem is not None:
+                sem.release()
+
+    def get(self, url, headers=None, cancel_token=None):
+        """
+        GET 请求，带重试和可选的缓存。重试用尽后若仍是错误状态码则抛出 requests.HTTPError。
+        提供 cancel_token 时，每次尝试前和退避等待中都会检查取消/超时（抛出 Cancelled），
+        单次请求的超时也不会超过剩余时间。
+        """
+        url = self.url(url)
+        if self.cache is None:
+            return self._request(url, headers, cancel_token)
+
+        request_headers = headers
+        meta, fresh = self.cache.lookup(url)
+        if meta is not None:
+            if fresh:
+                cached = self.cache.load(url, meta)
+                if cached is not None:
+                    return cached
+            request_headers = dict(headers or {}, **self.cache.conditional_headers(meta))
+
+        resp = self._request(url, request_headers, cancel_token)
+        if resp.status_code == 304 and meta is not None:
+            cached = self.cache.load(url, meta, revalidated=True)
+            if cached is not None:
+                return cached
+            # 缓存的响应体已丢失，重新完整请求
+            resp = self._request(url, headers, cancel_token)
+
+        self.cache.record_miss()
+        if resp.status_code == 200:
+            self.cache.store(url, resp)
+        return resp
+
+    def _request(self, url, headers, cancel_token=None):
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            try:
+                resp = self._send(url, host, headers, cancel_token)
+            except (requests.ConnectionError, requests.Timeout):
+                if cancel_token is not None:
+                    cancel_token.check()
+                if attempt >= self.retries:
+                    raise
+                self._sleep(self._delay(attempt), cancel_token)
+                attempt += 1
+                continue
+
+            if resp.status_code in RETRY_STATUS and attempt < self.retries:
+                delay = self._delay(attempt, resp)
+                resp.close()
+                self._sleep(delay, cancel_token)
+                attempt += 1
+                continue
+
+            resp.raise_for_status()
+            return resp
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncFetcher:
+    """
+    Fetcher 的 asyncio 版本，基于 httpx.AsyncClient：连接池、可选 HTTP/2、
+    用信号量限制同时进行的请求数，重试和超时策略与 Fetcher 相同。
+    需要安装 httpx（HTTP/2 还需要 h2，即 pip install "httpx[http2]"）。
+
+    参数:
+      base_url / timeout / retries / backoff / max_backoff: 同 Fetcher。
+      max_concurrency: 同时进行的请求数上限，也是连接池大小。
+      http2: 是否启用 HTTP/2。
+      client: 可注入自定义的 httpx.AsyncClient（此时 http2 和连接池参数不生效）。
+    """
+
+    def __init__(self, base_url=DBLP_URL, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5,
+                 max_backoff=30.0, max_concurrency=10, http2=False, client=None):
+        if client is None:
+            if httpx is None:
+                raise ImportError("AsyncFetcher 需要安装 httpx：pip install httpx")
+            limits = httpx.Limits(max_connections=max_concurrency,
+                                  max_keepalive_connections=max_concurrency)
+            client = httpx.AsyncClient(http2=http2, limits=limits, follow_redirects=True)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    url = Fetcher.url
+    _delay = Fetcher._delay
+    _timeout_for = Fetcher._timeout_for
+
+    def _httpx_timeout(self, cancel_token):
+        timeout = self._timeout_for(cancel_token)
+        if not isinstance(timeout, tuple):
+            return httpx.Timeout(timeout)
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+
+    async def _sleep(self, delay, cancel_token):
+        if cancel_token is not None:
+            remaining = cancel_token.remaining()
+            if remaining is not None:
+                delay = min(delay, remaining)
+        await asyncio.sleep(delay)
+        if cancel_token is not None:
+            cancel_token.check()
+
+    async def get(self, url, headers=None, cancel_token=None):
+        """
+        GET 请求，带重试。重试用尽后若仍是错误状态码则抛出 httpx.HTTPStatusError。
+        cancel_token 的检查方式同 Fetcher.get。
+        """
+        url = self.url(url)
+        attempt = 0
+        while True:
+            if cancel_token is not None:
+                cancel_token.check()
+            try:
+                async with self.semaphore:
+                    resp = await self.client.get(url, headers=headers,
+                                                 timeout=self._httpx_timeout(cancel_token))
+            except httpx.TransportError:
+                if cancel_token is not None:
+                    cancel_token.check()
+                if attempt >= self.retries:
+                    raise
+                await self._sleep(self._delay(attempt), cancel_token)
+                attempt += 1
+                continue
+
+            if resp.status_code in RETRY_STATUS and attempt < self.retries:
+                await self._sleep(self._delay(attempt, resp), cancel_token)
+                attempt += 1
+                continue
+
+            resp.raise_for_status()
+            return resp
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        return False
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_default_fetcher():
+    """返回进程内共享的 Fetcher，使多次下载复用同一个连接池。"""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
@@ -0,0 +1,683 @@
+import gzip
+import hashlib
+import html
+import html.entities
+import http.server
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qs, quote, urlsplit
+from xml.sax.saxutils import escape, quoteattr
+
+# 根据仓库中已保存的下载结果（如 "Feng Zhao_all.json"）还原出 dblp 风格的页面，
+# 用于离线基准测试和本地替身服务器。页面结构参照 dblp 的个人主页和个人 XML 记录。
+
+PID = "181/2734"
+
+
+def load_sample(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def scale_sample(sample, factor):
+    """把样本中的论文重复 factor 次，模拟论文数很多的作者（保持按年份降序）。"""
+    papers = [paper for paper in sample["papers"] for _ in range(factor)]
+    return dict(sample, papers=papers)
+
+
+_WORDS = (
+    "learning deep graph neural network robust adaptive sparse distributed efficient "
+    "multi-scale attention segmentation detection classification remote sensing image "
+    "spatio-temporal federated optimization parallel fast inference model analysis "
+    "connectivity brain signal recognition transformer kernel estimation framework"
+).split()
+_VENUES = [
+    "IEEE Trans. Image Process.", "Pattern Recognit.", "Neurocomputing", "IEEE Access",
+    "Remote. Sens.", "Knowl. Based Syst.", "Inf. Sci.", "CoRR", "Expert Syst. Appl.",
+    "IEEE Trans. Neural Networks Learn. Syst.", "Sensors", "J. Comput. Sci. Technol.",
+]
+
+
+def synthetic_sample(n, scientist="Synthetic Author", seed=0, first_year=1980, last_year=2025):
+    """
+    生成 n 篇论文的合成样本（结构与下载结果相同，按年份降序），用于模拟 10k+ 条目的大主页。
+    相同的 seed 总是得到相同的样本。
+    """
+    rng = random.Random(seed)
+    papers = []
+    for i in range(n):
+        # 越近的年份论文越多，与真实作者的分布相近
+        year = last_year - int((last_year - first_year + 1) * rng.random() ** 2)
+        authors = [f"Author {rng.randrange(5000)}" for _ in range(rng.randint(1, 8))]
+        authors.insert(rng.randrange(len(authors) + 1), scientist)
+        title = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 12))).capitalize() + "."
+        if rng.random() < 0.6:
+            venue = {"name": rng.choice(_VENUES), "volume": str(rng.randint(1, 200))}
+        else:
+            venue = {}
+        link = f"https://doi.org/10.{rng.randint(1000, 9999)}/{i}" if rng.random() < 0.8 else ""
+        papers.append({"authors": authors, "title": title, "venue": venue,
+                       "arxiv_link": link, "year": str(year)})
+    papers.sort(key=lambda paper: paper["year"], reverse=True)
+    return {"scientist": scientist, "profile_url": "", "papers": papers}
+
+
+def synthetic_network(n_people, papers_per_person=10, max_coauthors=4, seed=0):
+    """
+    生成 n_people 位作者的样本列表，所有合作者都在这批作者中，合作的论文同时出现在
+    每位作者的样本里，用于测试合著者爬取。作者编号相近的人更常合作，
+    因此离起点越远的作者需要越多跳才能到达。
+    """
+    rng = random.Random(seed)
+    names = [f"Person {i}" for i in range(n_people)]
+    papers = {name: [] for name in names}
+    for i in range(n_people * papers_per_person // (max_coauthors // 2 + 1)):
+        base = rng.randrange(n_people)
+        group = {names[base]}
+        for _ in range(rng.randint(1, max_coauthors)):
+            group.add(names[(base + rng.randint(-3, 3)) % n_people])
+        authors = sorted(group, key=lambda name: rng.random())
+        paper = {"authors": authors, "title": f"Synthetic paper {i}.", "venue": {},
+                 "arxiv_link": "", "year": str(rng.randint(2000, 2025))}
+        for name in authors:
+            papers[name].append(paper)
+    return [{"scientist": name, "profile_url": "",
+             "papers": sorted(papers[name], key=lambda paper: paper["year"], reverse=True)}
+            for name in names]
+
+
+def _record_tag(paper):
+    return "article" if paper["venue"] else "inproceedings"
+
+
+def _record_key(paper):
+    # 由内容得到的稳定 key：插入或删除其他论文不会改变已有论文的 key，
+    # 合成转储的增量构建才能正确识别新增、修改和删除的记录
+    venue = paper["venue"].get("name", "") if paper["venue"] else ""
+    text = "|".join([paper["title"], paper["year"], venue])
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    return f"{'journals' if paper['venue'] else 'conf'}/x/{digest}"
+
+
+def render_search_html(profile_url):
+    """dblp 搜索结果页：第一个 /pid/ 链接即为匹配的作者。"""
+    return (
+        "<!DOCTYPE html><html><head><title>dblp: search</title></head><body>"
+        "<div id=\"completesearch-authors\"><ul class=\"result-list\">"
+        f"<li><a href=\"{html.escape(profile_url)}\">Match</a></li>"
+        "</ul></div></body></html>"
+    ).encode("utf-8")
+
+
+def render_search_json(profile_url, name=""):
+    """dblp 作者搜索 API（format=json）的返回结果。"""
+    return json.dumps({
+        "result": {"hits": {"@total": "1", "hit": [
+            {"info": {"author": name, "url": profile_url}}
+        ]}}
+    }).encode("utf-8")
+
+
+def _nav_html(link):
+    if link:
+        view = (
+            f"<li class=\"drop-down\"><div class=\"head\"><a href=\"{html.escape(link)}\">"
+            "<img alt=\"\" src=\"https://dblp.org/img/paper.dark.hollow.16x16.png\" class=\"icon\"></a></div>"
+            "<div class=\"body\"><p><b>view</b></p><ul>"
+            f"<li class=\"ee\"><a href=\"{html.escape(link)}\">electronic edition via DOI</a></li>"
+            "</ul></div></li>"
+        )
+    else:
+        # 没有电子版时 dblp 只显示灰色图标，不带链接
+        view = (
+            "<li class=\"drop-down\"><div class=\"head\">"
+            "<img alt=\"\" src=\"https://dblp.org/img/paper-unavail.dark.hollow.16x16.png\" class=\"icon\">"
+            "</div></li>"
+        )
+    menus = [
+        view,
+        "<li class=\"drop-down\"><div class=\"head\"><a href=\"https://dblp.org/rec/x.html?view=bibtex\">"
+        "<img alt=\"\" src=\"https://dblp.org/img/download.dark.hollow.16x16.png\" class=\"icon\"></a></div>"
+        "<div class=\"body\"><p><b>export record</b></p><ul>"
+        "<li><a href=\"https://dblp.org/rec/x.html?view=bibtex\">BibTeX</a></li>"
+        "<li><a href=\"https://dblp.org/rec/x.ris\">RIS</a></li>"
+        "<li><a href=\"https://dblp.org/rec/x.nt\">RDF N-Triples</a></li>"
+        "<li><a href=\"https://dblp.org/rec/x.xml\">XML</a></li></ul></div></li>",
+        "<li class=\"drop-down\"><div class=\"head\"><a href=\"https://dblp.org/rec/x.html\">"
+        "<img alt=\"\" src=\"https://dblp.org/img/link.dark.hollow.16x16.png\" class=\"icon\"></a></div>"
+        "<div class=\"body\"><p><b>share record</b></p><ul>"
+        "<li><a href=\"https://bsky.app/intent/compose\">Bluesky</a></li>"
+        "<li><a href=\"https://www.reddit.com/submit\">Reddit</a></li></ul></div></li>",
+    ]
+    return "<nav class=\"publ\"><ul>" + "".join(menus) + "</ul></nav>"
+
+
+def _cite_html(paper):
+    parts = ["<cite class=\"data tts-content\" itemprop=\"headline\">"]
+    authors = []
+    for name in paper["authors"]:
+        authors.append(
+            "<span itemprop=\"author\" itemscope itemtype=\"http://schema.org/Person\">"
+            "<a href=\"https://dblp.org/pid/00/0000.html\" itemprop=\"url\">"
+            f"<span itemprop=\"name\" title=\"{html.escape(name)}\">{html.escape(name)}</span></a></span>"
+        )
+    parts.append(", ".join(authors) + ":<br> ")
+    parts.append(f"<span class=\"title\" itemprop=\"name\">{html.escape(paper['title'])}</span> ")
+    venue = paper["venue"]
+    if venue:
+        parts.append(
+            "<a href=\"https://dblp.org/db/journals/x/x.html\">"
+            "<span itemprop=\"isPartOf\" itemscope itemtype=\"http://schema.org/Periodical\">"
+            f"<span itemprop=\"name\">{html.escape(venue.get('name', ''))}</span></span> "
+        )
+        if "volume" in venue:
+            parts.append(
+                "<span itemprop=\"isPartOf\" itemscope itemtype=\"http://schema.org/PublicationVolume\">"
+                f"<span itemprop=\"volumeNumber\">{html.escape(venue['volume'])}</span></span>"
+            )
+        parts.append("</a>")
+    else:
+        parts.append(
+            "<a href=\"https://dblp.org/db/conf/x/x.html\">"
+            "<span itemprop=\"isPartOf\" itemscope itemtype=\"http://schema.org/BookSeries\">"
+            "<span itemprop=\"name\">CONF</span></span></a>"
+        )
+    parts.append(f" (<span itemprop=\"datePublished\">{html.escape(paper['year'])}</span>)</cite>")
+    return "".join(parts)
+
+
+def render_profile_html(sample):
+    """把下载结果还原为 dblp 个人主页 HTML（按年份分组，条目内 nav 在 cite 之前）。"""
+    out = [
+        "<!DOCTYPE html><html><head><title>dblp: ",
+        html.escape(sample["scientist"]),
+        "</title></head><body><div id=\"main\"><div id=\"publ-section\" class=\"section\">",
+        "<ul class=\"publ-list\">",
+    ]
+    last_year = None
+    for i, paper in enumerate(sample["papers"]):
+        if paper["year"] != last_year:
+            last_year = paper["year"]
+            out.append(f"<li class=\"year\">{html.escape(last_year)}</li>")
+        tag = _record_tag(paper)
+        out.append(
+            f"<li class=\"entry {tag} toc\" id=\"{_record_key(paper)}\" itemscope "
+            "itemtype=\"http://schema.org/ScholarlyArticle\">"
+            "<div class=\"box\"><img alt=\"\" src=\"https://dblp.org/img/n.png\"></div>"
+            f"<div class=\"nr\" id=\"p{i}\">[p{i}]</div>"
+        )
+        out.append(_nav_html(paper["arxiv_link"]))
+        out.append(_cite_html(paper))
+        out.append("</li>")
+    out.append("</ul></div></div></body></html>")
+    return "".join(out).encode("utf-8")
+
+
+def render_person_xml(sample, pid=PID):
+    """把下载结果还原为 dblp 个人 XML 记录（/pid/<id>.xml）。"""
+    out = [
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n",
+        f"<dblpperson name={quoteattr(sample['scientist'])} pid={quoteattr(pid)} "
+        f"n=\"{len(sample['papers'])}\">\n",
+        f"<person key=\"homepages/{escape(pid)}\" mdate=\"2024-01-01\">"
+        f"<author pid={quoteattr(pid)}>{escape(sample['scientist'])}</author></person>\n",
+    ]
+    for i, paper in enumerate(sample["papers"]):
+        tag = _record_tag(paper)
+        key = _record_key(paper)
+        out.append(f"<r><{tag} key=\"{key}\" mdate=\"2024-01-01\">")
+        for name in paper["authors"]:
+            author_pid = pid if name == sample["scientist"] else _pid_for(name)
+            out.append(f"<author pid={quoteattr(author_pid)}>{escape(name)}</author>")
+        out.append(_record_fields(paper, key))
+        out.append(f"</{tag}></r>\n")
+    out.append("</dblpperson>\n")
+    return "".join(out).encode("utf-8")
+
+
+def _record_fields(paper, key):
+    out = [f"<title>{escape(paper['title'])}</title>", f"<year>{escape(paper['year'])}</year>"]
+    venue = paper["venue"]
+    if venue:
+        if "volume" in venue:
+            out.append(f"<volume>{escape(venue['volume'])}</volume>")
+        out.append(f"<journal>{escape(venue.get('name', ''))}</journal>")
+    else:
+        out.append("<booktitle>CONF</booktitle>")
+    if paper["arxiv_link"]:
+        out.append(f"<ee>{escape(paper['arxiv_link'])}</ee>")
+    out.append(f"<url>db/{key}.html</url>")
+    return "".join(out)
+
+
+def _dump_text(text):
+    # 与真实转储一样，非 ASCII 字符写成 DTD 中定义的命名实体（如 &uuml;）
+    return "".join(f"&{html.entities.codepoint2name[ord(c)]};"
+                   if ord(c) > 127 and ord(c) in html.entities.codepoint2name else c
+                   for c in text)
+
+
+def write_dump(samples, path, mdate="2024-01-01"):
+    """
+    把样本写成 dblp.xml(.gz) 格式的合成数据转储（用于 offline.build_index）：
+    每位作者（含合作者）一条 homepages/<pid> 记录，样本间共享的论文只写一次。
+    论文可以带 "mdate" 字段覆盖默认的修改日期，用于模拟新一期转储中修改过的记录。
+    记录的 key 由标题、年份和刊物名得到，与论文在样本中的位置无关。
+    """
+    out = ["<?xml version=\"1.0\" encoding=\"ISO-8859-1\"?>\n",
+           "<!DOCTYPE dblp SYSTEM \"dblp.dtd\">\n<dblp>\n"]
+    people = {}
+    written = set()
+    keys = set()
+    for sample in samples:
+        people.setdefault(sample["scientist"], None)
+        for paper in sample["papers"]:
+            if id(paper) in written:
+                continue
+            written.add(id(paper))
+            key = base = _record_key(paper)
+            n = 1
+            while key in keys:
+                # 标题、年份和刊物都相同的论文（如同名的不同条目）按出现顺序区分
+                n += 1
+                key = f"{base}-{n}"
+            keys.add(key)
+            tag = _record_tag(paper)
+            out.append(f"<{tag} key=\"{key}\" "
+                       f"mdate=\"{paper.get('mdate', mdate)}\">")
+            for name in paper["authors"]:
+                people.setdefault(name, None)
+                out.append(f"<author>{_dump_text(escape(name))}</author>")
+            out.append(_dump_text(_record_fields(paper, key)))
+            out.append(f"</{tag}>\n")
+    for name in people:
+        out.append(f"<www key=\"homepages/{_pid_for(name)}\" mdate=\"{mdate}\">"
+                   f"<author>{_dump_text(escape(name))}</author><title>Home Page</title></www>\n")
+    out.append("</dblp>\n")
+    data = "".join(out).encode("latin-1", "xmlcharrefreplace")
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wb") as f:
+        f.write(data)
+
+
+# 录制的搜索结果中指向 dblp 的绝对链接替换为该占位符，回放时换成替身服务器的地址
+BASE_URL_PLACEHOLDER = b"__DBLP_BASE_URL__"
+_EMPTY_SEARCH = b"<!DOCTYPE html><html><head><title>dblp: search</title></head><body></body></html>"
+
+
+def _pid_for(name):
+    digest = int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:12], 16)
+    return f"{digest % 1000}/{digest // 1000 % 10 ** 9}"
+
+
+class StandInServer:
+    """
+    本地 dblp 替身服务器，在后台线程中提供 /search、/search/author/api、/pid/<id>
+    和 /pid/<id>.xml，页面由样本渲染或从 record() 录制的目录回放。
+
+    参数:
+      samples: 下载结果样本列表（见 load_sample / synthetic_sample），按 scientist 检索。
+      recorded: 可选，record() 录制的目录，其中的响应优先于 samples。
+      latency: 每个请求在返回响应头之前的延迟（秒）。
+      bandwidth: 每秒发送的字节数，None 表示不限速。
+      error_rate: 以该概率返回 error_status（带 Retry-After: 0），用于测试重试。
+      error_status: 注入的错误状态码。
+      seed: 错误注入的随机种子。
+
+    用法:
+      with StandInServer([sample], latency=0.05) as server:
+          fetcher = Fetcher(base_url=server.base_url)
+    """
+
+    def __init__(self, samples=(), recorded=None, latency=0.0, bandwidth=None, error_rate=0.0,
+                 error_status=503, seed=0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._samples = {sample["scientist"].lower(): sample for sample in samples}
+        self._pids = {_pid_for(sample["scientist"]): sample for sample in samples}
+        # 渲染好的页面按需生成后缓存，避免计入被测代码的耗时
+        self._pages = {}
+        self._recorded = {}
+        if recorded is not None:
+            with open(os.path.join(recorded, "index.json"), encoding="utf-8") as f:
+                for path, name in json.load(f).items():
+                    with open(os.path.join(recorded, name), "rb") as body:
+                        self._recorded[path] = body.read()
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def profile_url(self, scientist):
+        return f"{self.base_url}/pid/{_pid_for(scientist)}"
+
+    def update(self, sample):
+        """替换同名科学家的样本并丢弃已渲染的页面，模拟主页内容的变化。"""
+        self._samples[sample["scientist"].lower()] = sample
+        self._pids[_pid_for(sample["scientist"])] = sample
+        self._pages.clear()
+
+    def render(self, scientist):
+        """预先渲染某个样本的 HTML 和 XML 页面（基准测试在计时前调用）。"""
+        pid = _pid_for(scientist)
+        self._page(f"/pid/{pid}")
+        self._page(f"/pid/{pid}.xml")
+
+    def _page(self, path):
+        page = self._pages.get(path)
+        if page is not None:
+            return page
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        name = query.get("q", [""])[0]
+        if path in self._recorded:
+            page = self._recorded[path].replace(BASE_URL_PLACEHOLDER, self.base_url.encode())
+        elif url.path == "/search/author/api":
+            sample = self._samples.get(name.lower())
+            page = (render_search_json(self.profile_url(sample["scientist"]), sample["scientist"])
+                    if sample else json.dumps({"result": {"hits": {"@total": "0"}}}).encode())
+        elif url.path == "/search":
+            sample = self._samples.get(name.lower())
+            page = render_search_html(self.profile_url(sample["scientist"])) if sample else _EMPTY_SEARCH
+        elif url.path.startswith("/pid/"):
+            pid = url.path[len("/pid/"):]
+            if pid.endswith(".html"):
+                pid = pid[:-len(".html")]
+            if pid.endswith(".xml"):
+                sample = self._pids.get(pid[:-len(".xml")])
+                page = render_person_xml(sample, pid[:-len(".xml")]) if sample else None
+            else:
+                sample = self._pids.get(pid)
+                page = render_profile_html(sample) if sample else None
+        if page is not None and url.path.startswith("/pid/"):
+            self._pages[path] = page
+        return page
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    fail = server.error_rate and server._rng.random() < server.error_rate
+                    if fail:
+                        server.errors += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if fail:
+                    self.send_response(server.error_status)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = server._page(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                content_type = "application/xml" if self.path.endswith(".xml") else (
+                    "application/json" if "/api" in self.path else "text/html; charset=utf-8")
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self._send(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def _send(self, body):
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                    return
+                chunk = max(1, int(server.bandwidth / 50))
+                for start in range(0, len(body), chunk):
+                    self.wfile.write(body[start:start + chunk])
+                    time.sleep(chunk / server.bandwidth)
+
+        return Handler
+
+
+class StandInFileServer:
+    """
+    本地全文替身服务器：提供固定内容的文件，支持 Range / If-Range（ETag 为内容的 sha1）、
+    重定向（模拟 doi.org 跳转到出版商），并可以在传输中途断开连接，用于测试断点续传。
+
+    参数:
+      files: {路径: bytes 或 (bytes, Content-Type)}，默认类型为 application/pdf。
+      redirects: {路径: 目标路径}，返回 302。
+      drop_after: 传输到该字节数时断开连接，None 表示不断开。
+      drops: 每个路径最多断开的次数，之后正常传输。
+      latency: 每个请求在返回响应头之前的延迟（秒）。
+      bandwidth: 每秒发送的字节数，None 表示不限速。
+      ranges: 为 False 时忽略 Range 头，总是返回完整内容。
+      gzip: 为 True 时，请求的 Accept-Encoding 包含 gzip 就返回 gzip 压缩的完整内容
+            （Content-Length 为压缩后的长度），模拟对 PDF 也做压缩的服务器。
+      partial: 为 True 时不带 Range 的请求也返回 206（bytes 0-），模拟总是分段响应的服务器。
+
+    属性 requests / range_requests / bytes_sent / max_active（同时进行的最大请求数）
+    可用于检查客户端的行为。
+    """
+
+    def __init__(self, files, redirects=None, drop_after=None, drops=1, latency=0.0,
+                 bandwidth=None, ranges=True, gzip=False, partial=False):
+        self.files = {}
+        for path, body in files.items():
+            if isinstance(body, tuple):
+                self.files[path] = body
+            else:
+                self.files[path] = (body, "application/pdf")
+        self.redirects = dict(redirects or {})
+        self.drop_after = drop_after
+        self.drops = drops
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.ranges = ranges
+        self.gzip = gzip
+        self.partial = partial
+        self.requests = 0
+        self.range_requests = 0
+        self.bytes_sent = 0
+        self.active = 0
+        self.max_active = 0
+        self._dropped = {}
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    self._get()
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def _get(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                path = urlsplit(self.path).path
+                if path in server.redirects:
+                    self.send_response(302)
+                    self.send_header("Location", server.redirects[path])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if path not in server.files:
+                    self.send_error(404)
+                    return
+                body, content_type = server.files[path]
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    compressed = gzip.compress(body)
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Encoding", "gzip")
+                    self.send_header("Content-Length", str(len(compressed)))
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    self._send(compressed)
+                    return
+                start = 0
+                requested = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                ranged = bool(requested) and server.ranges and (if_range is None or if_range == etag)
+                if ranged:
+                    with server._lock:
+                        server.range_requests += 1
+                    start = int(requested.split("=", 1)[1].split("-", 1)[0])
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                if ranged or server.partial:
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body) - start))
+                self.send_header("ETag", etag)
+                self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+
+                end = len(body)
+                with server._lock:
+                    dropped = server._dropped.get(path, 0)
+                    if server.drop_after is not None and dropped < server.drops \
+                            and start < server.drop_after:
+                        server._dropped[path] = dropped + 1
+                        end = server.drop_after
+                self._send(body[start:end])
+                with server._lock:
+                    server.bytes_sent += end - start
+                if end < len(body):
+                    # 声明的长度没有发完就断开，客户端会看到不完整的响应
+                    self.close_connection = True
+
+            def _send(self, body):
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                    return
+                chunk = max(1, int(server.bandwidth / 50))
+                for start in range(0, len(body), chunk):
+                    self.wfile.write(body[start:start + chunk])
+                    time.sleep(chunk / server.bandwidth)
+
+        return Handler
+
+
+def record(scientist, directory, fetcher, backend="html"):
+    """
+    把一次真实下载用到的搜索页和个人主页（或 XML 记录）原样保存到 directory，
+    之后可用 StandInServer(recorded=directory) 离线回放。返回录制的请求路径列表。
+    """
+    # 延迟导入，避免 fixtures 依赖下载流程
+    import dblp_api
+    import downloader
+
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, "index.json")
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+
+    def save(url, search=False):
+        content = fetcher.get(url).content
+        if search:
+            content = content.replace(fetcher.base_url.encode(), BASE_URL_PLACEHOLDER)
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        name = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(content)
+        index[path] = name
+        return path
+
+    paths = []
+    if backend == "xml":
+        paths.append(save(fetcher.url("/search/author/api?format=json&h=1&q=" + quote(scientist)),
+                          search=True))
+        profile_url = dblp_api.resolve_profile_url(scientist, fetcher)
+        if profile_url:
+            paths.append(save(dblp_api.person_xml_url(profile_url)))
+    else:
+        paths.append(save(fetcher.url("/search?q=" + quote(scientist)), search=True))
+        profile_url = downloader.resolve_profile_url(scientist, fetcher)
+        if profile_url:
+            paths.append(save(profile_url))
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return paths
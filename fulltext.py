@@ -0,0 +1,466 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetcher import DEFAULT_TIMEOUT, RETRY_STATUS, HostLimiter, RateLimiter, parse_retry_after
+from keys import link_doi
+from metrics import Metrics
+
+DEFAULT_FULLTEXT_DIR = ".dblp_fulltext"
+# 流式写入的块大小，决定单个下载占用的内存
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 10
+PDF_TYPES = ("application/pdf",)
+
+
+def full_text_url(paper_info):
+    """
+    论文的全文链接：arxiv.org/abs/ 换成对应的 PDF 地址，其余链接（DOI、出版商页面等）
+    原样返回；没有 http(s) 链接时返回 None。
+    """
+    link = (paper_info.get("arxiv_link") or "").strip()
+    if not link.startswith(("http://", "https://")):
+        return None
+    parts = urlsplit(link)
+    if parts.netloc.endswith("arxiv.org") and parts.path.startswith("/abs/"):
+        return "https://arxiv.org/pdf/" + parts.path[len("/abs/"):]
+    return link
+
+
+def link_key(url):
+    """全文库索引中的链接键：DOI 不区分大小写，统一为 https://doi.org/<小写 DOI>。"""
+    doi = link_doi(url)
+    return "https://doi.org/" + doi if doi else url
+
+
+class FullTextStore:
+    """
+    按内容寻址的全文库：文件以 sha256 命名保存在 objects/<前两位>/<哈希> 下，相同内容
+    只保存一份；index.sqlite 记录 链接 -> 哈希，同一链接无论出现在哪次运行、哪位合作者的
+    论文列表中都只下载一次。未完成的下载保存在 partial/ 下，供下次断点续传。
+    同一个目录同一时间只应由一个进程写入。
+
+    参数:
+      directory: 全文库目录，不存在时创建。
+    """
+
+    def __init__(self, directory=DEFAULT_FULLTEXT_DIR):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "partial"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"),
+                                   check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            " url TEXT PRIMARY KEY,"
+            " sha256 TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " content_type TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def object_path(self, sha256):
+        return os.path.join(self.directory, "objects", sha256[:2], sha256)
+
+    def partial_path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "partial", name + ".part")
+
+    def lookup(self, key):
+        """返回链接的索引记录（sha256 / size / content_type / status / fetched_at），没有时为 None。"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, size, content_type, status, fetched_at FROM links WHERE url = ?",
+                (key,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("sha256", "size", "content_type", "status", "fetched_at"), row))
+
+    def record(self, key, sha256, size, content_type, status):
+        """写入一条索引记录；sha256 为 "" 表示没有可用的全文（被拒绝或不存在）。"""
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO links"
+                    " (url, sha256, size, content_type, status, fetched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, sha256, size, content_type, status, time.time()))
+
+    def add_object(self, path, sha256):
+        """把下载完成的文件移入 objects；已有相同内容时删除 path。返回是否为新内容。"""
+        target = self.object_path(sha256)
+        if os.path.exists(target):
+            os.remove(path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        return True
+
+    def stats(self):
+        with self._lock:
+            links, stored = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT NULLIF(sha256, '')) FROM links").fetchone()
+            size = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM"
+                " (SELECT sha256, MAX(size) AS size FROM links WHERE sha256 != '' GROUP BY sha256)"
+            ).fetchone()[0]
+        partial = [name for name in os.listdir(os.path.join(self.directory, "partial"))
+                   if name.endswith(".part")]
+        return {"links": links, "objects": stored, "bytes": size, "partial": len(partial)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _Incomplete(Exception):
+    """响应在声明的长度之前结束，或续传的起点与本地文件对不上，需要重试。"""
+
+
+class _RetryStatus(Exception):
+    def __init__(self, resp):
+        super().__init__(f"HTTP {resp.status_code}")
+        self.retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+
+
+def _read_meta(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _discard(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _range_start(resp):
+    """解析 206 响应的 Content-Range: bytes <start>-<end>/<total>，返回 start。"""
+    value = resp.headers.get("Content-Range", "")
+    try:
+        return int(value.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
+
+
+class FullTextFetcher:
+    """
+    并发下载论文的全文（PDF）到 FullTextStore：
+      - 线程池并发，按主机限制同时进行的连接数（包括重定向途经的每个主机）；
+      - 响应按 CHUNK_SIZE 分块流式写入磁盘并同时计算 sha256，内存占用与文件大小无关；
+      - 中断的下载（网络错误、进程退出）保留在 partial/，下次用 Range / If-Range 续传，
+        服务器不支持或文件已变化时从头下载；
+      - 已下载过的链接直接命中索引，不同链接得到相同内容时只保存一份。
+
+    参数:
+      store: FullTextStore 或目录路径，默认 DEFAULT_FULLTEXT_DIR。
+      max_workers: 并发下载数。
+      max_per_host: 同一主机的最大并发连接数，0 表示不限制。
+      min_interval: 同一主机两次请求的最小间隔（秒）。
+      timeout / retries / backoff / max_backoff: 同 fetcher.Fetcher；
+               重试时从已写入的位置续传。
+      accept: 接受的 Content-Type，其余（如 DOI 跳转到的 HTML 落地页）记为 "rejected"；
+              None 表示接受任何类型。
+      negative_ttl: 被拒绝或不存在的链接在该时间（秒）内不再请求。
+      session: 可注入自定义的 requests.Session。
+      metrics: 可选的 metrics.Metrics，记录 fulltext 计时和 fulltext_bytes /
+               fulltext_resumed_bytes 计数。
+    """
+
+    def __init__(self, store=None, max_workers=8, max_per_host=2, min_interval=0.0,
+                 timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5, max_backoff=30.0,
+                 accept=PDF_TYPES, negative_ttl=7 * 24 * 3600, session=None, metrics=None):
+        if store is None or isinstance(store, str):
+            store = FullTextStore(store or DEFAULT_FULLTEXT_DIR)
+        self.store = store
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.accept = accept
+        self.negative_ttl = negative_ttl
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.host_limiter = HostLimiter(max_per_host)
+        self.rate_limiter = RateLimiter(min_interval)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        # 每个正在下载的链接一把锁；没有线程持有或等待时自动删除，不随链接数增长
+        self._key_locks = weakref.WeakValueDictionary()
+        self._key_locks_lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._key_locks_lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _cached(self, url, key):
+        row = self.store.lookup(key)
+        if row is None:
+            return None
+        if row["sha256"]:
+            path = self.store.object_path(row["sha256"])
+            if os.path.exists(path):
+                return {"url": url, "status": "cached", "sha256": row["sha256"], "path": path,
+                        "bytes": row["size"], "resumed": 0}
+        elif time.time() - row["fetched_at"] < self.negative_ttl:
+            return {"url": url, "status": row["status"], "sha256": "", "path": None,
+                    "bytes": 0, "resumed": 0}
+        return None
+
+    def fetch(self, url):
+        """
+        下载一个链接的全文，返回结果字典：url、status（"downloaded" / "deduplicated"
+        （内容已在库中）/ "cached"（链接已下载过）/ "rejected" / "not_found" / "error"）、
+        sha256、path、bytes，resumed 为续传时复用的字节数，失败时另有 error。
+        """
+        key = link_key(url)
+        result = self._cached(url, key)
+        if result is not None:
+            return result
+        # 同一链接在进程内只有一个线程下载，其余线程等它完成后直接命中索引
+        with self._key_lock(key):
+            result = self._cached(url, key)
+            if result is not None:
+                return result
+            with self.metrics.timer("fulltext"):
+                return self._download(url, key)
+
+    def _download(self, url, key):
+        part = self.store.partial_path(key)
+        meta_path = part + ".json"
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(url, key, part, meta_path)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if status in (404, 410):
+                    self.store.record(key, "", 0, "", "not_found")
+                    return {"url": url, "status": "not_found", "sha256": "", "path": None,
+                            "bytes": 0, "resumed": 0}
+                return {"url": url, "status": "error", "sha256": "", "path": None, "bytes": 0,
+                        "resumed": 0, "error": str(e)}
+            except (requests.RequestException, _Incomplete, _RetryStatus) as e:
+                if attempt >= self.retries:
+                    return {"url": url, "status": "error", "sha256": "", "path": None,
+                            "bytes": 0, "resumed": 0, "error": str(e)}
+                delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+                if isinstance(e, _RetryStatus) and e.retry_after is not None:
+                    delay = min(self.max_backoff, e.retry_after)
+                time.sleep(delay)
+                attempt += 1
+
+    def _open(self, url, headers):
+        """
+        发送 GET（stream=True），手动跟随重定向，使每一跳都占用所在主机的连接名额。
+        返回 (响应, 主机信号量)，读完响应体后由调用方释放。
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            host = urlsplit(url).netloc
+            sem = self.host_limiter.acquire(host)
+            try:
+                self.rate_limiter.wait(host)
+                resp = self.session.get(url, headers=headers, timeout=self.timeout, stream=True,
+                                        allow_redirects=False)
+            except BaseException:
+                if sem is not None:
+                    sem.release()
+                raise
+            if not resp.is_redirect:
+                return resp, sem
+            url = urljoin(url, resp.headers["Location"])
+            resp.close()
+            if sem is not None:
+                sem.release()
+        raise requests.TooManyRedirects(f"超过 {MAX_REDIRECTS} 次重定向: {url}")
+
+    def _attempt(self, url, key, part, meta_path):
+        meta = _read_meta(meta_path)
+        offset = os.path.getsize(part) if meta is not None and os.path.exists(part) else 0
+        # 要求不压缩：Range 偏移和 Content-Length 都按传输的字节计算，与本地文件一致
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+
+        resp, sem = self._open(url, headers)
+        try:
+            if resp.status_code == 416:
+                # 本地的部分文件与服务器上的内容对不上，丢弃后从头下载
+                _discard(part, meta_path)
+                raise _Incomplete("Range 无效，从头下载")
+            if resp.status_code in RETRY_STATUS:
+                raise _RetryStatus(resp)
+            resp.raise_for_status()
+
+            content_type = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if self.accept is not None and content_type not in self.accept:
+                _discard(part, meta_path)
+                self.store.record(key, "", 0, content_type, "rejected")
+                return {"url": url, "status": "rejected", "sha256": "", "path": None,
+                        "bytes": 0, "resumed": 0, "content_type": content_type}
+
+            # 服务器仍然压缩时，解压后的字节数与 Range / Content-Length 对不上，只能整份下载
+            encoded = resp.headers.get("Content-Encoding", "").strip().lower() not in ("", "identity")
+            hasher = hashlib.sha256()
+            if resp.status_code == 206 and (encoded or _range_start(resp) != offset):
+                _discard(part, meta_path)
+                raise _Incomplete("Content-Range 与本地文件不符，从头下载")
+            if resp.status_code == 206 and offset:
+                resumed = offset
+                with open(part, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        hasher.update(chunk)
+                mode = "ab"
+            else:
+                # 200，或没有续传时从 0 开始的 206，都从头写入
+                resumed = 0
+                mode = "wb"
+                if encoded:
+                    _discard(meta_path)
+                else:
+                    with open(meta_path, "w", encoding="utf-8") as f:
+                        json.dump({"url": url, "etag": resp.headers.get("ETag"),
+                                   "last_modified": resp.headers.get("Last-Modified")}, f)
+
+            expected = None if encoded else resp.headers.get("Content-Length")
+            received = 0
+            with open(part, mode) as f:
+                try:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        received += len(chunk)
+                finally:
+                    # 中途断开时已收到的部分也落盘，下次从这里续传
+                    self.metrics.incr("fulltext_bytes", received)
+                f.flush()
+                os.fsync(f.fileno())
+            if expected is not None and received != int(expected):
+                raise _Incomplete(f"只收到 {received}/{expected} 字节")
+        finally:
+            resp.close()
+            if sem is not None:
+                sem.release()
+
+        self.metrics.incr("fulltext_resumed_bytes", resumed)
+        size = os.path.getsize(part)
+        sha256 = hasher.hexdigest()
+        new = self.store.add_object(part, sha256)
+        _discard(meta_path)
+        self.store.record(key, sha256, size, content_type, "ok")
+        return {"url": url, "status": "downloaded" if new else "deduplicated", "sha256": sha256,
+                "path": self.store.object_path(sha256), "bytes": size, "resumed": resumed}
+
+    def fetch_many(self, urls, progress=None):
+        """
+        并发下载多个链接（重复的只下载一次），返回 {url: 结果}。
+        progress(result) 在每个链接完成时调用（在调用线程中）。
+        单个链接出错只记录在它自己的结果里。
+        """
+        unique = list(dict.fromkeys(url for url in urls if url))
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.fetch, url): url for url in unique}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"url": url, "status": "error", "sha256": "", "path": None,
+                              "bytes": 0, "resumed": 0, "error": str(e)}
+                results[url] = result
+                if progress is not None:
+                    progress(result)
+        return results
+
+    def fetch_papers(self, papers, progress=None):
+        """下载 paper_info 列表中每篇论文的全文（见 full_text_url），返回 {url: 结果}。"""
+        return self.fetch_many([full_text_url(paper) for paper in papers], progress)
+
+    def close(self):
+        self.session.close()
+        self.store.close()
+
+
+def summarize(results):
+    """把 fetch_many 的结果汇总为各状态的数量和下载的字节数。"""
+    summary = dict(Counter(r["status"] for r in results.values()))
+    summary["links"] = len(results)
+    summary["bytes"] = sum(r["bytes"] for r in results.values()
+                           if r["status"] in ("downloaded", "deduplicated"))
+    summary["resumed_bytes"] = sum(r["resumed"] for r in results.values())
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="下载论文列表中链接的全文（PDF），按内容去重保存")
+    parser.add_argument("-d", "--dir", default=DEFAULT_FULLTEXT_DIR, help="全文库目录")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="下载下载结果文件中所有论文的全文")
+    fetch.add_argument("inputs", nargs="+", help="下载结果（json / jsonl / 列式文件）")
+    fetch.add_argument("-w", "--workers", type=int, default=8, help="并发下载数")
+    fetch.add_argument("--per-host", type=int, default=2, help="同一主机的最大并发连接数")
+    fetch.add_argument("--min-interval", type=float, default=0.0,
+                       help="同一主机两次请求的最小间隔（秒）")
+    fetch.add_argument("--any-type", action="store_true",
+                       help="保存任何类型的响应，而不只是 application/pdf")
+
+    commands.add_parser("stats", help="显示全文库的链接数、文件数和大小")
+    args = parser.parse_args(argv)
+
+    store = FullTextStore(args.dir)
+    if args.command == "stats":
+        print(json.dumps(store.stats(), ensure_ascii=False))
+        store.close()
+        return 0
+
+    from writer import read_output
+
+    papers = []
+    for path in args.inputs:
+        papers.extend(read_output(path)[1])
+    fetcher = FullTextFetcher(store, max_workers=args.workers, max_per_host=args.per_host,
+                              min_interval=args.min_interval,
+                              accept=None if args.any_type else PDF_TYPES)
+    results = fetcher.fetch_papers(papers)
+    fetcher.close()
+    for result in results.values():
+        if result["status"] == "error":
+            print(f"失败: {result['url']}: {result['error']}")
+    print(json.dumps(summarize(results), ensure_ascii=False))
+    return 1 if any(r["status"] == "error" for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,11 @@
+import time
+from collections import OrderedDict
+
 import pygame
 
 # 初始化
 pygame.init()
-SCREEN_SIZE = (600, 450)
+SCREEN_SIZE = (600, 720)
 COLORS = {
     'background': (255, 255, 255),
     'text': (0, 0, 0),
@@ -10,11 +13,20 @@ COLORS = {
     'inactive_border': (200, 200, 200),
     'button': (200, 200, 200),
     'error': (255, 0, 0),
-    'success': (0, 128, 0)
+    'success': (0, 128, 0),
+    'progress': (100, 170, 230),
+    'row_alt': (245, 247, 250),
+    'muted': (110, 110, 110)
 }
 FONT_SIZE = 24
 TEXTBOX_WIDTH = 300
 TEXTBOX_HEIGHT = 30
+CURSOR_BLINK_MS = 400
+
+# Timer events; the main loop blocks in pygame.event.wait() until one of these or input arrives
+CURSOR_BLINK = pygame.USEREVENT + 1
+MESSAGE_EXPIRE = pygame.USEREVENT + 2
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, getattr(pygame, 'WINDOWEXPOSED', pygame.VIDEOEXPOSE))
 
 # Initialize display
 screen = pygame.display.set_mode(SCREEN_SIZE)
@@ -24,46 +36,62 @@ try:
 except:
     font = pygame.font.SysFont("arial", FONT_SIZE)
 
-class TextBox:
+class Widget:
+    """Base class for retained-mode widgets: draw() repaints only the widget's own area"""
+
+    def __init__(self, rect):
+        self.rect = pygame.Rect(rect)
+        self.dirty = True
+
+    @property
+    def area(self):
+        """Screen area the widget owns; cleared and redrawn when the widget is dirty"""
+        return self.rect
+
+    def handle_event(self, event):
+        pass
+
+    def draw(self, surface):
+        raise NotImplementedError
+
+class TextBox(Widget):
     """Interactive text input box component"""
     
     def __init__(self, x, y, width, height, max_length=20):
-        self.rect = pygame.Rect(x, y, width, height)
+        super().__init__((x, y, width, height))
         self.text = ''
         self.active = False
         self.max_length = max_length
         self.cursor_visible = True
-        self.cursor_timer = 0
         self.last_render = None  # 缓存渲染结果
 
     def handle_event(self, event):
-        """Handle input events with partial updates"""
+        """Handle input and cursor blink events; only marks the box dirty"""
         if event.type == pygame.MOUSEBUTTONDOWN:
             was_active = self.active
             self.active = self.rect.collidepoint(event.pos)
             if was_active != self.active:
-                pygame.display.update(self.rect)
-            
-        if self.active and event.type == pygame.KEYDOWN:
+                self.cursor_visible = True
+                self.dirty = True
+
+        elif event.type == CURSOR_BLINK and self.active:
+            self.cursor_visible = not self.cursor_visible
+            self.dirty = True
+
+        elif self.active and event.type == pygame.KEYDOWN:
             # 处理删除键
             if event.key == pygame.K_BACKSPACE:
                 self.text = self.text[:-1]
             # 处理普通输入
             elif event.unicode.isprintable() and len(self.text) < self.max_length:
                 self.text += event.unicode
-            
-            # 局部更新优化
-            self.last_render = font.render(self.text, True, COLORS['text'])
-            pygame.display.update(self.rect)
+            else:
+                return
 
-    def update(self, dt):
-        """Optimized cursor animation"""
-        if self.active:
-            self.cursor_timer += dt
-            if self.cursor_timer > 0.4:  # 加快光标闪烁速度
-                self.cursor_visible = not self.cursor_visible
-                self.cursor_timer = 0
-                pygame.display.update(self.rect)  # 仅更新光标区域
+            # 文字变化时才重新渲染，输入时光标保持可见
+            self.last_render = None
+            self.cursor_visible = True
+            self.dirty = True
 
     def draw(self, surface):
         """Efficient rendering with caching"""
@@ -83,13 +111,25 @@ class TextBox:
                            (cursor_x, self.rect.y + 5),
                            (cursor_x, self.rect.y + self.rect.h - 5))
 
-class Button:
+class Button(Widget):
     """Clickable button component"""
     
     def __init__(self, x, y, width, height, text, callback):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
+        super().__init__((x, y, width, height))
         self.callback = callback
+        self._text = text
+        self._text_surface = None
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if value != self._text:
+            self._text = value
+            self._text_surface = None
+            self.dirty = True
         
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
@@ -98,33 +138,293 @@ class Button:
                 
     def draw(self, surface):
         pygame.draw.rect(surface, COLORS['button'], self.rect)
-        text_surface = font.render(self.text, True, COLORS['text'])
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        surface.blit(text_surface, text_rect)
-
-def draw_labels():
-    """Draw static labels"""
-    labels = [
-        ("Name:", (50, 55)),
-        ("Year:", (50, 105)),
-        ("Output File:", (50, 155))
-    ]
-    for text, pos in labels:
-        text_surface = gui.font.render(text, True, gui.COLORS['text'])
-        gui.screen.blit(text_surface, pos)
-
-def draw_message():
-    """Display status messages with partial updates"""
-    global status_message
-    if status_message:
-        # 清除旧消息区域
-        pygame.draw.rect(gui.screen, gui.COLORS['background'], (50, 270, 500, 30))
-        # 绘制新消息
-        msg_surface = gui.font.render(status_message, True, message_color)
-        gui.screen.blit(msg_surface, (50, 270))
-        pygame.display.update((50, 270, 500, 30))  # 局部更新
-        
-        # Auto-clear after 10 seconds
-        if pygame.time.get_ticks() > message_display_start + 10000:
-            status_message = ""
-            pygame.display.update((50, 270, 500, 30))  # 清除区域更新
\ No newline at end of file
+        if self._text_surface is None:
+            self._text_surface = font.render(self._text, True, COLORS['text'])
+        text_rect = self._text_surface.get_rect(center=self.rect.center)
+        surface.blit(self._text_surface, text_rect)
+
+class Label(Widget):
+    """Single line of text; the rendered surface is cached until the text or color changes"""
+
+    def __init__(self, x, y, text='', color=None, width=None):
+        self._text = text
+        self._color = color or COLORS['text']
+        self._surface = font.render(text, True, self._color)
+        super().__init__((x, y, width or self._surface.get_width(), font.get_linesize()))
+
+    @property
+    def text(self):
+        return self._text
+
+    def set(self, text, color=None):
+        color = color or self._color
+        if text != self._text or color != self._color:
+            self._text = text
+            self._color = color
+            self._surface = font.render(text, True, color)
+            self.dirty = True
+
+    def draw(self, surface):
+        surface.blit(self._surface, self.rect.topleft)
+
+class StatusMessage(Label):
+    """Status line that clears itself after a timeout via a one-shot MESSAGE_EXPIRE timer"""
+
+    def __init__(self, x, y, width, timeout_ms=10000):
+        super().__init__(x, y, '', width=width)
+        self.timeout_ms = timeout_ms
+
+    def show(self, text, color):
+        self.set(text, color)
+        pygame.time.set_timer(MESSAGE_EXPIRE, self.timeout_ms, 1)
+
+    def handle_event(self, event):
+        if event.type == MESSAGE_EXPIRE:
+            self.set('')
+
+class ProgressBar(Widget):
+    """Horizontal progress bar with a short caption"""
+
+    def __init__(self, x, y, width, height):
+        super().__init__((x, y, width, height))
+        self.fraction = 0.0
+        self.caption = ''
+        self._caption_surface = None
+
+    @property
+    def area(self):
+        # 说明文字画在进度条下方
+        return self.rect.union(pygame.Rect(self.rect.x, self.rect.bottom,
+                                           self.rect.width, 5 + font.get_linesize()))
+
+    def _fill_width(self, fraction):
+        return int((self.rect.width - 4) * fraction)
+
+    def set(self, fraction, caption=''):
+        fraction = max(0.0, min(1.0, fraction))
+        # 只有填充宽度或文字变化时才需要重绘
+        if self._fill_width(fraction) != self._fill_width(self.fraction):
+            self.dirty = True
+        if caption != self.caption:
+            self._caption_surface = None
+            self.dirty = True
+        self.fraction = fraction
+        self.caption = caption
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, COLORS['inactive_border'], self.rect, 1)
+        if self.fraction > 0:
+            fill = self.rect.inflate(-4, -4)
+            fill.width = self._fill_width(self.fraction)
+            pygame.draw.rect(surface, COLORS['progress'], fill)
+        if self.caption:
+            if self._caption_surface is None:
+                self._caption_surface = font.render(self.caption, True, COLORS['text'])
+            surface.blit(self._caption_surface, (self.rect.x, self.rect.bottom + 5))
+
+class ResultsList(Widget):
+    """
+    Virtualized, filterable list of papers: only the rows inside the viewport are drawn, and
+    their rendered surfaces are kept in an LRU cache (row_cache_size entries).
+
+    Filtering is incremental: a query that extends the previous one only rescans that
+    query's matches, and rescans run in time-boxed slices (step()) so typing never stalls
+    a frame even on very large lists. Partial matches are shown while a scan is running.
+    """
+
+    def __init__(self, x, y, width, height, row_cache_size=256):
+        super().__init__((x, y, width, height))
+        self.row_height = font.get_linesize() + 4
+        self.rows = max(1, height // self.row_height)
+        self.row_cache_size = row_cache_size
+        self.items = []
+        self.matches = []
+        self.top = 0
+        self.query = ''
+        self._filter_text = ''
+        self._haystacks = []
+        self._row_cache = OrderedDict()
+        # (query, matches) for each completed filter step, so backspace can reuse a prefix
+        self._history = [('', [])]
+        self._scan = None
+
+    def set_items(self, papers):
+        self.items = papers
+        self._haystacks = [
+            ' '.join([paper['year'], paper['title'], paper['venue'].get('name', ''),
+                      *paper['authors']]).casefold()
+            for paper in papers
+        ]
+        self._row_cache.clear()
+        self._history = [('', list(range(len(papers))))]
+        self.matches = self._history[0][1]
+        self.top = 0
+        self._scan = None
+        self.query = ''
+        self.set_filter(self._filter_text)
+        self.dirty = True
+
+    def set_filter(self, text):
+        """Start filtering for text (case-insensitive substring of year/title/venue/authors)"""
+        self._filter_text = text
+        query = text.strip().casefold()
+        if query == self.query:
+            return
+        self.query = query
+        # 新查询包含旧查询时结果只会更少，从最近一个被包含的查询结果开始扫描
+        while len(self._history) > 1 and self._history[-1][0] not in query:
+            self._history.pop()
+        base_query, base = self._history[-1]
+        if base_query == query:
+            self._scan = None
+            self.matches = base
+        else:
+            self._scan = (query, base, 0, [])
+            self.matches = []
+        self.top = 0
+        self.dirty = True
+
+    @property
+    def busy(self):
+        """True while a filter scan is still running; the main loop must not block then"""
+        return self._scan is not None
+
+    def step(self, budget=0.004):
+        """Advance a running filter scan for at most budget seconds"""
+        if self._scan is None:
+            return
+        query, base, pos, found = self._scan
+        deadline = time.perf_counter() + budget
+        haystacks = self._haystacks
+        while pos < len(base):
+            end = min(pos + 1024, len(base))
+            found.extend(i for i in base[pos:end] if query in haystacks[i])
+            pos = end
+            if time.perf_counter() > deadline:
+                break
+        self.matches = found
+        if pos < len(base):
+            self._scan = (query, base, pos, found)
+        else:
+            self._scan = None
+            self._history.append((query, found))
+        self.dirty = True
+
+    def scroll(self, rows):
+        top = max(0, min(self.top + rows, len(self.matches) - self.rows))
+        if top != self.top:
+            self.top = top
+            self.dirty = True
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEWHEEL:
+            if self.rect.collidepoint(pygame.mouse.get_pos()):
+                self.scroll(-3 * event.y)
+        elif event.type == pygame.KEYDOWN:
+            step = {pygame.K_UP: -1, pygame.K_DOWN: 1,
+                    pygame.K_PAGEUP: -self.rows, pygame.K_PAGEDOWN: self.rows}.get(event.key)
+            if step:
+                self.scroll(step)
+
+    def _row_surface(self, index):
+        surface = self._row_cache.get(index)
+        if surface is not None:
+            self._row_cache.move_to_end(index)
+            return surface
+        paper = self.items[index]
+        venue = paper['venue'].get('name', '')
+        text = f"{paper['year']}  {paper['title']}" + (f"  [{venue}]" if venue else '')
+        # 超出宽度的部分会被裁掉，过长的文本没必要整段渲染
+        surface = font.render(text[:120], True, COLORS['text'])
+        self._row_cache[index] = surface
+        while len(self._row_cache) > self.row_cache_size:
+            self._row_cache.popitem(last=False)
+        return surface
+
+    def caption(self):
+        if not self.items:
+            return ''
+        shown = len(self.matches)
+        if not shown and not self.busy:
+            return f"No matches (of {len(self.items)})"
+        first = min(self.top + 1, shown)
+        last = min(self.top + self.rows, shown)
+        text = f"{first}-{last} of {shown}"
+        if self.query:
+            text += f" matching (of {len(self.items)})"
+        return text + (' ...' if self.busy else '')
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, COLORS['inactive_border'], self.rect, 1)
+        visible = self.matches[self.top:self.top + self.rows]
+        for row, index in enumerate(visible):
+            y = self.rect.y + row * self.row_height
+            if (self.top + row) % 2:
+                surface.fill(COLORS['row_alt'], (self.rect.x + 1, y, self.rect.width - 2,
+                                                  self.row_height))
+            surface.blit(self._row_surface(index), (self.rect.x + 5, y + 2))
+        # 滚动条
+        if len(self.matches) > self.rows:
+            height = max(10, self.rect.height * self.rows // len(self.matches))
+            y = self.rect.y + (self.rect.height - height) * self.top // (len(self.matches) - self.rows)
+            pygame.draw.rect(surface, COLORS['inactive_border'],
+                             (self.rect.right - 6, y, 4, height))
+
+class Renderer:
+    """
+    Retained-mode renderer: repaints only dirty widgets (clipped to their own area) and
+    pushes all of their rects to the display with a single pygame.display.update() per frame.
+    """
+
+    def __init__(self, widgets):
+        self.widgets = list(widgets)
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Repaint everything on the next frame (first frame, window exposed)"""
+        self.full_redraw = True
+
+    def handle_event(self, event):
+        if event.type in EXPOSE_EVENTS:
+            self.invalidate()
+        if event.type == pygame.KEYDOWN:
+            # A focused text box consumes key presses, so arrow keys don't also scroll the list
+            focused = [w for w in self.widgets if isinstance(w, TextBox) and w.active]
+            if focused:
+                for widget in focused:
+                    widget.handle_event(event)
+                return
+        for widget in self.widgets:
+            widget.handle_event(event)
+
+    def render(self, surface):
+        """Draw dirty widgets; returns the list of updated rects (empty when nothing changed)"""
+        if self.full_redraw:
+            surface.fill(COLORS['background'])
+        dirty_rects = []
+        for widget in self.widgets:
+            if not (widget.dirty or self.full_redraw):
+                continue
+            area = widget.area
+            surface.set_clip(area)
+            surface.fill(COLORS['background'], area)
+            widget.draw(surface)
+            surface.set_clip(None)
+            widget.dirty = False
+            dirty_rects.append(area)
+        if self.full_redraw:
+            self.full_redraw = False
+            pygame.display.flip()
+            return [surface.get_rect()]
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        return dirty_rects
+
+def set_cursor_blink(enabled):
+    """Run the CURSOR_BLINK timer only while a text box has focus, so an idle window sleeps"""
+    global _blinking
+    if enabled != _blinking:
+        pygame.time.set_timer(CURSOR_BLINK, CURSOR_BLINK_MS if enabled else 0)
+        _blinking = enabled
+
+_blinking = False
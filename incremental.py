@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import time
+
+import downloader
+from fetcher import get_default_fetcher
+from keys import paper_key
+from writer import open_writer, read_output
+from years import parse_years
+
+STATE_SUFFIX = ".state.json"
+
+
+def state_path(output_file):
+    return output_file + STATE_SUFFIX
+
+
+def load_state(output_file):
+    try:
+        with open(state_path(output_file), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(output_file, state):
+    path = state_path(output_file)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def refresh_papers(scientist, year, output_file, fetcher=None, backend="html", pid_index=None,
+                   engine=None, full=False):
+    """
+    增量刷新：读取已有的输出文件，只把新增或有变化的论文合并进去。
+
+    个人主页按时间从新到旧排列。按年份过滤时完整检查所有匹配的年份，遇到更早的年份就停止；
+    不过滤年份时检查最新年份的整节，之后遇到输出文件中已有的论文就停止，不再解析更旧的条目
+    （更早年份中补录的论文需要 full=True 才能发现）。上次合并时的主页内容摘要和抓取时间保存在
+    output_file + ".state.json" 中，主页内容与上次完全相同时直接跳过解析。
+    Fetcher 带缓存时，未变化的主页只需一次 304 重新验证。
+
+    参数:
+      与 downloader.download_papers 相同；full 为 True 时解析整页，能发现旧论文的修改。
+
+    返回:
+      {"success": True, "count": 合并后总数, "new": 新增数, "changed": 修改数, "unchanged_profile": bool}
+    """
+    if fetcher is None:
+        fetcher = get_default_fetcher()
+    years = parse_years(year)
+
+    existing = []
+    state = {}
+    if os.path.exists(output_file):
+        _, existing = read_output(output_file)
+        state = load_state(output_file)
+    watermark = state.get("watermark") or {}
+
+    profile_url = state.get("profile_url") or downloader.find_profile(
+        scientist, fetcher, backend, pid_index)
+    if not profile_url:
+        if not os.path.exists(output_file):
+            with open_writer(output_file, scientist, profile_url):
+                pass
+        return {"success": True, "status": "ok", "count": len(existing), "new": 0, "changed": 0,
+                "unchanged_profile": False}
+
+    profile_resp, papers = downloader.fetch_profile(profile_url, fetcher, backend, engine)
+    digest = hashlib.sha1(profile_resp.content).hexdigest()
+    if existing and watermark.get("digest") == digest and not full:
+        return {"success": True, "status": "ok", "count": len(existing), "new": 0, "changed": 0,
+                "unchanged_profile": True}
+
+    index = {paper_key(p): i for i, p in enumerate(existing)}
+    merged = list(existing)
+    new_papers = []
+    new_keys = set()
+    changed = 0
+    newest_year = None
+    for paper_info in papers:
+        key = paper_key(paper_info)
+        if newest_year is None:
+            newest_year = paper_info["year"]
+        if not full:
+            if not years.all:
+                # 按年份过滤时，匹配的年份都完整检查，早于这些年份后停止
+                if years.before_range(paper_info["year"]):
+                    break
+            elif key in index and paper_info["year"] != newest_year:
+                # 不过滤年份时检查最新年份的整节（新论文不一定排在该节最前面），
+                # 之后遇到已有的论文就停止
+                break
+        if not years.matches(paper_info["year"]):
+            continue
+        if key in index:
+            if merged[index[key]] != paper_info:
+                merged[index[key]] = paper_info
+                changed += 1
+        elif key not in new_keys:
+            new_keys.add(key)
+            new_papers.append(paper_info)
+    merged = new_papers + merged
+
+    if new_papers or changed or not os.path.exists(output_file):
+        with open_writer(output_file, scientist, profile_url) as writer:
+            for paper_info in merged:
+                writer.write(paper_info)
+
+    save_state(output_file, {
+        "scientist": scientist,
+        "year": str(years),
+        "profile_url": profile_url,
+        "watermark": {"digest": digest, "fetched_at": time.time()},
+    })
+    print(f"增量刷新 {os.path.abspath(output_file)}：新增 {len(new_papers)} 篇，修改 {changed} 篇")
+    return {"success": True, "status": "ok", "count": len(merged), "new": len(new_papers),
+            "changed": changed, "unchanged_profile": False}
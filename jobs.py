@@ -0,0 +1,302 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import downloader
+
+PENDING = "pending"
+RESOLVED = "resolved"
+FETCHED = "fetched"
+WRITTEN = "written"
+ERROR = "error"
+STATES = (PENDING, RESOLVED, FETCHED, WRITTEN, ERROR)
+
+# 这些状态的结果不会因为重试而改变，不再重试
+_FINAL_STATUS = {"cancelled"}
+
+
+def job_key(scientist, year, output_file):
+    """任务的标识：科学家、年份条件和规范化后的输出路径。"""
+    return (scientist, str(year), os.path.normpath(output_file))
+
+
+class Journal:
+    """
+    追加写入的任务日志（JSON Lines），每行记录一个任务的一次状态变化：
+    pending → resolved → fetched → written，失败时为 error（附带错误信息和第几次尝试）。
+    重新打开时按顺序回放，得到每个任务的最新状态；崩溃时写了一半的最后一行会被截掉。
+
+    只有终态（written / 最终的 error）调用 fsync，每个任务最多一次；中间状态只 flush，
+    掉电时丢失也只是让该任务从头再来。
+
+    参数:
+      path: 日志文件路径，不存在时创建。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.states = {}
+        self._lock = threading.Lock()
+        self._replay()
+        self._file = open(path, "ab")
+
+    def _replay(self):
+        try:
+            f = open(self.path, "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            valid = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid += len(line)
+                self._apply(record)
+            f.truncate(valid)
+
+    def _apply(self, record):
+        key = tuple(record["job"])
+        state = self.states.setdefault(key, {})
+        state.update((k, v) for k, v in record.items() if k != "job")
+
+    def get(self, key):
+        """返回任务的最新状态字典（state、profile_url、count、outputs、error、attempt 等），没有时为 None。"""
+        with self._lock:
+            state = self.states.get(key)
+            return dict(state) if state is not None else None
+
+    def record(self, key, state, sync=False, **fields):
+        """追加一条状态记录；sync 为 True 时 fsync 后才返回。"""
+        record = {"job": list(key), "state": state, "time": round(time.time(), 3), **fields}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            self._apply(record)
+
+    def record_many(self, keys, state):
+        """一次写入多条相同状态的记录（用于登记新任务），不 fsync。"""
+        now = round(time.time(), 3)
+        records = [{"job": list(key), "state": state, "time": now} for key in keys]
+        with self._lock:
+            self._file.write(b"".join((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")
+                                      for r in records))
+            self._file.flush()
+            for record in records:
+                self._apply(record)
+
+    def summary(self):
+        """各状态的任务数。"""
+        with self._lock:
+            return dict(Counter(state.get("state") for state in self.states.values()))
+
+    def compact(self):
+        """把日志改写为每个任务一条最新状态记录（原子替换），只在没有任务运行时调用。"""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(self.path) + ".",
+                                            suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "wb") as f:
+                for key, state in self.states.items():
+                    f.write((json.dumps({"job": list(key), **state}, ensure_ascii=False)
+                             + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "ab")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class _ResolvedIndex:
+    """
+    把日志中已记录的个人主页 URL 当作 pid_index 使用，恢复的任务不再重复搜索；
+    其余姓名交给原来的 pid_index（可选）。
+    """
+
+    def __init__(self, resolved, pid_index=None):
+        self.resolved = resolved
+        self.pid_index = pid_index
+
+    def lookup(self, name):
+        if name in self.resolved:
+            return self.resolved[name]
+        return self.pid_index.lookup(name) if self.pid_index is not None else None
+
+    def store_many(self, resolved):
+        if self.pid_index is not None:
+            self.pid_index.store_many(resolved)
+
+
+def _remove_stale_temp_files(output_file):
+    """
+    删除上次中断时 PaperWriter 留下的临时文件（.{文件名}.*.tmp）。
+    只能在任务开始执行前调用，否则可能删掉正在写的临时文件。
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    name = os.path.basename(output_file)
+    if "{" in name:
+        # 按年份/刊物拆分的模板，匹配所有展开后的文件名
+        pattern = glob.escape(name[:name.index("{")]) + "*"
+    else:
+        pattern = glob.escape(name)
+    for path in glob.glob(os.path.join(glob.escape(directory), "." + pattern + ".*.tmp")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class JobRunner:
+    """
+    可恢复的任务执行器：每个任务的状态写入 Journal，重新运行时跳过已写出的任务，
+    失败的任务按指数退避重试。输出文件由 PaperWriter 原子地替换，日志中的 written
+    记录在文件替换之后才写入，因此每个输出文件要么是上次完整的结果，要么是本次完整的结果，
+    不会出现写了一半或重复写出的文件。
+
+    参数:
+      journal: Journal 实例或日志文件路径。
+      retries: 单个任务失败后的最大重试次数。
+      backoff / max_backoff: 第 n 次重试前等待 min(max_backoff, backoff * 2 ** n) 秒。
+      sleep: 等待函数，测试时可替换。
+    """
+
+    def __init__(self, journal, retries=2, backoff=1.0, max_backoff=60.0, sleep=time.sleep):
+        self.journal = journal if isinstance(journal, Journal) else Journal(journal)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self._claimed = set()
+        self._claim_lock = threading.Lock()
+
+    def register(self, jobs):
+        """
+        在开始执行前登记一批 (scientist, year, output_file) 任务：新任务一次性写入
+        pending 记录，未完成的任务清理上次中断留下的临时文件。返回会被跳过的已完成任务数。
+        """
+        new, skipped, seen = [], 0, set()
+        for scientist, year, output_file in jobs:
+            key = job_key(scientist, year, output_file)
+            if key in seen:
+                continue
+            seen.add(key)
+            state = self.journal.get(key)
+            if state is not None and self._completed(state):
+                skipped += 1
+                continue
+            if state is None:
+                new.append(key)
+            _remove_stale_temp_files(output_file)
+        if new:
+            self.journal.record_many(new, PENDING)
+        return skipped
+
+    def _completed(self, state):
+        return state.get("state") == WRITTEN and all(
+            os.path.exists(path) for path in state.get("outputs", ()))
+
+    def run(self, scientist, year, output_file, pid_index=None, **kwargs):
+        """
+        执行（或跳过）一个任务，返回与 downloader.download_papers 相同结构的结果，
+        另有 "attempts"；已在之前的运行中完成的任务返回 status 为 "skipped" 的结果。
+        kwargs 原样传给 download_papers（fetcher、timeout、metrics、store 等）。
+        """
+        key = job_key(scientist, year, output_file)
+        with self._claim_lock:
+            duplicate = key in self._claimed
+            self._claimed.add(key)
+        state = self.journal.get(key) or {}
+        if duplicate or self._completed(state):
+            return {"success": True, "status": "skipped", "count": state.get("count", 0),
+                    "attempts": 0}
+        if state.get("state") is None:
+            self.journal.record(key, PENDING)
+
+        attempt = 0
+        while True:
+            resolved = {}
+            if state.get("profile_url") is not None:
+                # 上次已经解析出主页（包括 "" 表示未找到），直接复用
+                resolved[scientist] = state["profile_url"]
+            progress = self._progress(key)
+            try:
+                result = downloader.download_papers(
+                    scientist, year, output_file, pid_index=_ResolvedIndex(resolved, pid_index),
+                    progress=progress, **kwargs)
+            except Exception as e:
+                result = {"success": False, "status": "error", "count": 0, "error": str(e)}
+            result["attempts"] = attempt + 1
+
+            if result.get("success"):
+                # 按年份/刊物拆分时为实际写出的文件（没有论文时为空），否则为 output_file
+                outputs = list(result["outputs"] if "outputs" in result else [output_file])
+                self.journal.record(key, WRITTEN, sync=True, count=result.get("count", 0),
+                                    outputs=outputs, attempt=attempt + 1)
+                return result
+
+            error = result.get("error") or result.get("status", "error")
+            final = attempt >= self.retries or result.get("status") in _FINAL_STATUS
+            self.journal.record(key, ERROR, sync=final, error=error, attempt=attempt + 1)
+            if final:
+                return result
+            self.sleep(min(self.max_backoff, self.backoff * (2 ** attempt)))
+            attempt += 1
+            state = self.journal.get(key) or {}
+
+    def _progress(self, key):
+        def progress(event):
+            stage = event["stage"]
+            if stage == "resolved":
+                self.journal.record(key, RESOLVED, profile_url=event["profile_url"])
+            elif stage == "fetched":
+                self.journal.record(key, FETCHED, bytes=event["bytes"])
+        return progress
+
+    def close(self):
+        self.journal.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查看或整理可恢复批量任务的日志")
+    parser.add_argument("journal", help="日志文件（batch.py --journal 指定的路径）")
+    parser.add_argument("--failed", action="store_true", help="列出最后一次失败的任务和错误")
+    parser.add_argument("--compact", action="store_true", help="改写为每个任务一条记录")
+    args = parser.parse_args(argv)
+
+    with Journal(args.journal) as journal:
+        if args.compact:
+            journal.compact()
+        print(json.dumps(journal.summary(), ensure_ascii=False))
+        if args.failed:
+            for (scientist, year, output_file), state in journal.states.items():
+                if state.get("state") == ERROR:
+                    print(f"{scientist} ({year}) -> {output_file}: 第 {state.get('attempt')} 次尝试，"
+                          f"{state.get('error')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import hashlib
+
+# 论文和链接的标识，只依赖标准库：论文库、全文库等不下载的模块也会导入
+
+DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/")
+
+
+def link_doi(link):
+    """链接是 DOI（doi.org / dx.doi.org）时返回小写的 DOI，否则返回 None。"""
+    lowered = (link or "").strip().lower()
+    for prefix in DOI_PREFIXES:
+        if lowered.startswith(prefix):
+            return lowered[len(prefix):]
+    return None
+
+
+def paper_key(paper_info):
+    """
+    论文的稳定键：链接是 DOI 时用 DOI，否则用标题、年份和刊物名的哈希。
+    """
+    doi = link_doi(paper_info.get("arxiv_link", ""))
+    if doi:
+        return "doi:" + doi
+    text = "|".join([
+        " ".join(paper_info.get("title", "").split()).casefold(),
+        paper_info.get("year", ""),
+        paper_info.get("venue", {}).get("name", ""),
+    ])
+    return "sha1:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -1,15 +1,33 @@
 import pygame
 import sys
-import downloader
 import gui
+from cache import ResponseCache
+from fetcher import Fetcher
+from pid_index import PidIndex
+from store import PaperStore
+from worker import DownloadWorker
+from writer import is_supported_output, read_output
+from years import parse_years
 
-status_message = ""
-message_color = gui.COLORS['text']
-message_display_start = 0
+# 拆分模式：None 写单个文件；"year"/"venue" 一次下载按年份/刊物写出多个文件
+SPLIT_MODES = [None, "year", "venue"]
+split_mode = None
+
+# 同一科学家换个年份再下载时，直接复用缓存或用 304 重新验证
+fetcher = Fetcher(cache=ResponseCache())
+pid_index = PidIndex()
+# 下载完成的论文同时写入本地论文库，之后可以用 store.py 离线查询
+paper_store = PaperStore()
+# 下载在后台线程中执行，有新事件时投递 WORKER_EVENT 唤醒阻塞在 event.wait() 上的主循环
+WORKER_EVENT = pygame.USEREVENT + 3
+worker = DownloadWorker(notify=lambda: pygame.event.post(pygame.event.Event(WORKER_EVENT)),
+                        fetcher=fetcher, pid_index=pid_index, store=paper_store)
 
 textbox_scientist = gui.TextBox(150, 50, gui.TEXTBOX_WIDTH, gui.TEXTBOX_HEIGHT, max_length=50)
-textbox_year = gui.TextBox(150, 100, gui.TEXTBOX_WIDTH, gui.TEXTBOX_HEIGHT, max_length=4)
+textbox_year = gui.TextBox(150, 100, gui.TEXTBOX_WIDTH, gui.TEXTBOX_HEIGHT, max_length=30)
 textbox_output = gui.TextBox(150, 150, gui.TEXTBOX_WIDTH, gui.TEXTBOX_HEIGHT, max_length=50)
+textbox_filter = gui.TextBox(120, 365, 250, gui.TEXTBOX_HEIGHT, max_length=40)
+results_list = gui.ResultsList(50, 405, 500, 275)
 
 def validate_inputs():
     errors = []
@@ -18,109 +36,148 @@ def validate_inputs():
         errors.append("Scientist name cannot be empty")
         
     try:
-        year = int(textbox_year.text)
-        if not ((year >= 1970 and year <= 2025) or year == -1):
-            errors.append("Year must be between 1970-2025, or -1 for all years")
+        years = parse_years(textbox_year.text)
+        if not years.all and not all(1970 <= year <= 2025 for year in years.years):
+            errors.append("Years must be between 1970-2025, or -1 for all years")
     except ValueError:
-        errors.append("Invalid year format")
+        errors.append("Invalid year format (e.g. 2021, 2019-2023, 2018,2021 or -1)")
         
     output_text = textbox_output.text.strip()
-    if output_text and not output_text.endswith(".json"):
-        errors.append("File extension must be .json")
+    if output_text and not is_supported_output(output_text):
+        errors.append("File extension must be .json, .jsonl (optionally .gz/.zst), .papers or .parquet")
         
     return errors
 
+def set_status(message, color):
+    status_message.show(message, color)
+
 def download_action():
-    global status_message, message_color, message_display_start
-    
     validation_errors = validate_inputs()
     if validation_errors:
-        status_message = "Error: " + " | ".join(validation_errors)
-        message_color = gui.COLORS['error']
-        message_display_start = pygame.time.get_ticks()
+        set_status("Error: " + " | ".join(validation_errors), gui.COLORS['error'])
         return
 
     scientist = textbox_scientist.text.strip()
-    year = int(textbox_year.text.strip())
+    year = parse_years(textbox_year.text)
     output_file = textbox_output.text.strip()
     
     if not output_file:
-        if year == -1:
+        if split_mode:
+            output_file = f"{scientist}_{{{split_mode}}}.json"
+        elif year.all:
             output_file = f"{scientist}_all.json"
         else:
             output_file = f"{scientist}_{year}.json"
 
+    worker.submit(scientist, year, output_file)
+
+def split_action():
+    """Cycle the split mode; an empty output name then becomes a {year}/{venue} template"""
+    global split_mode
+    split_mode = SPLIT_MODES[(SPLIT_MODES.index(split_mode) + 1) % len(SPLIT_MODES)]
+    split_button.text = f"Split: {split_mode or 'off'}"
+
+def show_results(job, result):
+    """Load the files a finished download wrote into the results panel"""
+    paths = list(result["outputs"] if "outputs" in result else [job['output_file']])
+    papers = []
     try:
-        result = downloader.download_papers(scientist, year, output_file)
-        
-        if result.get("success"):
-            status_message = f"Downloaded {result['count']} papers to {output_file}"
-            message_color = gui.COLORS['success']
-        else:
-            status_message = f"Download failed: {result.get('error', 'Unknown error')}"
-            message_color = gui.COLORS['error']
-            
-        message_display_start = pygame.time.get_ticks()
-    except Exception as e:
-        status_message = f"System error: {str(e)}"
-        message_color = gui.COLORS['error']
-        message_display_start = pygame.time.get_ticks()
-
-download_button = gui.Button(250, 200, 100, 40, "Download", download_action)
-
-def draw_labels():
-    labels = [
-        ("Name:", (50, 55)),
-        ("Year:", (50, 105)),
-        ("Output File:", (50, 155))
-    ]
-    for text, pos in labels:
-        text_surface = gui.font.render(text, True, gui.COLORS['text'])
-        gui.screen.blit(text_surface, pos)
-
-def draw_message():
-    """Display status messages with partial updates"""
-    global status_message
-    if status_message:
-        pygame.draw.rect(gui.screen, gui.COLORS['background'], (50, 270, 500, 30))
-        msg_surface = gui.font.render(status_message, True, message_color)
-        gui.screen.blit(msg_surface, (50, 270))
-        pygame.display.update((50, 270, 500, 30))  
-        
-        if pygame.time.get_ticks() > message_display_start + 10000:
-            status_message = ""
-            pygame.display.update((50, 270, 500, 30))  
+        for path in paths:
+            papers.extend(read_output(path)[1])
+    except (OSError, ValueError) as e:
+        set_status(f"Could not load results: {e}", gui.COLORS['error'])
+        return
+    if len(paths) > 1:
+        papers.sort(key=lambda paper: paper['year'], reverse=True)
+    results_list.set_items(papers)
 
-# Main loop
+def cancel_action():
+    if worker.busy:
+        worker.cancel()
+
+def queue_caption():
+    pending = worker.pending_count
+    return f" ({pending} queued)" if pending else ""
+
+def handle_worker_events():
+    """Apply progress events from the download thread to the status line and progress bar"""
+    for kind, job, data in worker.poll():
+        name = job['scientist']
+        if kind == "queued":
+            set_status(f"Queued {name}{queue_caption()}", gui.COLORS['text'])
+        elif kind == "started":
+            progress_bar.set(0.0, f"Searching {name}...{queue_caption()}")
+        elif kind == "progress":
+            stage = data['stage']
+            if stage == "resolved":
+                caption = f"Profile: {data['profile_url']}" if data['profile_url'] else "No profile found"
+                progress_bar.set(0.05, caption)
+            elif stage == "fetched":
+                progress_bar.set(0.1, f"Fetched {data['bytes'] // 1024} KiB, {data['total']} entries")
+            elif stage == "parsing" and data['total']:
+                progress_bar.set(0.1 + 0.9 * data['done'] / data['total'],
+                                 f"Parsed {data['done']}/{data['total']} entries, kept {data['kept']}"
+                                 f"{queue_caption()}")
+            elif stage == "written":
+                progress_bar.set(1.0, f"Wrote {data['bytes'] // 1024} KiB")
+        elif kind == "done":
+            if data.get("success"):
+                show_results(job, data)
+            if data.get("success") and len(data.get("outputs", ())) > 1:
+                set_status(f"Downloaded {data['count']} papers into {len(data['outputs'])} files",
+                           gui.COLORS['success'])
+            elif data.get("success"):
+                set_status(f"Downloaded {data['count']} papers to {job['output_file']}",
+                           gui.COLORS['success'])
+            elif data.get("status") == "timeout":
+                progress_bar.set(0.0)
+                set_status(f"Timed out after {data['parsed']}/{data['total']} entries, "
+                           "nothing written", gui.COLORS['error'])
+            else:
+                set_status(f"Download failed: {data.get('error', 'Unknown error')}",
+                           gui.COLORS['error'])
+        elif kind == "failed":
+            progress_bar.set(0.0)
+            set_status(f"System error: {data}", gui.COLORS['error'])
+        elif kind == "cancelled":
+            progress_bar.set(0.0)
+            set_status(f"Cancelled {name}", gui.COLORS['error'])
+
+download_button = gui.Button(190, 200, 100, 40, "Download", download_action)
+cancel_button = gui.Button(310, 200, 100, 40, "Cancel", cancel_action)
+split_button = gui.Button(430, 200, 120, 40, "Split: off", split_action)
+progress_bar = gui.ProgressBar(50, 310, 500, 20)
+prev_button = gui.Button(380, 360, 80, 40, "Prev", lambda: results_list.scroll(-results_list.rows))
+next_button = gui.Button(470, 360, 80, 40, "Next", lambda: results_list.scroll(results_list.rows))
+
+status_message = gui.StatusMessage(50, 270, 500)
+results_caption = gui.Label(50, 688, width=500, color=gui.COLORS['muted'])
+labels = [gui.Label(50, 55, "Name:"), gui.Label(50, 105, "Year:"), gui.Label(50, 155, "Output File:"),
+          gui.Label(50, 370, "Filter:")]
+textboxes = [textbox_scientist, textbox_year, textbox_output, textbox_filter]
+renderer = gui.Renderer(labels + textboxes + [download_button, cancel_button, split_button,
+                                              progress_bar, status_message, prev_button,
+                                              next_button, results_list, results_caption])
+
+# Main loop: block until input, a timer or a worker event arrives, then redraw only what changed
 clock = pygame.time.Clock()
 running = True
 
 while running:
-    delta_time = clock.tick(60) / 1000  # Increase to 60 FPS
-    
-    # Event handling
-    for event in pygame.event.get():
+    # 过滤还没扫描完时不能阻塞，每帧扫描一小段
+    events = pygame.event.get() if results_list.busy else [pygame.event.wait()] + pygame.event.get()
+    for event in events:
         if event.type == pygame.QUIT:
             running = False
-            
-        textbox_scientist.handle_event(event)
-        textbox_year.handle_event(event)
-        textbox_output.handle_event(event)
-        download_button.handle_event(event)
-
-    textbox_scientist.update(delta_time)
-    textbox_year.update(delta_time)
-    textbox_output.update(delta_time)
-
-    gui.screen.fill(gui.COLORS['background'])
-    draw_labels()
-    textbox_scientist.draw(gui.screen)
-    textbox_year.draw(gui.screen)
-    textbox_output.draw(gui.screen)
-    download_button.draw(gui.screen)
-    draw_message()
-    
-    pygame.display.flip()
+        renderer.handle_event(event)
+
+    handle_worker_events()
+    results_list.set_filter(textbox_filter.text)
+    results_list.step()
+    results_caption.set(results_list.caption())
+    gui.set_cursor_blink(any(box.active for box in textboxes))
+    renderer.render(gui.screen)
+    clock.tick(60)  # 下载进度刷新时最多 60 FPS
 
 pygame.quit()
-sys.exit()
\ No newline at end of file
+sys.exit()
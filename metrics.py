@@ -0,0 +1,184 @@
+import io
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "dblp_downloader"
+
+
+class Metrics:
+    """
+    一次下载（或一批下载）的分阶段计时与计数。计时器记录次数、总耗时和最大耗时，
+    计数器为累加的整数。线程安全，批量下载时可以把各任务的汇总合并到一起。
+
+    参数:
+      profile: 为 True 时在 start() 与 stop() 之间用 cProfile 采样，汇总中附带最耗时的函数。
+      trace_memory: 为 True 时用 tracemalloc 记录峰值内存。tracemalloc 是进程级的，
+                    并发的多个任务同时开启时峰值会相互包含。
+    """
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._started = None
+        self._stopped = None
+        self._memory_peak = None
+        self._profile_text = None
+        self._owns_tracemalloc = False
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.trace_memory:
+            self._owns_tracemalloc = not tracemalloc.is_tracing()
+            if self._owns_tracemalloc:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        if self.profile:
+            import cProfile  # 只在开启采样时导入，pstats 同理
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        self._stopped = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.disable()
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            self._profile_text = out.getvalue()
+            self._profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._memory_peak = tracemalloc.get_traced_memory()[1]
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = {"count": 1, "total": seconds, "max": seconds}
+            else:
+                timer["count"] += 1
+                timer["total"] += seconds
+                if seconds > timer["max"]:
+                    timer["max"] = seconds
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed_iter(self, name, iterable):
+        """逐条计时的迭代器包装：每次取下一项的耗时记入计时器 name。"""
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def summary(self):
+        """可直接 JSON 序列化的汇总。"""
+        with self._lock:
+            data = {"timers": {name: dict(t) for name, t in self.timers.items()},
+                    "counters": dict(self.counters)}
+        if self._started is not None:
+            end = self._stopped if self._stopped is not None else time.perf_counter()
+            data["wall"] = end - self._started
+        if self._memory_peak is not None:
+            data["memory_peak_bytes"] = self._memory_peak
+        if self._profile_text is not None:
+            data["profile"] = self._profile_text
+        return data
+
+    def merge(self, summary):
+        """把另一次运行的 summary() 累加进来（用于批量下载的总计）。"""
+        for name, t in summary.get("timers", {}).items():
+            with self._lock:
+                timer = self.timers.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+                timer["count"] += t["count"]
+                timer["total"] += t["total"]
+                timer["max"] = max(timer["max"], t["max"])
+        for name, n in summary.get("counters", {}).items():
+            self.incr(name, n)
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def prometheus_text(self, labels=None):
+        """Prometheus 文本格式（node_exporter textfile collector 可直接读取）。"""
+        base = dict(labels or {})
+        lines = []
+        summary = self.summary()
+
+        def sample(metric, value, extra=None):
+            pairs = dict(base, **(extra or {}))
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(pairs.items()))
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+
+        timers = summary["timers"]
+        for suffix, key, kind, help_text in (
+            ("stage_seconds_total", "total", "counter", "各阶段累计耗时（秒）"),
+            ("stage_calls_total", "count", "counter", "各阶段执行次数"),
+            ("stage_seconds_max", "max", "gauge", "各阶段单次最长耗时（秒）"),
+        ):
+            metric = f"{PROMETHEUS_PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name in sorted(timers):
+                sample(metric, timers[name][key], {"stage": name})
+        for name in sorted(summary["counters"]):
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            sample(metric, summary["counters"][name])
+        if "wall" in summary:
+            metric = f"{PROMETHEUS_PREFIX}_wall_seconds"
+            lines.append(f"# TYPE {metric} gauge")
+            sample(metric, summary["wall"])
+        if "memory_peak_bytes" in summary:
+            metric = f"{PROMETHEUS_PREFIX}_memory_peak_bytes"
+            lines.append(f"# TYPE {metric} gauge")
+            sample(metric, summary["memory_peak_bytes"])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, labels=None):
+        # textfile collector 可能随时读取，必须整体替换
+        _atomic_write(path, self.prometheus_text(labels))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
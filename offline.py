@@ -0,0 +1,544 @@
+import argparse
+import array
+import gzip
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from html.entities import name2codepoint
+
+import dblp_api
+from dblp_api import DBLP_URL
+from pid_index import normalize_name
+
+# 离线模式：把 dblp 的完整数据转储（https://dblp.org/xml/dblp.xml.gz）转换为本地索引，
+# 之后 download_papers(..., backend="offline") 完全不访问网络。索引目录中有：
+#   records.<n>.jsonl  每行一条记录（论文或作者主页），只追加
+#   names.<n>.bin      检索段：作者姓名 / 别名 / PID 的哈希 -> 记录位置，按哈希排序，mmap 后二分查找
+#   keys.<n>.bin       记录 key 的哈希 -> 记录位置和 mdate，增量构建时用来判断记录是否变化
+#   dead.<n>.bin       已被新版本替换或已删除的记录偏移
+#   manifest.json      当前使用的上述文件，构建完成后原子替换
+
+DEFAULT_OFFLINE_DIR = ".dblp_offline"
+MANIFEST_FILE = "manifest.json"
+
+_MAGIC = b"DBLPIDX1"
+_HEADER = struct.Struct("<8sQ")
+# (键哈希, 记录偏移, 记录长度, 附加值)。keys 段的附加值为 mdate（yyyymmdd 形式的整数），
+# names 段中作者条目的附加值为论文年份，取某位作者的论文时不用解析记录就能排序
+_ENTRY = struct.Struct("<QQII")
+_HASH = struct.Struct("<Q")
+
+# 增量构建后段数或失效记录的比例超过上限时，改为完整重建
+MAX_SEGMENTS = 8
+MAX_DEAD_RATIO = 0.25
+
+
+def _hash(key):
+    return _HASH.unpack(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest())[0]
+
+
+def _mdate(value):
+    digits = value.replace("-", "")
+    return int(digits) if digits.isdigit() else 0
+
+
+def _year(paper_info):
+    return int(paper_info["year"]) if paper_info["year"].isdigit() else 0
+
+
+def _line_key(line):
+    # 记录行总是以 {"key":"..." 开头
+    return line[8:line.index(b'"', 8)]
+
+
+def profile_url(pid):
+    return f"{DBLP_URL}/pid/{pid}.html"
+
+
+def open_dump(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def iter_dump(source):
+    """
+    流式解析 dblp.xml 数据转储（文件对象），逐条产出顶层记录元素（<article>、<www> 等）。
+    转储通过外部 DTD 引用 &uuml; 等 HTML 命名实体，这里用 html.entities 的映射代替 DTD。
+    每条记录产出后即从树中移除，内存占用与转储大小无关；元素只在下一次迭代前有效。
+    """
+    parser = ET.XMLParser(target=ET.TreeBuilder())
+    parser.entity.update((name, chr(code)) for name, code in name2codepoint.items())
+    context = ET.iterparse(source, events=("start", "end"), parser=parser)
+    _, root = next(context)
+    for event, elem in context:
+        if event == "end" and elem.tag in dblp_api.RECORD_TAGS:
+            yield elem
+            root.clear()
+
+
+def _wanted(elem):
+    """论文记录和作者主页（homepages/，不含同名消歧页）需要索引，其他 <www> 记录跳过。"""
+    if elem.tag != "www":
+        return True
+    return elem.get("key", "").startswith("homepages/") and not any(
+        note.get("type") == "disambiguation" for note in elem.findall("note"))
+
+
+def _record(elem):
+    """把一条记录转换为 (行数据, [(检索键, 附加值), ...])。"""
+    key = elem.get("key", "")
+    if elem.tag == "www":
+        names = dblp_api.record_authors(elem)
+        pid = key[len("homepages/"):]
+        data = {"key": key, "pid": pid, "names": names}
+        index_keys = ["p:" + pid] + list(dict.fromkeys("n:" + normalize_name(n) for n in names))
+        return data, [(index_key, 0) for index_key in index_keys]
+    paper_info = dblp_api.record_paper_info(elem)
+    data = {"key": key, "paper": paper_info}
+    year = _year(paper_info)
+    return data, [("a:" + name, year) for name in dict.fromkeys(paper_info["authors"])]
+
+
+def iter_papers(content, years=None):
+    """解析 OfflineIndex.get() 返回的内容（每行一条论文记录），逐条产出 paper_info。"""
+    for line in content.splitlines():
+        paper_info = json.loads(line)["paper"]
+        if years is None or years.matches(paper_info["year"]):
+            yield paper_info
+
+
+def _read_entries(f):
+    while True:
+        block = f.read(_ENTRY.size * 4096)
+        if not block:
+            return
+        yield from _ENTRY.iter_unpack(block)
+
+
+class _SortedRuns:
+    """外部排序：条目攒满 chunk_size 条就排好序写入临时文件，最后多路归并为一个段文件。"""
+
+    def __init__(self, directory, chunk_size):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._buffer = []
+        self._runs = []
+
+    def add(self, entry):
+        self._buffer.append(entry)
+        self.count += 1
+        if len(self._buffer) >= self.chunk_size:
+            self._spill()
+
+    def _spill(self):
+        self._buffer.sort()
+        run = tempfile.TemporaryFile(dir=self.directory)
+        run.write(b"".join(_ENTRY.pack(*entry) for entry in self._buffer))
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+
+    def write(self, path):
+        self._buffer.sort()
+        merged = heapq.merge(self._buffer, *(_read_entries(run) for run in self._runs))
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as out:
+            out.write(_HEADER.pack(_MAGIC, self.count))
+            for entry in merged:
+                out.write(_ENTRY.pack(*entry))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, path)
+        for run in self._runs:
+            run.close()
+
+
+class _Segment:
+    """mmap 打开的索引段，按哈希二分查找。"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, self.count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"不是离线索引文件: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+
+    def find(self, h):
+        """产出哈希为 h 的所有条目 (位置, 偏移, 长度, 附加值)。"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _HASH.unpack_from(self._map, _HEADER.size + mid * _ENTRY.size)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.count:
+            entry = self._entry(lo)
+            if entry[0] != h:
+                return
+            yield (lo,) + entry[1:]
+            lo += 1
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield (i,) + self._entry(i)[1:]
+
+    def close(self):
+        self._map.close()
+
+
+class _Response:
+    __slots__ = ("url", "content", "status_code", "headers")
+
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class OfflineIndex:
+    """
+    build_index 构建的离线索引（只读，线程安全）。作为 download_papers(..., backend="offline")
+    的 fetcher 使用：lookup() 代替搜索，get(个人主页 URL) 返回该作者的全部论文记录，
+    不访问网络。打开后看到的是打开时的索引，重建不影响已打开的实例。
+
+    参数:
+      directory: build_index 使用的索引目录。
+    """
+
+    def __init__(self, directory=DEFAULT_OFFLINE_DIR):
+        self.directory = directory
+        self.manifest = _read_manifest(directory)
+        if self.manifest is None:
+            raise FileNotFoundError(f"离线索引不存在，请先运行 python offline.py build: {directory}")
+        size = self.manifest["records_size"]
+        self._file = open(os.path.join(directory, self.manifest["records"]), "rb")
+        self._records = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+        self._names = [_Segment(os.path.join(directory, s["names"]))
+                       for s in self.manifest["segments"]]
+        self._keys = [_Segment(os.path.join(directory, s["keys"]))
+                      for s in self.manifest["segments"]]
+        self._dead = set()
+        if self.manifest["dead"]:
+            dead = array.array("Q")
+            with open(os.path.join(directory, self.manifest["dead"]), "rb") as f:
+                dead.frombytes(f.read())
+            self._dead.update(dead)
+
+    def _lookup(self, key):
+        """产出检索键 key 对应的有效记录 (偏移, 附加值, 原始行)。"""
+        h = _hash(key)
+        for segment in self._names:
+            for _, offset, length, aux in segment.find(h):
+                if offset not in self._dead:
+                    yield offset, aux, self._records[offset:offset + length]
+
+    def _find_key(self, key):
+        """记录 key 的当前版本：(段序号, 段内位置, 偏移, mdate)，没有时返回 None。"""
+        h = _hash("k:" + key)
+        for s, segment in enumerate(self._keys):
+            for pos, offset, _, mdate in segment.find(h):
+                if offset not in self._dead:
+                    return s, pos, offset, mdate
+        return None
+
+    def find_person(self, scientist):
+        """
+        按姓名或别名查找作者主页记录 {"key", "pid", "names"}，找不到时返回 None。
+        没有完全同名的作者时再尝试编号为 0001 的同名作者（dblp 用 "Feng Zhao 0001" 区分同名者）。
+        """
+        for name in (scientist, f"{scientist} 0001"):
+            key = normalize_name(name)
+            for _, _, line in self._lookup("n:" + key):
+                person = json.loads(line)
+                if key in (normalize_name(n) for n in person["names"]):
+                    return person
+        return None
+
+    def lookup(self, scientist):
+        """科学家的个人主页 URL，找不到时返回 ""（与在线搜索相同）。"""
+        person = self.find_person(scientist)
+        return profile_url(person["pid"]) if person is not None else ""
+
+    def profile_content(self, pid):
+        """
+        PID 对应作者（含全部别名）的论文记录，每行一条，按年份降序、同年按 key 排列，
+        与索引是完整重建还是增量更新无关。只读取索引和记录行，不解析 JSON。
+        """
+        people = (json.loads(line) for _, _, line in self._lookup("p:" + pid))
+        person = next((p for p in people if p["pid"] == pid), None)
+        if person is None:
+            return b""
+        found = {}
+        for name in person["names"]:
+            # 64 位哈希碰撞的概率极低，这里只粗略核对记录中出现了这个姓名
+            quoted = json.dumps(name, ensure_ascii=False).encode("utf-8")
+            for offset, year, line in self._lookup("a:" + name):
+                if offset not in found and quoted in line:
+                    found[offset] = (-year, _line_key(line), line)
+        return b"".join(line for _, _, line in sorted(found.values()))
+
+    def get(self, url, headers=None, cancel_token=None):
+        """与 Fetcher.get 相同的接口，只支持个人主页 URL（lookup() 的返回值）。"""
+        if cancel_token is not None:
+            cancel_token.check()
+        pid = dblp_api.pid_from_url(url)
+        if not pid:
+            raise ValueError(f"离线索引只能提供个人主页: {url}")
+        return _Response(url, self.profile_content(pid))
+
+    def stats(self):
+        m = self.manifest
+        return {"records": m["records_count"] - m["dead_count"], "segments": len(m["segments"]),
+                "dump": m["dump"]["path"], "built_at": m["built_at"],
+                "last_build": m["last_build"]}
+
+    def close(self):
+        for segment in self._names + self._keys:
+            segment.close()
+        if self._records:
+            self._records.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cleanup(directory, manifest):
+    """删除清单不再引用的文件（上一版的段、被完整重建替换的记录文件、中断留下的临时文件）。"""
+    keep = {manifest["records"], manifest["dead"], MANIFEST_FILE}
+    for s in manifest["segments"]:
+        keep.update(s.values())
+    for name in os.listdir(directory):
+        if name.startswith(("records.", "names.", "keys.", "dead.")) and name not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                # Windows 上仍被其他进程映射的文件删不掉，下次构建再删
+                pass
+
+
+def build_index(dump_path, directory=DEFAULT_OFFLINE_DIR, full=False, chunk_size=1000000,
+                progress=None):
+    """
+    从 dblp.xml(.gz) 数据转储构建离线索引，新转储到来时增量更新。
+
+    转储只流式读取一遍，内存占用由 chunk_size 决定（索引条目超过它时外部排序），
+    与转储大小无关。已有索引时：转储未变化（修改时间或 SHA-256 相同）直接跳过；
+    否则 key 和 mdate 都没变的记录只查一次索引，不重新提取和写入，新增和修改的
+    记录追加到记录文件并写成一个新的索引段，被替换和已删除的旧记录标记为失效。
+    段数达到 MAX_SEGMENTS 或失效记录超过 MAX_DEAD_RATIO 时改为完整重建。
+    构建期间原索引照常可用，完成后原子替换 manifest.json。
+
+    参数:
+      dump_path: dblp.xml.gz 或 dblp.xml 的路径。
+      directory: 索引目录。
+      full: 为 True 时忽略已有索引，完整重建。
+      chunk_size: 内存中最多缓存的索引条目数。
+      progress: 可选的回调 progress(已读取的记录数)，每 100000 条调用一次。
+
+    返回:
+      {"mode": "skipped" / "full" / "incremental", "records": 转储中的记录数,
+       "added", "updated", "removed", "unchanged", "seconds"}
+    """
+    start = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    old = _read_manifest(directory)
+    stat = os.stat(dump_path)
+    dump = {"path": os.path.abspath(dump_path), "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns}
+    if old is not None and old["dump"]["size"] == dump["size"] and \
+            old["dump"]["mtime_ns"] == dump["mtime_ns"]:
+        dump["sha256"] = old["dump"]["sha256"]
+    else:
+        dump["sha256"] = _sha256(dump_path)
+    stats = {"mode": "skipped", "records": 0, "added": 0, "updated": 0, "removed": 0,
+             "unchanged": 0}
+    if old is not None and not full and old["dump"]["sha256"] == dump["sha256"]:
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    incremental = (old is not None and not full and len(old["segments"]) < MAX_SEGMENTS
+                   and old["dead_count"] <= MAX_DEAD_RATIO * old["records_count"])
+    seq = old["seq"] + 1 if old is not None else 1
+    base = OfflineIndex(directory) if incremental else None
+    if incremental:
+        stats["mode"] = "incremental"
+        records_name = old["records"]
+        records = open(os.path.join(directory, records_name), "r+b")
+        # 上次构建中断时记录文件末尾可能有未登记的数据
+        records.truncate(old["records_size"])
+        records.seek(0, os.SEEK_END)
+        dead = set(base._dead)
+        seen = [bytearray((segment.count + 7) // 8) for segment in base._keys]
+    else:
+        stats["mode"] = "full"
+        records_name = f"records.{seq}.jsonl"
+        records = open(os.path.join(directory, records_name), "wb")
+        dead = set()
+    names = _SortedRuns(directory, chunk_size)
+    keys = _SortedRuns(directory, chunk_size)
+    offset = records.tell()
+
+    try:
+        with records, open_dump(dump_path) as source:
+            for elem in iter_dump(source):
+                stats["records"] += 1
+                if progress is not None and stats["records"] % 100000 == 0:
+                    progress(stats["records"])
+                if not _wanted(elem):
+                    continue
+                key = elem.get("key", "")
+                mdate = _mdate(elem.get("mdate", ""))
+                previous = base._find_key(key) if base is not None else None
+                if previous is None:
+                    stats["added"] += 1
+                else:
+                    s, pos, previous_offset, previous_mdate = previous
+                    seen[s][pos >> 3] |= 1 << (pos & 7)
+                    if previous_mdate == mdate:
+                        stats["unchanged"] += 1
+                        continue
+                    dead.add(previous_offset)
+                    stats["updated"] += 1
+
+                data, index_keys = _record(elem)
+                line = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                line += b"\n"
+                records.write(line)
+                keys.add((_hash("k:" + key), offset, len(line), mdate))
+                for index_key, aux in index_keys:
+                    names.add((_hash(index_key), offset, len(line), aux))
+                offset += len(line)
+            records.flush()
+            os.fsync(records.fileno())
+
+        segments = list(old["segments"]) if incremental else []
+        records_count = old["records_count"] if incremental else 0
+        if base is not None:
+            # 旧索引中有、新转储中没有的记录已被删除
+            for s, segment in enumerate(base._keys):
+                marks = seen[s]
+                for pos, previous_offset, _, _ in segment:
+                    if not marks[pos >> 3] & (1 << (pos & 7)) and previous_offset not in dead:
+                        dead.add(previous_offset)
+                        stats["removed"] += 1
+        if keys.count:
+            segment = {"names": f"names.{seq}.bin", "keys": f"keys.{seq}.bin"}
+            names.write(os.path.join(directory, segment["names"]))
+            keys.write(os.path.join(directory, segment["keys"]))
+            segments.append(segment)
+            records_count += keys.count
+        dead_name = None
+        if dead:
+            dead_name = f"dead.{seq}.bin"
+            with open(os.path.join(directory, dead_name), "wb") as f:
+                array.array("Q", sorted(dead)).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+    finally:
+        if base is not None:
+            base.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    manifest = {"version": 1, "seq": seq, "dump": dump, "records": records_name,
+                "records_size": offset, "records_count": records_count, "dead": dead_name,
+                "dead_count": len(dead), "segments": segments, "built_at": time.time(),
+                "last_build": stats}
+    tmp = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, MANIFEST_FILE))
+    _cleanup(directory, manifest)
+    return stats
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_default_index():
+    """返回进程内共享的 OfflineIndex（DEFAULT_OFFLINE_DIR），首次调用时打开。"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = OfflineIndex()
+        return _default_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="基于 dblp 数据转储（dblp.xml.gz）的离线模式")
+    parser.add_argument("-d", "--dir", default=DEFAULT_OFFLINE_DIR, help="索引目录")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="从数据转储构建索引（已有索引时增量更新）")
+    build.add_argument("dump", help="dblp.xml.gz 或 dblp.xml")
+    build.add_argument("--full", action="store_true", help="忽略已有索引，完整重建")
+    build.add_argument("--chunk-size", type=int, default=1000000,
+                       help="内存中最多缓存的索引条目数（决定构建的峰值内存）")
+
+    download = commands.add_parser("download", help="离线下载一位科学家的论文（同 download_papers）")
+    download.add_argument("scientist")
+    download.add_argument("-y", "--year", default="-1", help="年份条件，如 2022、2019-2023")
+    download.add_argument("-o", "--output", help="输出文件，默认 {scientist}_{year}.json")
+
+    commands.add_parser("stats", help="显示索引的记录数和最近一次构建的统计")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        stats = build_index(args.dump, args.dir, args.full, args.chunk_size,
+                            progress=lambda n: print(f"已读取 {n} 条记录"))
+        print(json.dumps(stats, ensure_ascii=False))
+        return 0
+
+    index = OfflineIndex(args.dir)
+    if args.command == "download":
+        import downloader
+        from writer import default_output_name
+        output = args.output or default_output_name(args.scientist, args.year)
+        start = time.perf_counter()
+        result = downloader.download_papers(args.scientist, args.year, output, fetcher=index,
+                                            backend="offline")
+        print(f"共 {result['count']} 篇，耗时 {time.perf_counter() - start:.3f}s")
+    else:
+        print(json.dumps(index.stats(), ensure_ascii=False))
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
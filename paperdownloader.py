@@ -0,0 +1,177 @@
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import downloader
+import offline
+from writer import default_output_name
+
+# 命令行入口只依赖下载流程本身，不导入 gui / pygame；requests、bs4 等较重的依赖
+# 由 downloader 在第一次用到时才导入，冷启动时间见 benchmark.py --startup。
+
+STDIO = "-"
+
+
+def read_names(stream):
+    """从文本流中读取姓名，每行一个，忽略空行和以 # 开头的注释行。"""
+    names = []
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            names.append(line)
+    return names
+
+
+def output_path(out, scientist, year, split=None):
+    """
+    计算一位科学家的输出文件名。out 省略时同 writer.default_output_name；
+    out 中的 {scientist} 占位符替换为姓名，{year} / {venue} 留给 partition.Partition。
+    """
+    if out is None:
+        return default_output_name(scientist, year, split)
+    return out.replace("{scientist}", scientist)
+
+
+def _make_fetcher(args):
+    if args.backend == "offline":
+        return offline.OfflineIndex(args.offline_dir)
+    from fetcher import Fetcher
+    cache = None
+    if args.cache_dir:
+        from cache import ResponseCache
+        cache = ResponseCache(args.cache_dir)
+    if args.base_url:
+        return Fetcher(base_url=args.base_url, cache=cache)
+    return Fetcher(cache=cache)
+
+
+def _copy_to_stdout(path, scientist=None):
+    """
+    把输出文件复制到标准输出。给出 scientist 时文件为 jsonl，每行开头加上
+    "scientist" 字段，多位科学家的论文写到同一个流中时下游仍能区分。
+    """
+    with open(path, "rb") as f:
+        if scientist is None:
+            shutil.copyfileobj(f, sys.stdout.buffer)
+        else:
+            prefix = '{"scientist": ' + json.dumps(scientist, ensure_ascii=False) + ", "
+            prefix = prefix.encode("utf-8")
+            for line in f:
+                # 每行都是一篇论文的 JSON 对象
+                sys.stdout.buffer.write(prefix + line[1:])
+    sys.stdout.buffer.flush()
+
+
+def fetch(names, args, log):
+    """
+    依次下载 names 中每位科学家的论文，返回失败的个数。
+    args.out 为 "-" 时先写入临时目录，完成后整份复制到标准输出，
+    不会把写了一半的结果交给管道下游；jsonl 格式的每行带有 "scientist" 字段。
+    """
+    fetcher = _make_fetcher(args)
+    pid_index = None
+    if args.pid_index:
+        from pid_index import PidIndex
+        pid_index = PidIndex(args.pid_index)
+
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix="paperdownloader-") as tmp:
+        for scientist in names:
+            if args.out == STDIO:
+                output_file = os.path.join(tmp, "stdout." + (args.format or "json"))
+            else:
+                output_file = output_path(args.out, scientist, args.year, args.split)
+            resolved = {}
+
+            def progress(event):
+                if event["stage"] == "resolved":
+                    resolved["profile_url"] = event["profile_url"]
+
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(log):
+                    result = downloader.download_papers(
+                        scientist, args.year, output_file, fetcher=fetcher, backend=args.backend,
+                        pid_index=pid_index, output_format=args.format, progress=progress,
+                        timeout=args.timeout)
+            except Exception as e:
+                result = {"success": False, "status": "error", "error": str(e)}
+            elapsed = time.perf_counter() - start
+
+            if not result["success"]:
+                failed += 1
+                print(f"失败: {scientist}: {result.get('error') or result['status']}",
+                      file=sys.stderr)
+                continue
+            if not resolved.get("profile_url"):
+                failed += 1
+                print(f"未找到: {scientist}", file=sys.stderr)
+            if args.out == STDIO:
+                _copy_to_stdout(output_file, scientist if args.format == "jsonl" else None)
+                os.remove(output_file)
+            if not args.quiet:
+                print(f"{scientist}: {result['count']} 篇，耗时 {elapsed:.2f}s", file=sys.stderr)
+
+    if hasattr(fetcher, "close"):
+        fetcher.close()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="paperdownloader", description="从 dblp 下载科学家的论文列表（命令行版，不需要图形界面）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser(
+        "fetch", help="下载一位或多位科学家的论文",
+        description="姓名为 - 或省略且标准输入不是终端时，从标准输入逐行读取姓名")
+    cmd.add_argument("names", nargs="*", metavar="NAME", help="科学家姓名")
+    cmd.add_argument("-y", "--year", default="-1", help="年份条件，如 2022、2019-2023，默认全部")
+    cmd.add_argument("-o", "--out",
+                     help="输出文件，可含 {scientist} / {year} / {venue} 占位符；"
+                          "- 表示写到标准输出；默认 {scientist}_{year}.json")
+    cmd.add_argument("--split", choices=["year", "venue"],
+                     help="按年份或刊物拆分成多个输出文件（使用默认文件名时）")
+    cmd.add_argument("-f", "--format", choices=["json", "jsonl"],
+                     help="输出格式，默认根据 --out 的扩展名推断（标准输出为 json）")
+    cmd.add_argument("--backend", choices=["html", "xml", "offline"], default="html",
+                     help="html 解析主页；xml 使用 dblp API；offline 读取本地数据转储索引")
+    cmd.add_argument("--offline-dir", default=offline.DEFAULT_OFFLINE_DIR,
+                     help="--backend offline 的索引目录")
+    cmd.add_argument("--timeout", type=float, help="每位科学家的下载截止时间（秒）")
+    cmd.add_argument("--pid-index", metavar="PATH", help="姓名 -> 个人主页索引文件（SQLite）")
+    cmd.add_argument("--cache-dir", help="HTTP 响应缓存目录")
+    cmd.add_argument("--base-url", help="dblp 镜像地址，默认 https://dblp.org")
+    cmd.add_argument("-q", "--quiet", action="store_true", help="只输出错误信息")
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.names if name != STDIO]
+    if len(names) < len(args.names) or (not args.names and not sys.stdin.isatty()):
+        names += read_names(sys.stdin)
+    if not names:
+        parser.error("没有给出科学家姓名")
+    if args.out is not None and args.split:
+        parser.error("--split 不能与 --out 同时使用，可在 --out 中直接写 {year} / {venue}")
+    if args.out == STDIO and args.format != "jsonl" and len(names) > 1:
+        parser.error("多位科学家输出到标准输出时请使用 --format jsonl")
+    if args.out not in (None, STDIO) and len(names) > 1 and "{scientist}" not in args.out:
+        parser.error("多位科学家时 --out 需要包含 {scientist} 占位符")
+
+    # 下载过程中的提示信息写到标准错误，标准输出只留给论文数据
+    with open(os.devnull, "w") if args.quiet else contextlib.nullcontext(sys.stderr) as log:
+        try:
+            failed = fetch(names, args, log)
+        except BrokenPipeError:
+            # 管道下游提前退出（如 | head），不再打印异常栈
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import re
+
+from writer import open_writer
+from years import YearFilter, parse_years
+
+# 文件名中不能出现的字符
+_UNSAFE = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def _safe(value):
+    return _UNSAFE.sub("_", value).strip("_.") or "unknown"
+
+
+def paper_venue(paper_info):
+    return paper_info.get("venue", {}).get("name", "")
+
+
+class Partition:
+    """
+    一个输出分区：一个文件（或文件名模板）加上年份/刊物过滤条件。
+
+    output_file 中可以使用 {year} 和 {venue} 占位符，此时每个不同的年份/刊物各写一个文件，
+    例如 "Feng Zhao_{year}.json" 配合 year="2019-2021" 会得到三个文件。
+
+    参数:
+      output_file: 输出文件路径或模板。
+      year: 年份条件，见 years.parse_years，默认不过滤。
+      venue: 只保留该刊物名（精确匹配）的论文；None 表示不过滤。
+    """
+
+    def __init__(self, output_file, year=-1, venue=None):
+        self.output_file = output_file
+        self.years = parse_years(year)
+        self.venue = venue
+        self.by_year = "{year}" in output_file
+        self.by_venue = "{venue}" in output_file
+
+    @property
+    def templated(self):
+        return self.by_year or self.by_venue
+
+    def matches(self, paper_info):
+        if not self.years.matches(paper_info["year"]):
+            return False
+        return self.venue is None or paper_venue(paper_info) == self.venue
+
+    def path_for(self, paper_info):
+        """该论文应写入的文件路径。"""
+        if not self.templated:
+            return self.output_file
+        return self._fill(_safe(paper_info["year"]), _safe(paper_venue(paper_info)))
+
+    def _fill(self, year, venue=""):
+        return self.output_file.replace("{year}", str(year)).replace("{venue}", venue)
+
+    def known_paths(self):
+        """在看到任何论文之前就能确定的输出文件（固定文件名，或 {year} 模板配合有限的年份集合）。"""
+        if not self.templated:
+            return [self.output_file]
+        if self.by_year and not self.by_venue and not self.years.all:
+            return [self._fill(y) for y in sorted(self.years.years, reverse=True)]
+        return []
+
+    def __repr__(self):
+        return f"Partition({self.output_file!r}, year={str(self.years)!r}, venue={self.venue!r})"
+
+
+def as_partition(spec):
+    """把 Partition、(output_file, year[, venue]) 元组或同名键的字典转成 Partition。"""
+    if isinstance(spec, Partition):
+        return spec
+    if isinstance(spec, dict):
+        return Partition(spec["output_file"], spec.get("year", -1), spec.get("venue"))
+    return Partition(*spec)
+
+
+def union_years(partitions):
+    """所有分区年份条件的并集，用于解析时跳过所有分区都不需要的年份分组。"""
+    years = set()
+    for partition in partitions:
+        if partition.years.all:
+            return YearFilter()
+        years.update(partition.years.years)
+    return parse_years(years) if years else YearFilter()
+
+
+class PartitionRouter:
+    """
+    把一次解析得到的论文分发到多个分区的输出（writer.open_writer）。所有文件都先写临时文件，
+    commit() 时一起原子地替换，abort() 时全部丢弃。
+    """
+
+    def __init__(self, partitions, scientist, profile_url, output_format=None, compression=None):
+        self.partitions = partitions
+        self.scientist = scientist
+        self.profile_url = profile_url
+        self.output_format = output_format
+        self.compression = compression
+        self.writers = {}
+        self.count = 0
+        # 每个分区写入的论文数，与 partitions 一一对应
+        self.partition_counts = [0] * len(partitions)
+        try:
+            for partition in partitions:
+                for path in partition.known_paths():
+                    self._writer(path)
+        except Exception:
+            self.abort()
+            raise
+
+    def _writer(self, path):
+        writer = self.writers.get(path)
+        if writer is None:
+            writer = open_writer(path, self.scientist, self.profile_url,
+                                 self.output_format, self.compression)
+            self.writers[path] = writer
+        return writer
+
+    def write(self, paper_info):
+        """写入所有匹配的分区，返回是否至少写入了一个。"""
+        written = set()
+        for i, partition in enumerate(self.partitions):
+            if partition.matches(paper_info):
+                self.partition_counts[i] += 1
+                path = partition.path_for(paper_info)
+                if path not in written:
+                    self._writer(path).write(paper_info)
+                    written.add(path)
+        if written:
+            self.count += 1
+        return bool(written)
+
+    @property
+    def bytes_written(self):
+        return sum(writer.bytes_written for writer in self.writers.values())
+
+    def counts(self):
+        return {path: writer.count for path, writer in self.writers.items()}
+
+    def commit(self):
+        for writer in self.writers.values():
+            writer.commit()
+
+    def abort(self):
+        for writer in self.writers.values():
+            writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
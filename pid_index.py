@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_INDEX_PATH = ".dblp_pid_index.sqlite"
+
+
+def normalize_name(name):
+    """统一大小写、全半角和空白，使 "feng  zhao" 与 "Feng Zhao" 命中同一条记录。"""
+    name = unicodedata.normalize("NFKC", name)
+    return " ".join(name.split()).casefold()
+
+
+class PidIndex:
+    """
+    科学家姓名 -> dblp 个人主页 URL 的本地持久索引（SQLite），前面加一层内存 LRU。
+    解析失败的姓名也会记录（空 URL），在 negative_ttl 秒内不再重复搜索。
+
+    参数:
+      path: SQLite 文件路径，":memory:" 表示只在内存中。
+      lru_size: 内存 LRU 的容量。
+      negative_ttl: 负缓存的有效期（秒）。
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, lru_size=4096, negative_ttl=24 * 3600):
+        self.lru_size = lru_size
+        self.negative_ttl = negative_ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS names ("
+            " name TEXT PRIMARY KEY,"
+            " profile_url TEXT NOT NULL,"
+            " resolved_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _valid(self, profile_url, resolved_at):
+        return profile_url or time.time() - resolved_at < self.negative_ttl
+
+    def _remember(self, key, profile_url, resolved_at):
+        self._lru[key] = (profile_url, resolved_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def lookup(self, name):
+        """返回已索引的 URL（未解析成功的为 ""）；索引中没有或负缓存已过期时返回 None。"""
+        return self.lookup_many([name]).get(name)
+
+    def lookup_many(self, names):
+        """批量查询，返回 {name: profile_url}，只包含索引中有效的条目。"""
+        found = {}
+        missing = {}
+        with self._lock:
+            for name in names:
+                key = normalize_name(name)
+                entry = self._lru.get(key)
+                if entry is not None and self._valid(*entry):
+                    self._lru.move_to_end(key)
+                    found[name] = entry[0]
+                else:
+                    missing.setdefault(key, []).append(name)
+            keys = list(missing)
+            # SQLite 默认最多 999 个参数，分块查询
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(
+                    "SELECT name, profile_url, resolved_at FROM names WHERE name IN (%s)"
+                    % ",".join("?" * len(chunk)), chunk)
+                for key, profile_url, resolved_at in rows:
+                    if not self._valid(profile_url, resolved_at):
+                        continue
+                    self._remember(key, profile_url, resolved_at)
+                    for name in missing[key]:
+                        found[name] = profile_url
+        return found
+
+    def store_many(self, resolved):
+        """写入 {name: profile_url}，一次事务完成。"""
+        now = time.time()
+        rows = [(normalize_name(name), url or "", now) for name, url in resolved.items()]
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO names (name, profile_url, resolved_at) VALUES (?, ?, ?)",
+                    rows)
+            for key, url, resolved_at in rows:
+                self._remember(key, url, resolved_at)
+
+    def resolve(self, name, resolver):
+        """
+        先查索引，未命中时调用 resolver(name) 联网解析并写回索引。
+        """
+        profile_url = self.lookup(name)
+        if profile_url is None:
+            profile_url = resolver(name)
+            self.store_many({name: profile_url})
+        return profile_url
+
+    def bulk_resolve(self, names, resolver, max_workers=4):
+        """
+        批量解析。规范化后相同的姓名只解析一次，已索引的姓名不发请求，
+        其余的用有界线程池并发解析，最后一次性写回索引。
+
+        返回:
+          {name: profile_url}，搜索无结果的为 ""；联网出错的姓名不写入索引，也不出现在结果中。
+        """
+        result = self.lookup_many(names)
+        pending = {}
+        for name in names:
+            if name not in result:
+                pending.setdefault(normalize_name(name), name)
+
+        resolved = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {pool.submit(resolver, name): name for name in pending.values()}
+                for future, name in futures.items():
+                    try:
+                        resolved[name] = future.result()
+                    except Exception:
+                        continue
+            self.store_many(resolved)
+
+        for name in names:
+            if name not in result:
+                key = normalize_name(name)
+                if pending[key] in resolved:
+                    result[name] = resolved[pending[key]]
+        return result
+
+    def close(self):
+        with self._lock:
+            self._db.close()
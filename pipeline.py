@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import downloader
+import offline
+from fetcher import get_default_fetcher
+from metrics import Metrics
+from partition import PartitionRouter, as_partition, union_years
+
+# 通知下游线程退出的标记
+_STOP = object()
+
+
+def parse_content(content, backend="html", engine=None, years=None):
+    """
+    在子进程中执行：解析原始字节，返回 (年份匹配的 paper_info 列表, 解析耗时)。
+    只接收 bytes 和可 pickle 的参数，不依赖父进程中的任何对象。
+    """
+    start = time.perf_counter()
+    papers = downloader.parse_profile(content, backend, engine, years)
+    if years is None or years.all:
+        papers = list(papers)
+    else:
+        papers = [paper for paper in papers if years.matches(paper["year"])]
+    return papers, time.perf_counter() - start
+
+
+class Pipeline:
+    """
+    批量下载的流水线：resolve → fetch → parse → write 四个阶段，阶段之间用有界队列连接。
+    网络阶段（resolve / fetch）在线程中执行；CPU 密集的解析交给 ProcessPoolExecutor，
+    子进程直接接收页面的原始字节，不受 GIL 限制，吞吐量随核数增加；写文件在线程中执行。
+    下游处理不过来时上游会阻塞在队列上（背压），内存中同时存在的页面数有上限。
+
+    参数:
+      fetcher: 可选的 fetcher.Fetcher，默认使用进程内共享的连接池。
+      backend / engine / pid_index / output_format / compression / store: 同 download_papers。
+      resolve_workers / fetch_workers: 解析姓名和获取主页的线程数。
+      parse_workers: 解析进程数，默认为 CPU 核数。
+      write_workers: 写文件的线程数。
+      queue_size: 每个阶段之间队列的容量。
+      metrics: 可选的 metrics.Metrics，记录各阶段耗时（resolve / fetch / parse / write），
+               parse 为子进程内的实际解析时间，parse_wait 为提交到取回结果的总时间。
+      progress: 可选的回调 progress(result)，每个任务完成时在写线程中调用。
+    """
+
+    def __init__(self, fetcher=None, backend="html", engine=None, pid_index=None,
+                 output_format=None, compression=None, store=None, resolve_workers=4,
+                 fetch_workers=8, parse_workers=None, write_workers=2, queue_size=16,
+                 metrics=None, progress=None):
+        if fetcher is None:
+            fetcher = offline.get_default_index() if backend == "offline" else get_default_fetcher()
+        self.fetcher = fetcher
+        self.backend = backend
+        self.engine = engine
+        self.pid_index = pid_index
+        self.output_format = output_format
+        self.compression = compression
+        self.store = store
+        self.resolve_workers = resolve_workers
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.progress = progress if progress is not None else (lambda result: None)
+
+    def _resolve(self, job):
+        with self.metrics.timer("resolve"):
+            job["profile_url"] = downloader.find_profile(job["scientist"], self.fetcher,
+                                                         self.backend, self.pid_index)
+
+    def _fetch(self, job, pool):
+        if job["profile_url"]:
+            url = downloader.profile_request_url(job["profile_url"], self.backend)
+            with self.metrics.timer("fetch"):
+                content = self.fetcher.get(url).content
+            self.metrics.incr("profile_bytes", len(content))
+            job["submitted"] = time.perf_counter()
+            job["future"] = pool.submit(parse_content, content, self.backend, self.engine,
+                                        job["years"])
+
+    def _write(self, job):
+        papers = []
+        if "future" in job:
+            papers, seconds = job.pop("future").result()
+            self.metrics.observe("parse", seconds)
+            self.metrics.observe("parse_wait", time.perf_counter() - job.pop("submitted"))
+        with self.metrics.timer("write"):
+            router = PartitionRouter(job["partitions"], job["scientist"], job["profile_url"],
+                                     self.output_format, self.compression)
+            with router:
+                kept = [paper for paper in papers if router.write(paper)]
+            if self.store is not None and kept:
+                self.store.ingest(job["scientist"], job["profile_url"], kept)
+        self.metrics.incr("entries_seen", len(papers))
+        self.metrics.incr("entries_kept", router.count)
+        self.metrics.incr("bytes_written", router.bytes_written)
+        job.update(success=True, status="ok", count=router.count, outputs=router.counts(),
+                   partition_counts=router.partition_counts)
+
+    def _finish(self, job):
+        job["elapsed"] = time.perf_counter() - job.pop("start")
+        del job["partitions"], job["years"]
+        self.progress(job)
+
+    def _stage(self, work, inbox, outbox, workers, on_done=None):
+        def loop():
+            while True:
+                job = inbox.get()
+                if job is _STOP:
+                    return
+                if "error" not in job:
+                    try:
+                        work(job)
+                    except Exception as e:
+                        job.update(success=False, status="error", count=0, error=str(e))
+                        job.pop("future", None)
+                if on_done is not None:
+                    on_done(job)
+                outbox.put(job)
+
+        threads = [threading.Thread(target=loop, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def run(self, jobs):
+        """
+        执行一批任务。jobs 为 (scientist, partitions) 列表，partitions 的写法同
+        downloader.download_partitioned。每个科学家只搜索、获取、解析一次。
+
+        返回:
+          每个任务一个结果字典（按完成顺序）：scientist、profile_url、success、status、
+          count、outputs、partition_counts（与 partitions 一一对应）、elapsed，失败时有 error。
+        """
+        resolve_q = queue.Queue(self.queue_size)
+        fetch_q = queue.Queue(self.queue_size)
+        # parse 队列中的任务已经提交给进程池，其容量同时限制了在途的页面数
+        parse_q = queue.Queue(self.queue_size)
+        done_q = queue.Queue()
+
+        self.metrics.start()
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            stages = [
+                (self._stage(self._resolve, resolve_q, fetch_q, self.resolve_workers), fetch_q),
+                (self._stage(lambda job: self._fetch(job, pool), fetch_q, parse_q,
+                             self.fetch_workers), parse_q),
+                (self._stage(self._write, parse_q, done_q, self.write_workers,
+                             on_done=self._finish), done_q),
+            ]
+            for scientist, partitions in jobs:
+                partitions = [as_partition(p) for p in partitions]
+                resolve_q.put({"scientist": scientist, "partitions": partitions,
+                               "years": union_years(partitions), "profile_url": "",
+                               "start": time.perf_counter()})
+            for _ in range(self.resolve_workers):
+                resolve_q.put(_STOP)
+            # 上一阶段的线程全部退出后，再通知下一阶段退出
+            for i, (threads, outbox) in enumerate(stages):
+                for thread in threads:
+                    thread.join()
+                if i + 1 < len(stages):
+                    for _ in stages[i + 1][0]:
+                        outbox.put(_STOP)
+        self.metrics.stop()
+
+        return [done_q.get() for _ in range(done_q.qsize())]
@@ -0,0 +1,488 @@
+import argparse
+import array
+import contextlib
+import gc
+import importlib.util
+import itertools
+import json
+import os
+import struct
+import sys
+import tempfile
+
+# pyarrow 只在读写 Parquet 时导入，没有安装时使用自带的列式格式（.papers）
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# 自带列式格式：魔数、头部长度，随后是 JSON 头部和按 8 字节对齐的各列数据（小端）
+_MAGIC = b"DLPCOLS1"
+_HEADER = "<8sQ"
+_ALIGN = 8
+
+# 整数列的类型码；字符串列以 "\0" 连接后按 UTF-8 存储
+INT_COLUMNS = {"year": "H", "venue": "i", "volume": "i", "author_offsets": "i", "author_ids": "i"}
+STRING_COLUMNS = ("title", "arxiv_link", "authors", "venues", "volumes")
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """批量创建大量不含循环引用的对象时暂停循环垃圾回收，避免反复扫描越来越大的堆。"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class StringTable:
+    """
+    字符串驻留表：相同的字符串只保存一份对象，并按首次出现的顺序分配编号。
+    作者、刊物等在大规模抓取中重复成千上万次，驻留后每次出现只占一个指针。
+    """
+
+    __slots__ = ("strings", "_ids")
+
+    def __init__(self, strings=()):
+        self.strings = []
+        self._ids = {}
+        for s in strings:
+            self.intern(s)
+
+    def intern(self, s):
+        """返回表中与 s 相等的字符串对象，首次出现时加入表。"""
+        i = self._ids.get(s)
+        if i is None:
+            i = self._ids[s] = len(self.strings)
+            self.strings.append(s)
+        return self.strings[i]
+
+    def id_of(self, s):
+        return self._ids[s]
+
+    def __getitem__(self, i):
+        return self.strings[i]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class Paper:
+    """
+    紧凑的论文记录，字段与 paper_info 字典一一对应。authors 为驻留后的作者元组，
+    venue / volume 为驻留后的刊物名和卷号（paper_info["venue"] 中没有该键时为 None）。
+    """
+
+    __slots__ = ("authors", "title", "venue", "volume", "arxiv_link", "year")
+
+    def __init__(self, authors, title, venue, volume, arxiv_link, year):
+        self.authors = authors
+        self.title = title
+        self.venue = venue
+        self.volume = volume
+        self.arxiv_link = arxiv_link
+        self.year = year
+
+    def to_dict(self):
+        """还原为与下载结果完全相同的 paper_info 字典。"""
+        venue = {}
+        if self.venue is not None:
+            venue["name"] = self.venue
+        if self.volume is not None:
+            venue["volume"] = self.volume
+        return {"authors": list(self.authors), "title": self.title, "venue": venue,
+                "arxiv_link": self.arxiv_link, "year": self.year}
+
+    def __repr__(self):
+        return f"Paper({self.title!r}, {self.year!r})"
+
+
+class PaperTable:
+    """
+    论文集合：Paper 记录的列表加上作者、刊物、卷号和年份的驻留表。
+    每篇论文约占 paper_info 字典的三分之一内存，可以导出为列式文件（write_columnar）
+    并快速读回（read_table / read_columns）。
+
+    参数:
+      papers: 可选的 paper_info 字典序列，构造时依次加入。
+    """
+
+    def __init__(self, papers=()):
+        self.papers = []
+        self.authors = StringTable()
+        self.venues = StringTable()
+        self.volumes = StringTable()
+        self.years = StringTable()
+        self.extend(papers)
+
+    def add(self, paper_info):
+        """加入一条 paper_info 字典，返回对应的 Paper。"""
+        venue = paper_info.get("venue") or {}
+        name = venue.get("name")
+        volume = venue.get("volume")
+        author = self.authors.intern
+        paper = Paper(tuple([author(a) for a in paper_info.get("authors", ())]),
+                      paper_info.get("title", ""),
+                      self.venues.intern(name) if name is not None else None,
+                      self.volumes.intern(volume) if volume is not None else None,
+                      paper_info.get("arxiv_link", ""),
+                      self.years.intern(paper_info.get("year", "")))
+        self.papers.append(paper)
+        return paper
+
+    def extend(self, papers):
+        for paper_info in papers:
+            self.add(paper_info)
+
+    def iter_dicts(self):
+        for paper in self.papers:
+            yield paper.to_dict()
+
+    def __len__(self):
+        return len(self.papers)
+
+    def __iter__(self):
+        return iter(self.papers)
+
+    def __getitem__(self, i):
+        return self.papers[i]
+
+    def columns(self):
+        """
+        转换为列式表示：每个字段一列，作者按 author_offsets 切分 author_ids，
+        venue / volume / author_ids 为驻留表中的编号（-1 表示没有），
+        year 为整数（空或非数字的年份为 0）。
+        """
+        papers = self.papers
+        authors = [paper.authors for paper in papers]
+        offsets = array.array("i", itertools.accumulate(map(len, authors), initial=0))
+        ids = array.array("i", list(map(self.authors._ids.__getitem__,
+                                        itertools.chain.from_iterable(authors))))
+        years = {year: int(year) if year.isdigit() else 0 for year in self.years.strings}
+        venues = dict(self.venues._ids)
+        venues[None] = -1
+        volumes = dict(self.volumes._ids)
+        volumes[None] = -1
+        return {
+            "count": len(papers),
+            "title": [paper.title for paper in papers],
+            "arxiv_link": [paper.arxiv_link for paper in papers],
+            "year": array.array("H", map(years.__getitem__, [paper.year for paper in papers])),
+            "venue": array.array("i", map(venues.__getitem__, [paper.venue for paper in papers])),
+            "volume": array.array("i", map(volumes.__getitem__,
+                                           [paper.volume for paper in papers])),
+            "author_offsets": offsets,
+            "author_ids": ids,
+            "authors": list(self.authors.strings),
+            "venues": list(self.venues.strings),
+            "volumes": list(self.volumes.strings),
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        """由 columns() 的结果（或 read_columns 读回的列）重建 PaperTable。"""
+        with _gc_paused():
+            return cls._from_columns(columns)
+
+    @classmethod
+    def _from_columns(cls, columns):
+        table = cls()
+        table.authors = StringTable(columns["authors"])
+        table.venues = StringTable(columns["venues"])
+        table.volumes = StringTable(columns["volumes"])
+        # 先把所有作者编号换成驻留的字符串，再按 author_offsets 切成每篇论文的元组
+        flat = list(map(table.authors.strings.__getitem__, columns["author_ids"]))
+        offsets = columns["author_offsets"].tolist()
+        # -1 表示没有该字段，映射到列表末尾的 None
+        venues = table.venues.strings + [None]
+        volumes = table.volumes.strings + [None]
+        years = {y: table.years.intern(str(y) if y else "") for y in set(columns["year"])}
+        table.papers = list(map(
+            Paper,
+            [tuple(flat[start:end]) for start, end in zip(offsets, offsets[1:])],
+            columns["title"],
+            map(venues.__getitem__, columns["venue"]),
+            map(volumes.__getitem__, columns["volume"]),
+            columns["arxiv_link"],
+            map(years.__getitem__, columns["year"])))
+        return table
+
+
+def detect_columnar(path):
+    """根据扩展名判断列式格式：.parquet 为 "parquet"，其余为自带格式 "columnar"。"""
+    return "parquet" if path.lower().endswith(".parquet") else "columnar"
+
+
+def _join_strings(strings, name):
+    text = "\0".join(strings)
+    if text.count("\0") != max(len(strings) - 1, 0):
+        raise ValueError(f"列 {name} 中的字符串包含 NUL 字符")
+    return text.encode("utf-8")
+
+
+def _split_strings(data, count):
+    if count == 0:
+        return []
+    return bytes(data).decode("utf-8").split("\0")
+
+
+def _int_bytes(values):
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _int_array(typecode, data):
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _write_native(columns, f, meta):
+    blobs = {}
+    for name, typecode in INT_COLUMNS.items():
+        blobs[name] = ("int", typecode, len(columns[name]), _int_bytes(columns[name]))
+    for name in STRING_COLUMNS:
+        blobs[name] = ("str", "", len(columns[name]), _join_strings(columns[name], name))
+
+    layout = {}
+    offset = 0
+    for name, (kind, typecode, length, data) in blobs.items():
+        layout[name] = [kind, typecode, length, offset, len(data)]
+        offset += -(-len(data) // _ALIGN) * _ALIGN
+    header = json.dumps({"count": columns["count"], "meta": meta, "columns": layout},
+                        ensure_ascii=False).encode("utf-8")
+    header += b" " * (-(struct.calcsize(_HEADER) + len(header)) % _ALIGN)
+    f.write(struct.pack(_HEADER, _MAGIC, len(header)))
+    f.write(header)
+    for kind, typecode, length, data in blobs.values():
+        f.write(data)
+        f.write(b"\0" * (-len(data) % _ALIGN))
+
+
+def _read_native(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, header_size = struct.unpack_from(_HEADER, data)
+    if magic != _MAGIC:
+        raise ValueError(f"{path} 不是列式论文文件")
+    start = struct.calcsize(_HEADER)
+    header = json.loads(data[start:start + header_size])
+    base = start + header_size
+    view = memoryview(data)
+    columns = {"count": header["count"]}
+    for name, (kind, typecode, length, offset, size) in header["columns"].items():
+        chunk = view[base + offset:base + offset + size]
+        if kind == "int":
+            columns[name] = _int_array(typecode, chunk)
+        else:
+            columns[name] = _split_strings(chunk, length)
+    return columns, header.get("meta", {})
+
+
+def _arrow_ints(arr, typecode):
+    """把没有空值的定长整数 Arrow 数组复制到 array.array，不经过 Python 对象。"""
+    values = array.array(typecode)
+    size = values.itemsize
+    buffer = memoryview(arr.buffers()[1])
+    values.frombytes(buffer[arr.offset * size:(arr.offset + len(arr)) * size])
+    return values
+
+
+def _write_parquet(columns, sink, meta):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    def ints(values, type_):
+        return pa.Array.from_buffers(type_, len(values), [None, pa.py_buffer(_int_bytes(values))])
+
+    def dictionary(ids, strings):
+        indices = ints(ids, pa.int32())
+        # 编号 -1 写成空值
+        indices = pc.if_else(pc.equal(indices, -1), pa.scalar(None, pa.int32()), indices)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(strings, pa.string()))
+
+    authors = pa.ListArray.from_arrays(
+        ints(columns["author_offsets"], pa.int32()),
+        pa.DictionaryArray.from_arrays(ints(columns["author_ids"], pa.int32()),
+                                       pa.array(columns["authors"], pa.string())))
+    table = pa.table({
+        "authors": authors,
+        "title": pa.array(columns["title"], pa.string()),
+        "venue": dictionary(columns["venue"], columns["venues"]),
+        "volume": dictionary(columns["volume"], columns["volumes"]),
+        "arxiv_link": pa.array(columns["arxiv_link"], pa.string()),
+        "year": ints(columns["year"], pa.uint16()),
+    })
+    table = table.replace_schema_metadata(
+        {"paperdownloader": json.dumps(meta, ensure_ascii=False)})
+    pq.write_table(table, sink)
+
+
+def _read_parquet(path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path).unify_dictionaries().combine_chunks()
+
+    def dictionary(name):
+        column = table.column(name).chunk(0) if table.num_rows else None
+        if column is None:
+            return array.array("i"), []
+        indices = column.indices.cast(pa.int32()).fill_null(-1)
+        return _arrow_ints(indices, "i"), column.dictionary.to_pylist()
+
+    columns = {"count": table.num_rows}
+    columns["venue"], columns["venues"] = dictionary("venue")
+    columns["volume"], columns["volumes"] = dictionary("volume")
+    if table.num_rows:
+        authors = table.column("authors").chunk(0)
+        values = authors.values
+        columns["author_offsets"] = _arrow_ints(authors.offsets, "i")
+        columns["author_ids"] = _arrow_ints(values.indices.cast(pa.int32()), "i")
+        columns["authors"] = values.dictionary.to_pylist()
+        columns["year"] = _arrow_ints(table.column("year").chunk(0), "H")
+    else:
+        columns.update(author_offsets=array.array("i", [0]), author_ids=array.array("i"),
+                       authors=[], year=array.array("H"))
+    columns["title"] = table.column("title").to_pylist()
+    columns["arxiv_link"] = table.column("arxiv_link").to_pylist()
+    raw = (table.schema.metadata or {}).get(b"paperdownloader")
+    return columns, json.loads(raw) if raw else {}
+
+
+def write_columnar(table, path, fmt=None, meta=None):
+    """
+    把 PaperTable 按列写入 path：先写同目录下的临时文件，fsync 后原子地替换。
+
+    参数:
+      table: PaperTable，或 columns() 格式的列字典。
+      fmt: "parquet"（需安装 pyarrow，作者/刊物/卷号为字典编码）或 "columnar"
+           （自带格式，只依赖标准库）；默认根据扩展名推断（见 detect_columnar）。
+      meta: 可选的元信息字典（如 scientist、profile_url），随文件一起保存。
+
+    返回:
+      写入的字节数。
+    """
+    fmt = fmt or detect_columnar(path)
+    if fmt == "parquet" and not HAS_PYARROW:
+        raise ValueError("Parquet 输出需要安装 pyarrow：pip install pyarrow")
+    if fmt not in ("parquet", "columnar"):
+        raise ValueError(f"不支持的列式格式: {fmt}")
+    columns = table.columns() if isinstance(table, PaperTable) else table
+    meta = meta or {}
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=directory)
+    try:
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            if fmt == "parquet":
+                _write_parquet(columns, f, meta)
+            else:
+                _write_native(columns, f, meta)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(path)
+
+
+def read_columns(path, fmt=None):
+    """
+    读取 write_columnar 写出的文件，返回 (列字典, 元信息)。列字典的结构同
+    PaperTable.columns()：整数列为 array.array，可直接交给 numpy.frombuffer 分析。
+    """
+    fmt = fmt or detect_columnar(path)
+    if fmt == "parquet":
+        if not HAS_PYARROW:
+            raise ValueError("读取 Parquet 需要安装 pyarrow：pip install pyarrow")
+        return _read_parquet(path)
+    return _read_native(path)
+
+
+def read_table(path, fmt=None):
+    """读取列式文件并重建 PaperTable，返回 (PaperTable, 元信息)。"""
+    columns, meta = read_columns(path, fmt)
+    return PaperTable.from_columns(columns), meta
+
+
+class ColumnarWriter:
+    """
+    与 writer.PaperWriter 接口相同的列式输出：论文先加入内存中的 PaperTable，
+    commit() 时一次性写成 Parquet 或自带列式文件；abort() 时丢弃，不改动目标文件。
+    """
+
+    def __init__(self, output_file, scientist="", profile_url="", fmt=None):
+        self.fmt = fmt or detect_columnar(output_file)
+        if self.fmt == "parquet" and not HAS_PYARROW:
+            raise ValueError("Parquet 输出需要安装 pyarrow：pip install pyarrow")
+        self.output_file = output_file
+        self.scientist = scientist
+        self.profile_url = profile_url
+        self.table = PaperTable()
+        self.count = 0
+        self.bytes_written = 0
+
+    def write(self, paper_info):
+        self.table.add(paper_info)
+        self.count += 1
+
+    def commit(self):
+        self.bytes_written = write_columnar(
+            self.table, self.output_file, self.fmt,
+            {"scientist": self.scientist, "profile_url": self.profile_url})
+
+    def abort(self):
+        self.table = PaperTable()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="论文列表的紧凑表示与列式导出")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="把下载结果（json / jsonl / 列式）合并转换为列式文件")
+    convert.add_argument("inputs", nargs="+", help="输入文件")
+    convert.add_argument("-o", "--output", required=True, help="输出文件（.parquet 或 .papers）")
+
+    stats = commands.add_parser("stats", help="显示列式文件的论文数和驻留表大小")
+    stats.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        from writer import read_output
+
+        table = PaperTable()
+        for path in args.inputs:
+            table.extend(read_output(path)[1])
+        size = write_columnar(table, args.output)
+        print(f"{len(table)} 篇论文，{len(table.authors)} 位作者，{len(table.venues)} 个刊物，"
+              f"已写入 {args.output}（{size} 字节）")
+    else:
+        columns, meta = read_columns(args.path)
+        print(json.dumps({"papers": columns["count"], "authors": len(columns["authors"]),
+                          "venues": len(columns["venues"]), "volumes": len(columns["volumes"]),
+                          "meta": meta}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
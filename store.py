@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from keys import link_doi, paper_key
+from pid_index import normalize_name
+from writer import read_output
+from years import parse_years
+
+DEFAULT_STORE_PATH = "papers.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    year INTEGER,
+    venue TEXT NOT NULL,
+    volume TEXT NOT NULL,
+    link TEXT NOT NULL,
+    doi TEXT,
+    authors TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS papers_year ON papers (year);
+CREATE INDEX IF NOT EXISTS papers_venue ON papers (venue COLLATE NOCASE, year);
+CREATE INDEX IF NOT EXISTS papers_doi ON papers (doi);
+CREATE TABLE IF NOT EXISTS paper_authors (
+    paper_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name_key TEXT NOT NULL,
+    PRIMARY KEY (paper_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_authors_name ON paper_authors (name_key, paper_id);
+CREATE TABLE IF NOT EXISTS sources (
+    scientist_key TEXT NOT NULL,
+    paper_id INTEGER NOT NULL,
+    PRIMARY KEY (scientist_key, paper_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS profiles (
+    scientist_key TEXT PRIMARY KEY,
+    scientist TEXT NOT NULL,
+    profile_url TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+"""
+
+# 外部内容 FTS5 表，由触发器与 papers 保持同步
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5 (
+    title, authors, venue, content='papers', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts (rowid, title, authors, venue)
+    VALUES (new.id, new.title, new.authors, new.venue);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, authors, venue)
+    VALUES ('delete', old.id, old.title, old.authors, old.venue);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, authors, venue)
+    VALUES ('delete', old.id, old.title, old.authors, old.venue);
+    INSERT INTO papers_fts (rowid, title, authors, venue)
+    VALUES (new.id, new.title, new.authors, new.venue);
+END;
+"""
+
+
+def fts_query(text):
+    """
+    把用户输入转成 FTS5 查询：每个以空白分隔的词作为一个带引号的字符串（同时包含所有词），
+    "-"、引号、AND / NEAR 等不会被当作 FTS5 运算符。返回 None 表示没有可检索的词。
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    return " ".join(terms) or None
+
+
+def _year(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PaperStore:
+    """
+    已下载论文的本地持久库（SQLite）。同一篇论文（键见 keys.paper_key）
+    无论出现在多少位科学家的结果中都只存一份，按年份、刊物、作者和 DOI 建索引，
+    标题/作者/刊物上有 FTS5 全文索引（SQLite 未编译 FTS5 时退化为 LIKE 查询）。
+    查询只读本地数据库，不联网，也不重新读取 JSON 文件。
+
+    download_papers(..., store=PaperStore()) 会在输出文件提交后把保存的论文写入库中。
+
+    参数:
+      path: SQLite 文件路径，":memory:" 表示只在内存中。
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self._db.commit()
+
+    def ingest(self, scientist, profile_url, papers):
+        """
+        写入一位科学家的（部分）论文，一次事务完成。已有的论文会被更新为最新内容。
+        返回写入的论文数。
+        """
+        scientist_key = normalize_name(scientist)
+        count = 0
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles (scientist_key, scientist, profile_url, ingested_at)"
+                " VALUES (?, ?, ?, ?)", (scientist_key, scientist, profile_url or "", time.time()))
+            for paper_info in papers:
+                venue = paper_info.get("venue", {})
+                row = (paper_key(paper_info), paper_info.get("title", ""),
+                       _year(paper_info.get("year")), venue.get("name", ""),
+                       venue.get("volume", ""), paper_info.get("arxiv_link", ""),
+                       link_doi(paper_info.get("arxiv_link", "")),
+                       json.dumps(paper_info.get("authors", []), ensure_ascii=False))
+                paper_id = self._upsert(row)
+                self._db.execute("DELETE FROM paper_authors WHERE paper_id = ?", (paper_id,))
+                self._db.executemany(
+                    "INSERT INTO paper_authors (paper_id, position, name_key) VALUES (?, ?, ?)",
+                    [(paper_id, i, normalize_name(name))
+                     for i, name in enumerate(paper_info.get("authors", []))])
+                self._db.execute("INSERT OR IGNORE INTO sources (scientist_key, paper_id)"
+                                 " VALUES (?, ?)", (scientist_key, paper_id))
+                count += 1
+        return count
+
+    def _upsert(self, row):
+        existing = self._db.execute("SELECT id, title, year, venue, volume, link, doi, authors"
+                                    " FROM papers WHERE key = ?", (row[0],)).fetchone()
+        if existing is None:
+            return self._db.execute(
+                "INSERT INTO papers (key, title, year, venue, volume, link, doi, authors)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row).lastrowid
+        # 内容没变时不更新，避免无谓地重写全文索引
+        if tuple(existing)[1:] != row[1:]:
+            self._db.execute(
+                "UPDATE papers SET title = ?, year = ?, venue = ?, volume = ?, link = ?, doi = ?,"
+                " authors = ? WHERE id = ?", row[1:] + (existing["id"],))
+        return existing["id"]
+
+    def ingest_file(self, path, scientist=None):
+        """
+        导入 download_papers 写出的文件（任意格式/压缩）。jsonl 文件没有元信息时，
+        scientist 默认取文件名中第一个 "_" 之前的部分。返回导入的论文数。
+        """
+        meta, papers = read_output(path)
+        if scientist is None:
+            scientist = meta.get("scientist") or os.path.basename(path).split("_")[0]
+        return self.ingest(scientist, meta.get("profile_url", ""), papers)
+
+    def query(self, text=None, year=-1, venue=None, author=None, doi=None, scientist=None,
+              limit=100):
+        """
+        组合查询，返回与 download_papers 输出相同结构的 paper_info 列表。
+
+        参数:
+          text: 全文检索（标题、作者、刊物），返回包含所有词的论文，如 "graph neural"；
+                不解释 FTS5 运算符（见 fts_query）。给出时按相关度排序，否则按年份从新到旧。
+          year: 年份条件，见 years.parse_years。
+          venue: 刊物名（不区分大小写的精确匹配）。
+          author: 作者姓名（规范化后精确匹配）。
+          doi: DOI（不区分大小写），也可以是 https://doi.org/ 开头的链接。
+          scientist: 只看从这位科学家的主页下载到的论文。
+          limit: 最多返回多少篇，None 表示不限制。
+        """
+        sql = ["SELECT p.title, p.year, p.venue, p.volume, p.link, p.authors FROM papers p"]
+        where, params = [], []
+        order = "p.year DESC, p.id"
+        if text and text.strip():
+            if self.fts:
+                sql.append("JOIN papers_fts ON papers_fts.rowid = p.id")
+                where.append("papers_fts MATCH ?")
+                params.append(fts_query(text))
+                order = "papers_fts.rank"
+            else:
+                where.append("(p.title LIKE ? OR p.authors LIKE ? OR p.venue LIKE ?)")
+                params += [f"%{text}%"] * 3
+        years = parse_years(year)
+        if not years.all:
+            ordered = sorted(years.years)
+            if ordered == list(range(ordered[0], ordered[-1] + 1)):
+                where.append("p.year BETWEEN ? AND ?")
+                params += [ordered[0], ordered[-1]]
+            else:
+                where.append(f"p.year IN ({','.join('?' * len(ordered))})")
+                params += ordered
+        if venue:
+            where.append("p.venue = ? COLLATE NOCASE")
+            params.append(venue)
+        if author:
+            where.append("p.id IN (SELECT paper_id FROM paper_authors WHERE name_key = ?)")
+            params.append(normalize_name(author))
+        if doi:
+            where.append("p.doi = ?")
+            params.append(link_doi(doi) or doi.lower())
+        if scientist:
+            where.append("p.id IN (SELECT paper_id FROM sources WHERE scientist_key = ?)")
+            params.append(normalize_name(scientist))
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append(f"ORDER BY {order}")
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(" ".join(sql), params).fetchall()
+        return [self._paper_info(row) for row in rows]
+
+    @staticmethod
+    def _paper_info(row):
+        venue_info = {}
+        if row["venue"]:
+            venue_info["name"] = row["venue"]
+            if row["volume"]:
+                venue_info["volume"] = row["volume"]
+        return {"authors": json.loads(row["authors"]), "title": row["title"], "venue": venue_info,
+                "arxiv_link": row["link"],
+                "year": str(row["year"]) if row["year"] is not None else ""}
+
+    def stats(self):
+        with self._lock:
+            papers = self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+            profiles = self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+            authors = self._db.execute(
+                "SELECT COUNT(DISTINCT name_key) FROM paper_authors").fetchone()[0]
+        return {"papers": papers, "profiles": profiles, "authors": authors, "fts": self.fts}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地论文库：导入下载结果并离线查询")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="SQLite 数据库文件")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="导入 download_papers 写出的文件")
+    ingest.add_argument("files", nargs="+")
+    ingest.add_argument("--scientist", help="jsonl 文件对应的科学家姓名")
+
+    query = commands.add_parser("query", help="查询论文")
+    query.add_argument("text", nargs="?", help="全文检索，返回包含所有词的论文")
+    query.add_argument("-y", "--year", default="-1", help="年份条件，如 2022、2019-2023")
+    query.add_argument("--venue", help="刊物名")
+    query.add_argument("--author", help="作者姓名")
+    query.add_argument("--doi", help="DOI")
+    query.add_argument("--scientist", help="只看某位科学家的论文")
+    query.add_argument("-n", "--limit", type=int, default=20, help="最多显示多少篇")
+    query.add_argument("--json", action="store_true", help="以 JSON 输出")
+
+    commands.add_parser("stats", help="显示库中的论文数等统计")
+    args = parser.parse_args(argv)
+
+    store = PaperStore(args.db)
+    if args.command == "ingest":
+        for path in args.files:
+            print(f"{path}: 导入 {store.ingest_file(path, args.scientist)} 篇")
+    elif args.command == "query":
+        start = time.perf_counter()
+        papers = store.query(args.text, args.year, args.venue, args.author, args.doi,
+                             args.scientist, args.limit)
+        elapsed = time.perf_counter() - start
+        if args.json:
+            json.dump(papers, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            for paper in papers:
+                venue = paper["venue"].get("name", "")
+                print(f"{paper['year']}  {paper['title']}  [{venue}]  {', '.join(paper['authors'])}")
+            print(f"共 {len(papers)} 篇，查询耗时 {elapsed * 1000:.2f} ms")
+    else:
+        print(json.dumps(store.stats(), ensure_ascii=False))
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import pytest
+
+import batch
+import fixtures
+from fetcher import Fetcher
+
+
+@pytest.mark.parametrize("options", [
+    {"refresh": True, "split": "year"},
+    {"refresh": True, "fan_out": True},
+    {"refresh": True, "job_timeout": 5.0},
+    {"refresh": True, "store": "papers.db"},
+    {"pipeline": True, "profile": True},
+    {"journal": "jobs.jsonl", "fan_out": True},
+])
+def test_check_options_rejects_combinations(options):
+    with pytest.raises(ValueError):
+        batch.check_options(**options)
+
+
+def test_check_options_accepts_combinations():
+    batch.check_options(split="venue", journal="jobs.jsonl", store="papers.db")
+    batch.check_options(refresh=True)
+    batch.check_options(pipeline=True, fan_out=True, split="year")
+
+
+def test_main_rejects_refresh_with_split(tmp_path, capsys):
+    jobs_file = tmp_path / "jobs.csv"
+    jobs_file.write_text("Synthetic Author,2020\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc:
+        batch.main([str(jobs_file), "-o", str(tmp_path), "--incremental", "--split", "year"])
+    assert exc.value.code == 2
+    assert "split" in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == [jobs_file]
+
+
+def test_read_jobs_invalid_rows(tmp_path):
+    jobs_file = tmp_path / "jobs.csv"
+    jobs_file.write_text("# comment\nAnn A,2021\n\nBob B\nCarl C,20x1\nDora D,\"2018,2020-2021\"\n",
+                         encoding="utf-8")
+    invalid = []
+    jobs = batch.read_jobs(str(jobs_file), invalid)
+    assert jobs == [("Ann A", "2021"), ("Bob B", "-1"), ("Dora D", "2018,2020-2021")]
+    assert [line for line, _ in invalid] == [5]
+    with pytest.raises(ValueError, match="第 5 行"):
+        batch.read_jobs(str(jobs_file))
+
+
+def test_empty_split_job_is_skipped_on_resume(tmp_path):
+    # 没有论文的拆分任务不写出文件，日志中记录的输出为空，重新运行时仍算作已完成
+    sample = fixtures.synthetic_sample(0)
+    journal = str(tmp_path / "jobs.jsonl")
+    with fixtures.StandInServer([sample]) as server:
+        fetcher = Fetcher(base_url=server.base_url)
+        for skipped in (0, 1):
+            report = batch.run_batch([("Synthetic Author", "-1")], str(tmp_path / "out"),
+                                     fetcher=fetcher, split="year", journal=journal)
+            assert report["stats"]["succeeded"] == 1
+            assert report["stats"]["skipped"] == skipped
+
+
+def test_output_files_ignore_refresh_state(tmp_path):
+    for name in ("A_2020.json", "A_2021.json", "A_2021.json.state.json"):
+        (tmp_path / name).write_text("{}", encoding="utf-8")
+    result = {"success": True, "output_file": str(tmp_path / "A_{year}.json")}
+    assert batch._output_files(result) == [str(tmp_path / "A_2020.json"),
+                                           str(tmp_path / "A_2021.json")]
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from fixtures import StandInFileServer
+from fulltext import FullTextFetcher, full_text_url, link_key
+
+
+def _pdf(size, seed):
+    """确定性的伪 PDF 内容，不同 seed 得到不同的内容。"""
+    block = hashlib.sha256(str(seed).encode()).digest()
+    return b"%PDF-1.4\n" + (block * (size // len(block) + 1))[:size]
+
+
+@pytest.fixture
+def fetcher_factory(tmp_path):
+    fetchers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("backoff", 0.01)
+        fetcher = FullTextFetcher(str(tmp_path / "fulltext"), **kwargs)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def test_resume_after_dropped_connection(fetcher_factory):
+    body = _pdf(400_000, 1)
+    with StandInFileServer({"/a.pdf": body}, drop_after=150_000) as server:
+        result = fetcher_factory().fetch(server.url("/a.pdf"))
+        assert result["status"] == "downloaded"
+        assert result["resumed"] > 0
+        assert server.range_requests == 1
+    assert result["sha256"] == hashlib.sha256(body).hexdigest()
+    with open(result["path"], "rb") as f:
+        assert f.read() == body
+
+
+def test_restart_when_server_ignores_range(fetcher_factory):
+    body = _pdf(400_000, 2)
+    with StandInFileServer({"/a.pdf": body}, drop_after=150_000, ranges=False) as server:
+        result = fetcher_factory().fetch(server.url("/a.pdf"))
+    assert result["status"] == "downloaded"
+    assert result["resumed"] == 0
+    assert result["sha256"] == hashlib.sha256(body).hexdigest()
+
+
+def test_partial_response_from_start(fetcher_factory):
+    # 上次只留下了元信息、没有部分文件，服务器对不带 Range 的请求也返回 206
+    body = _pdf(100_000, 5)
+    with StandInFileServer({"/a.pdf": body}, partial=True) as server:
+        fetcher = fetcher_factory()
+        url = server.url("/a.pdf")
+        meta_path = fetcher.store.partial_path(link_key(url)) + ".json"
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": None, "last_modified": None}, f)
+        result = fetcher.fetch(url)
+    assert result["status"] == "downloaded"
+    assert result["resumed"] == 0
+    assert result["sha256"] == hashlib.sha256(body).hexdigest()
+    # 下载结束后不保留该链接的锁
+    assert not fetcher._key_locks
+
+
+def test_gzip_encoded_response(fetcher_factory):
+    body = _pdf(100_000, 3)
+    with StandInFileServer({"/a.pdf": body}, gzip=True) as server:
+        result = fetcher_factory().fetch(server.url("/a.pdf"))
+    assert result["status"] == "downloaded"
+    assert result["sha256"] == hashlib.sha256(body).hexdigest()
+
+
+def test_dedup_across_links_and_runs(fetcher_factory):
+    body = _pdf(50_000, 4)
+    files = {"/a.pdf": body, "/mirror.pdf": body}
+    with StandInFileServer(files, redirects={"/doi/10.1/X": "/a.pdf"}) as server:
+        urls = [server.url(path) for path in ("/a.pdf", "/mirror.pdf", "/doi/10.1/X")]
+        results = fetcher_factory().fetch_many(urls)
+        statuses = sorted(r["status"] for r in results.values())
+        assert statuses == ["deduplicated", "deduplicated", "downloaded"]
+        assert len({r["sha256"] for r in results.values()}) == 1
+
+        requests_before = server.requests
+        fetcher = fetcher_factory()
+        rerun = fetcher.fetch_many(urls)
+        assert {r["status"] for r in rerun.values()} == {"cached"}
+        assert server.requests == requests_before
+    assert fetcher.store.stats()["objects"] == 1
+
+
+def test_not_found_and_rejected(fetcher_factory):
+    files = {"/landing": (b"<html></html>", "text/html")}
+    with StandInFileServer(files) as server:
+        fetcher = fetcher_factory()
+        assert fetcher.fetch(server.url("/missing.pdf"))["status"] == "not_found"
+        assert fetcher.fetch(server.url("/landing"))["status"] == "rejected"
+        requests_before = server.requests
+        # 负缓存期内不再请求
+        assert fetcher.fetch(server.url("/landing"))["status"] == "rejected"
+        assert server.requests == requests_before
+
+
+def test_max_per_host(fetcher_factory):
+    files = {f"/p{i}.pdf": _pdf(20_000, 10 + i) for i in range(12)}
+    with StandInFileServer(files, latency=0.05) as server:
+        results = fetcher_factory(max_workers=8, max_per_host=2).fetch_many(
+            [server.url(path) for path in files])
+        assert server.max_active == 2
+    assert {r["status"] for r in results.values()} == {"downloaded"}
+
+
+def test_links():
+    assert full_text_url({"arxiv_link": "https://arxiv.org/abs/2101.00001"}) == \
+        "https://arxiv.org/pdf/2101.00001"
+    assert full_text_url({"arxiv_link": ""}) is None
+    assert link_key("http://dx.doi.org/10.1/ABC") == "https://doi.org/10.1/abc"
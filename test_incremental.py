@@ -0,0 +1,64 @@
+import copy
+
+import pytest
+
+import fixtures
+import incremental
+from fetcher import Fetcher
+from writer import read_output
+
+
+def _titles(path):
+    return sorted(paper["title"] for paper in read_output(path)[1])
+
+
+@pytest.fixture
+def sample():
+    return fixtures.synthetic_sample(80, seed=5)
+
+
+def _without(sample, year, position):
+    """去掉某一年第 position 篇论文的样本副本，返回 (副本, 被去掉的论文)。"""
+    stale = copy.deepcopy(sample)
+    section = [i for i, paper in enumerate(stale["papers"]) if paper["year"] == year]
+    return stale, stale["papers"].pop(section[position])
+
+
+@pytest.mark.parametrize("year, missing_year", [(-1, "2025"), ("2015,2019", "2015")])
+def test_refresh_finds_inserted_paper(tmp_path, sample, year, missing_year):
+    # 新论文不在该年份一节的最前面：只检查到第一篇已有论文就停止时会漏掉
+    stale, missing = _without(sample, missing_year, 1)
+    expected = sorted(paper["title"] for paper in sample["papers"]
+                      if year == -1 or paper["year"] in ("2015", "2019"))
+    output_file = str(tmp_path / "refresh.json")
+    with fixtures.StandInServer([stale]) as server:
+        fetcher = Fetcher(base_url=server.base_url)
+        first = incremental.refresh_papers("Synthetic Author", year, output_file, fetcher=fetcher)
+        assert first["new"] == len(expected) - 1
+
+        server.update(sample)
+        result = incremental.refresh_papers("Synthetic Author", year, output_file, fetcher=fetcher)
+        assert (result["new"], result["changed"]) == (1, 0)
+        assert _titles(output_file) == expected
+
+        # 保存的是刚合并的主页的摘要，内容不变时不再解析
+        again = incremental.refresh_papers("Synthetic Author", year, output_file, fetcher=fetcher)
+        assert again["unchanged_profile"]
+        assert again["count"] == len(expected)
+
+
+@pytest.mark.parametrize("suffix", [".papers", ".parquet"])
+def test_refresh_columnar_output(tmp_path, sample, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    stale, missing = _without(sample, "2025", 0)
+    output_file = str(tmp_path / ("refresh" + suffix))
+    with fixtures.StandInServer([stale]) as server:
+        fetcher = Fetcher(base_url=server.base_url)
+        incremental.refresh_papers("Synthetic Author", -1, output_file, fetcher=fetcher)
+        server.update(sample)
+        result = incremental.refresh_papers("Synthetic Author", -1, output_file, fetcher=fetcher)
+    assert (result["new"], result["changed"]) == (1, 0)
+    papers = read_output(output_file)[1]
+    assert papers[0] == missing
+    assert len(papers) == len(sample["papers"])
@@ -0,0 +1,98 @@
+import copy
+import json
+
+import pytest
+
+import downloader
+import fixtures
+import offline
+from fetcher import Fetcher
+
+
+def _papers(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["papers"]
+
+
+def _canonical(papers):
+    # 离线索引同一年内按记录 key 排列，dblp 主页的同年顺序不同，只比较内容和年份顺序
+    return sorted(json.dumps(paper, sort_keys=True, ensure_ascii=False) for paper in papers)
+
+
+def _people(samples):
+    return {name for sample in samples for paper in sample["papers"] for name in paper["authors"]}
+
+
+def _download(tmp_path, name, source, backend, year=-1):
+    output_file = str(tmp_path / f"{backend}.json")
+    result = downloader.download_papers(name, year, output_file, fetcher=source, backend=backend)
+    assert result["success"]
+    return _papers(output_file)
+
+
+@pytest.fixture
+def samples():
+    sample = fixtures.synthetic_sample(60, scientist="Synthetic Author", seed=3)
+    # 带非 ASCII 字符的合作者，转储中写成命名实体
+    sample["papers"][0]["authors"].append("Jürgen Müller")
+    return [sample] + fixtures.synthetic_network(12, papers_per_person=6)
+
+
+def test_offline_matches_html_backend(tmp_path, samples):
+    fixtures.write_dump(samples, str(tmp_path / "dblp.xml.gz"))
+    stats = offline.build_index(str(tmp_path / "dblp.xml.gz"), str(tmp_path / "index"))
+    assert stats["mode"] == "full"
+
+    with fixtures.StandInServer(samples) as server, \
+            offline.OfflineIndex(str(tmp_path / "index")) as index:
+        fetcher = Fetcher(base_url=server.base_url)
+        for name in ("Synthetic Author", "Person 4"):
+            for year in (-1, "2015-2020"):
+                online = _download(tmp_path, name, fetcher, "html", year)
+                local = _download(tmp_path, name, index, "offline", year)
+                assert _canonical(local) == _canonical(online), (name, year)
+                assert [p["year"] for p in local] == [p["year"] for p in online]
+                assert local or year != -1
+
+        # 只作为合作者出现的作者在替身服务器上没有主页，离线索引由转储中的主页记录找到
+        local = _download(tmp_path, "Jürgen Müller", index, "offline")
+        assert [paper["title"] for paper in local] == [samples[0]["papers"][0]["title"]]
+
+
+def test_incremental_rebuild(tmp_path, samples):
+    dump = str(tmp_path / "dblp.xml.gz")
+    fixtures.write_dump(samples, dump)
+    offline.build_index(dump, str(tmp_path / "index"))
+
+    updated = copy.deepcopy(samples)
+    papers = updated[0]["papers"]
+    removed = papers.pop(5)
+    changed = papers[10]
+    changed["authors"].append("Late Coauthor")
+    changed["mdate"] = "2024-06-01"
+    added = dict(copy.deepcopy(papers[0]), title="A newly indexed paper.", mdate="2024-06-01")
+    papers.insert(0, added)
+    fixtures.write_dump(updated, dump)
+
+    stats = offline.build_index(dump, str(tmp_path / "index"))
+    assert stats["mode"] == "incremental"
+    # 新出现和不再出现的合作者的主页记录也计入新增 / 删除
+    new_people = _people(updated) - _people(samples)
+    gone_people = _people(samples) - _people(updated)
+    assert stats["added"] == 1 + len(new_people)
+    assert stats["updated"] == 1
+    assert stats["removed"] == 1 + len(gone_people)
+
+    offline.build_index(dump, str(tmp_path / "full"), full=True)
+    with offline.OfflineIndex(str(tmp_path / "index")) as index, \
+            offline.OfflineIndex(str(tmp_path / "full")) as full:
+        result = _download(tmp_path, "Synthetic Author", index, "offline")
+        assert result == _download(tmp_path, "Synthetic Author", full, "offline")
+    titles = [paper["title"] for paper in result]
+    assert added["title"] in titles
+    assert removed["title"] not in titles
+    assert next(p for p in result if p["title"] == changed["title"])["authors"] == \
+        changed["authors"]
+    assert len(result) == len(papers)
+
+    assert offline.build_index(dump, str(tmp_path / "index"))["mode"] == "skipped"
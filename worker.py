@@ -0,0 +1,118 @@
+import itertools
+import queue
+import threading
+
+import downloader
+from cancellation import CancelToken
+
+
+class DownloadWorker:
+    """
+    在后台线程中依次执行下载任务，GUI 主循环通过 poll() 取回事件，不会阻塞界面。
+
+    事件为 (kind, job, data) 元组，kind 为:
+      "queued"    任务已加入队列
+      "started"   任务开始执行
+      "progress"  data 为 download_papers 的进度事件
+      "done"      data 为 download_papers 的返回值
+      "failed"    data 为异常信息字符串
+      "cancelled" 任务被取消（未开始的任务被移出队列，或正在执行的任务被中止）
+
+    参数:
+      download: 实际执行下载的函数，签名同 downloader.download_papers。
+      notify: 可选的回调 notify()，有新事件而上次 poll() 之后还没有通知过时在下载线程中调用，
+              用于唤醒阻塞在 pygame.event.wait() 上的主循环（连续的进度事件只通知一次）。
+      **kwargs: 每次调用 download 时附带的参数（如 fetcher、pid_index）。
+    """
+
+    def __init__(self, download=downloader.download_papers, notify=None, **kwargs):
+        self.download = download
+        self.notify = notify
+        self.kwargs = kwargs
+        self.events = queue.Queue()
+        self._jobs = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._current = None
+        self._token = None
+        self._notified = False
+        self._thread = threading.Thread(target=self._run, name="download-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, scientist, year, output_file):
+        """把任务加入队列，返回任务字典（含自增的 id）。"""
+        job = {"id": next(self._ids), "scientist": scientist, "year": year,
+               "output_file": output_file}
+        with self._lock:
+            self._pending.append(job)
+        self._jobs.put(job)
+        self._emit("queued", job, None)
+        return job
+
+    def cancel(self):
+        """取消正在执行的任务以及队列中所有未开始的任务。"""
+        with self._lock:
+            dropped, self._pending = self._pending, []
+            if self._token is not None:
+                self._token.cancel()
+        for job in dropped:
+            self._emit("cancelled", job, None)
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._current is not None or bool(self._pending)
+
+    @property
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _emit(self, kind, job, data):
+        self.events.put((kind, job, data))
+        if self.notify is not None:
+            with self._lock:
+                wake, self._notified = not self._notified, True
+            if wake:
+                self.notify()
+
+    def poll(self):
+        """非阻塞地取出目前所有事件。"""
+        # 先清除通知标记再取事件：之后放入的事件一定会再通知一次
+        with self._lock:
+            self._notified = False
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _progress(self, job):
+        return lambda event: self._emit("progress", job, event)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            with self._lock:
+                if job not in self._pending:
+                    continue  # 已被取消
+                self._pending.remove(job)
+                self._current = job
+                self._token = CancelToken()
+            self._emit("started", job, None)
+            try:
+                result = self.download(job["scientist"], job["year"], job["output_file"],
+                                       progress=self._progress(job), cancel_token=self._token,
+                                       **self.kwargs)
+                if result.get("status") == "cancelled":
+                    self._emit("cancelled", job, result)
+                else:
+                    self._emit("done", job, result)
+            except Exception as e:
+                self._emit("failed", job, str(e))
+            finally:
+                with self._lock:
+                    self._current = None
+                    self._token = None
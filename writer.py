@@ -0,0 +1,219 @@
+import gzip
+import importlib.util
+import io
+import json
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from years import parse_years
+
+FORMATS = ("json", "jsonl")
+# 列式格式由 records.ColumnarWriter 写出，见 open_writer
+COLUMNAR_FORMATS = ("parquet", "columnar")
+COMPRESSIONS = (None, "gzip", "zstd")
+_COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+_COLUMNAR_SUFFIXES = {".parquet": "parquet", ".papers": "columnar"}
+
+
+def detect_format(output_file):
+    """
+    根据文件名推断输出格式和压缩方式，例如 "a.jsonl.gz" -> ("jsonl", "gzip")，
+    "a.parquet" -> ("parquet", None)。无法识别的扩展名按 ("json", None) 处理。
+    """
+    root, ext = os.path.splitext(output_file)
+    if ext.lower() in _COLUMNAR_SUFFIXES:
+        return _COLUMNAR_SUFFIXES[ext.lower()], None
+    compression = _COMPRESSION_SUFFIXES.get(ext.lower())
+    if compression is not None:
+        root, ext = os.path.splitext(root)
+    fmt = "jsonl" if ext.lower() == ".jsonl" else "json"
+    return fmt, compression
+
+
+def is_supported_output(output_file):
+    """
+    输出文件名是否以 .json / .jsonl 结尾（可再带 .gz / .zst 压缩后缀），
+    或为列式的 .papers / .parquet（后者需安装 pyarrow）。
+    """
+    root, ext = os.path.splitext(output_file.lower())
+    if ext == ".parquet":
+        return importlib.util.find_spec("pyarrow") is not None
+    if ext == ".papers":
+        return True
+    if ext in _COMPRESSION_SUFFIXES:
+        if ext == ".zst" and zstandard is None:
+            return False
+        root, ext = os.path.splitext(root)
+    return ext in (".json", ".jsonl")
+
+
+def default_output_name(scientist, year, split=None):
+    """
+    与 main.py 一致的默认输出文件名：{scientist}_{year}.json，year 为 -1 时为 {scientist}_all.json。
+    split 为 "year" / "venue" 时返回按年份/刊物拆分的模板，如 "Feng Zhao_{year}.json"。
+    """
+    if split:
+        return f"{scientist}_{{{split}}}.json"
+    years = parse_years(year)
+    if years.all:
+        return f"{scientist}_all.json"
+    return f"{scientist}_{years}.json"
+
+
+def _open_text(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd 压缩需要安装 zstandard")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")),
+                                encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_output(path):
+    """
+    读取 PaperWriter / records.ColumnarWriter 写出的文件（任意格式/压缩），
+    返回 (元信息, 论文列表)。jsonl 文件没有元信息，返回的元信息为空字典。
+    """
+    fmt, compression = detect_format(path)
+    if fmt in COLUMNAR_FORMATS:
+        import records
+        table, meta = records.read_table(path, fmt)
+        return meta, list(table.iter_dicts())
+    with _open_text(path, compression) as f:
+        if fmt == "jsonl":
+            return {}, [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    papers = data.pop("papers", [])
+    return data, papers
+
+
+class PaperWriter:
+    """
+    流式输出论文列表：每提取一篇就写一篇，不在内存中保留完整结果。
+    先写入同目录下的临时文件，commit() 时 fsync 并原子地重命名为目标文件；
+    abort() 或出现异常时删除临时文件，目标文件要么是旧内容，要么是完整的新内容。
+
+    参数:
+      output_file: 目标文件路径。
+      scientist / profile_url: 写在 JSON 顶层的元信息（jsonl 格式每行只有论文）。
+      fmt: "json" 输出与 json.dump(..., indent=2) 完全相同的文档；"jsonl" 每行一篇论文。
+      compression: None / "gzip" / "zstd"（需安装 zstandard）。
+      默认根据文件名推断 fmt 和 compression。
+    """
+
+    def __init__(self, output_file, scientist="", profile_url="", fmt=None, compression=None):
+        detected_fmt, detected_compression = detect_format(output_file)
+        self.fmt = fmt or detected_fmt
+        self.compression = compression if compression is not None else detected_compression
+        if self.fmt not in FORMATS:
+            raise ValueError(f"不支持的输出格式: {self.fmt}")
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {self.compression}")
+        if self.compression == "zstd" and zstandard is None:
+            raise ValueError("zstd 压缩需要安装 zstandard")
+
+        self.output_file = output_file
+        self.scientist = scientist
+        self.profile_url = profile_url
+        self.count = 0
+        self.bytes_written = 0
+
+        directory = os.path.dirname(os.path.abspath(output_file))
+        fd, self._tmp_path = tempfile.mkstemp(
+            prefix="." + os.path.basename(output_file) + ".", suffix=".tmp", dir=directory)
+        # mkstemp 创建的文件权限是 0600，改成普通输出文件的权限
+        os.chmod(self._tmp_path, 0o644)
+        self._raw = os.fdopen(fd, "wb")
+        if self.compression == "gzip":
+            self._binary = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif self.compression == "zstd":
+            self._binary = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._binary = self._raw
+        self._stream = io.TextIOWrapper(self._binary, encoding="utf-8", newline="\n")
+        self._closed = False
+
+    def _write(self, text):
+        self._stream.write(text)
+        self.bytes_written += len(text.encode("utf-8"))
+
+    def write(self, paper_info):
+        if self.fmt == "jsonl":
+            self._write(json.dumps(paper_info, ensure_ascii=False) + "\n")
+        else:
+            if self.count == 0:
+                self._write("{\n"
+                            f"  \"scientist\": {json.dumps(self.scientist, ensure_ascii=False)},\n"
+                            f"  \"profile_url\": {json.dumps(self.profile_url, ensure_ascii=False)},\n"
+                            "  \"papers\": [\n")
+            else:
+                self._write(",\n")
+            body = json.dumps(paper_info, ensure_ascii=False, indent=2)
+            self._write("\n".join("    " + line for line in body.split("\n")))
+        self.count += 1
+
+    def _finish(self):
+        if self.fmt == "json":
+            if self.count == 0:
+                self._write(json.dumps({"scientist": self.scientist,
+                                        "profile_url": self.profile_url,
+                                        "papers": []}, ensure_ascii=False, indent=2))
+            else:
+                self._write("\n  ]\n}")
+
+    def _close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._stream.flush()
+        self._stream.detach()
+        if self._binary is not self._raw:
+            self._binary.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+    def commit(self):
+        """写完结尾并原子地替换目标文件。"""
+        self._finish()
+        self._close()
+        os.replace(self._tmp_path, self.output_file)
+
+    def abort(self):
+        """放弃本次输出，删除临时文件，不改动目标文件。"""
+        try:
+            self._close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def open_writer(output_file, scientist="", profile_url="", fmt=None, compression=None):
+    """
+    按格式创建输出：json / jsonl 为流式的 PaperWriter，parquet / columnar 为
+    records.ColumnarWriter（commit 时一次性写出），两者接口相同。
+    """
+    fmt = fmt or detect_format(output_file)[0]
+    if fmt in COLUMNAR_FORMATS:
+        if compression is not None:
+            raise ValueError(f"{fmt} 格式不支持额外的压缩方式")
+        import records
+        return records.ColumnarWriter(output_file, scientist, profile_url, fmt)
+    return PaperWriter(output_file, scientist, profile_url, fmt, compression)
@@ -0,0 +1,104 @@
+class YearFilter:
+    """
+    年份过滤条件：全部年份、单个年份、区间或它们的并集。
+
+    参数:
+      years: 允许的年份集合，None 表示不过滤。
+      spec: 规范化后的文字形式，用于输出文件名等。
+    """
+
+    def __init__(self, years=None, spec="-1"):
+        self.years = frozenset(years) if years is not None else None
+        self.spec = spec
+        self._strings = frozenset(str(y) for y in self.years) if self.years is not None else None
+
+    @property
+    def all(self):
+        return self.years is None
+
+    @property
+    def min(self):
+        return min(self.years) if self.years else None
+
+    def matches(self, paper_year):
+        """paper_year 为页面上的年份字符串。"""
+        return self._strings is None or str(paper_year) in self._strings
+
+    def before_range(self, paper_year):
+        """
+        paper_year 早于所有允许的年份。dblp 主页按年份降序排列，遇到这样的分组后
+        后面的条目都不可能匹配。
+        """
+        if self.years is None or not self.years:
+            return False
+        try:
+            return int(paper_year) < self.min
+        except ValueError:
+            return False
+
+    def __str__(self):
+        return self.spec
+
+    def __repr__(self):
+        return f"YearFilter({self.spec!r})"
+
+
+def _format(years):
+    """把年份集合写成紧凑的 "2018,2020-2022" 形式。"""
+    parts = []
+    ordered = sorted(years)
+    start = prev = ordered[0]
+    for y in ordered[1:] + [None]:
+        if y is not None and y == prev + 1:
+            prev = y
+            continue
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+        if y is not None:
+            start = prev = y
+    return ",".join(parts)
+
+
+def parse_years(spec):
+    """
+    解析年份条件，返回 YearFilter。支持:
+      -1 / "-1" / "all"      全部年份
+      2021 / "2021"          单个年份
+      "2019-2023"            闭区间
+      "2018,2021" / "2018;2021"  多个年份或区间的并集，如 "2015,2019-2021"
+      可迭代的整数集合
+    格式错误时抛出 ValueError。
+    """
+    if isinstance(spec, YearFilter):
+        return spec
+    if isinstance(spec, int):
+        if spec == -1:
+            return YearFilter()
+        return YearFilter({spec}, str(spec))
+    if not isinstance(spec, str):
+        years = {int(y) for y in spec}
+        if not years:
+            raise ValueError("年份集合不能为空")
+        return YearFilter(years, _format(years))
+
+    text = spec.strip().lower()
+    if text in ("-1", "all"):
+        return YearFilter()
+    years = set()
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            lo, hi = int(lo), int(hi)
+            if lo > hi:
+                lo, hi = hi, lo
+            years.update(range(lo, hi + 1))
+        else:
+            year = int(part)
+            if year < 0:
+                raise ValueError(f"无效的年份: {part}")
+            years.add(year)
+    if not years:
+        raise ValueError(f"无效的年份条件: {spec!r}")
+    return YearFilter(years, _format(years))